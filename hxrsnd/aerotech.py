@@ -11,7 +11,8 @@ from ophyd.signal import EpicsSignal, EpicsSignalRO, Signal
 from ophyd.status import wait as status_wait
 
 from .sndmotor import SndEpicsMotor
-from .pneumatic import PressureSwitch
+from .monitor import FollowingErrorCapture
+from .pneumatic import PressureSwitch, PressureInterlock
 from .utils import absolute_submodule_path, as_list, stop_on_keyboardinterrupt
 from .exceptions import MotorDisabled, MotorFaulted, MotorStopped, BadN2Pressure
 
@@ -183,8 +184,8 @@ class AeroBase(SndEpicsMotor):
         return self._status_print(status, "Homing '{0}' in reverse.".format(
             self.desc), print_set=print_set, ret_status=ret_status)
 
-    def move(self, position, wait=False, check_status=True, timeout=None, *args, 
-             **kwargs):
+    def move(self, position, wait=False, check_status=True, timeout=None, 
+             capture=False, *args, **kwargs):
         """
         Move to a specified position, optionally waiting for motion to
         complete.
@@ -209,6 +210,11 @@ class AeroBase(SndEpicsMotor):
             Maximum time to wait for the motion. If None, the default timeout
             for this positioner is used.
 
+        capture : bool, optional
+            Record the readbacks at the monitor rate for the duration of the
+            move. The :class:`.FollowingErrorCapture` is attached to the
+            returned status as ``status.capture``.
+
         Returns
         -------
         status : MoveStatus        
@@ -229,8 +235,27 @@ class AeroBase(SndEpicsMotor):
         if check_status:
             self.check_status(position)
         logger.debug("Moving {0} to {1}".format(self.name, position))
-        return super().move(position, wait=wait, timeout=timeout, *args, 
-                            **kwargs)
+        if not capture:
+            return super().move(position, wait=wait, timeout=timeout, *args, 
+                                **kwargs)
+
+        # Stop capturing as soon as the move finishes
+        following_capture = FollowingErrorCapture(self)
+        moved_cb = kwargs.pop("moved_cb", None)
+        def stop_capture(*args, obj=None, **kwargs):
+            following_capture.stop()
+            if moved_cb is not None:
+                moved_cb(obj=obj)
+
+        following_capture.start(position)
+        try:
+            status = super().move(position, wait=wait, timeout=timeout, 
+                                  moved_cb=stop_capture, *args, **kwargs)
+        except Exception:
+            following_capture.stop()
+            raise
+        status.capture = following_capture
+        return status
 
     def mv(self, position, wait=True, print_move=True, *args, **kwargs):
         """
@@ -674,14 +699,48 @@ class InterlockedAero(AeroBase):
     """
     Linear Aerotech stage that has the additional move check for the pressure
     status.
+
+    The pressure state is cached by a :class:`.PressureInterlock`, and moves in
+    progress are stopped as soon as the pressure goes bad.
+
+    Parameters
+    ----------
+    prefix : str
+        Prefix of the motor.
+
+    interlock : :class:`.PressureInterlock`, optional
+        Interlock to share with the other axes of the tower. Defaults to a new
+        interlock on the pressure switch of the tower, which can be swapped for
+        a shared one using :meth:`use_interlock`.
     """
     # To do the internel pressure check
     _pressure = FrmCmp(PressureSwitch, "{self._prefix}:N2:{self._tower}")
 
-    def __init__(self, prefix, *args, **kwargs):
+    def __init__(self, prefix, *args, interlock=None, **kwargs):
         self._tower = prefix.split(":")[-2]
         self._prefix = ":".join(prefix.split(":")[:2])
         super().__init__(prefix, *args, **kwargs)
+        self._owns_interlock = interlock is None
+        self._interlock = interlock or PressureInterlock(self._pressure)
+        self._interlock.register(self)
+
+    def use_interlock(self, interlock):
+        """
+        Switches the axis over to the inputted interlock, removing the monitor
+        of the interlock the axis created for itself.
+
+        Parameters
+        ----------
+        interlock : :class:`.PressureInterlock`
+            Interlock shared by the axes of the tower.
+        """
+        if interlock is self._interlock:
+            return
+        if self._owns_interlock:
+            self._interlock.unsubscribe()
+        self._owns_interlock = False
+        self._interlock = interlock
+        self._interlock.register(self)
 
     def check_status(self, *args, **kwargs):
         """
@@ -707,7 +766,7 @@ class InterlockedAero(AeroBase):
         BadN2Pressure
             If the pressure in the tower is bad.
         """
-        if self._pressure.bad:
+        if self._interlock.bad:
             err = "Cannot move - Pressure in {0} is bad.".format(self._tower)
             logger.error(err)
             raise BadN2Pressure(err)
@@ -42,11 +42,27 @@ lattice_parameters = {
      'Si':(5.4310205,5.4310205,5.4310205,90,90,90),
 }
 
+# Crystal lattice types
+lattice_types = {
+    'Si':'diamond',
+}
+
+# Cromer-Mann coefficients of the atomic form factors (a1-a4, b1-b4, c)
+# b in angstroms squared
+cromer_mann = {
+    'Si':((6.2915, 3.0353, 1.9891, 1.5410),
+          (2.4386, 32.3337, 0.6785, 81.6937),
+          1.1407),
+}
+
 #define units and constants
 u = {
     'ang': 1e10,
 }
 
+# Classical electron radius in m
+r_e = 2.8179403262e-15
+
 # Trigonometric Functions
 
 def sind(A):
@@ -226,17 +242,17 @@ def eV(E):
 
     Parameters
     ----------
-    E : float
+    E : float or array-like
         The input energy to convert to eV
 
     Returns
     -------
-    E : float
-        Energy converted to eV from KeV    
+    E : float or np.ndarray
+        Energy converted to eV from KeV, an array for an array of energies
     """
-    if E < 100:
-        E *= 1000.0
-    return float(E)
+    E = np.asarray(E, dtype=float)
+    E = np.where(E < 100, E*1000.0, E)
+    return float(E) if E.ndim == 0 else E
 
 def check_id(ID):
     """
@@ -381,6 +397,137 @@ def bragg_energy(theta, ID="Si", hkl=(2,2,0)):
     E = lam2E(l)
     return E
 
+def form_factor(ID="Si", hkl=(2,2,0)):
+    """
+    Computes the atomic form factor of the specified material at the momentum
+    transfer of a reflection, using the Cromer-Mann coefficients. Anomalous
+    scattering is neglected.
+
+    Parameters
+    ----------
+    ID : str, optional
+        Chemical fomula : 'Si'
+
+    hlk : tuple, optional
+        The reflection : (2,2,0)
+
+    Returns
+    -------
+    f : float
+        Atomic form factor in electrons
+    """
+    ID = check_id(ID)
+    a, b, c = cromer_mann[ID]
+    # sin(theta)/lambda in inverse angstroms is 1/2d at the Bragg condition
+    s = 1 / (2*d_space(ID, hkl)*u['ang'])
+    return sum(ai*np.exp(-bi*s**2) for ai, bi in zip(a, b)) + c
+
+def structure_factor(ID="Si", hkl=(2,2,0), f=None):
+    """
+    Computes the structure factor of the unit cell for a reflection
+
+    Parameters
+    ----------
+    ID : str, optional
+        Chemical fomula : 'Si'
+
+    hlk : tuple, optional
+        The reflection : (2,2,0)
+
+    f : float, optional
+        Atomic form factor. Defaults to :func:`.form_factor`
+
+    Returns
+    -------
+    F : complex
+        Structure factor of the reflection
+    """
+    ID = check_id(ID)
+    if f is None:
+        f = form_factor(ID, hkl)
+    h, k, l = hkl
+    F = f*(1 + np.exp(-1j*np.pi*(k+l)) + np.exp(-1j*np.pi*(h+l)) +
+           np.exp(-1j*np.pi*(h+k)))
+    if lattice_types[ID] == 'diamond':
+        F *= 1 + np.exp(-1j*np.pi*(h+k+l)/2)
+    return F
+
+def unit_cell_volume(ID="Si"):
+    """
+    Computes the unit cell volume in m^3 of the specified material
+
+    Parameters
+    ----------
+    ID : str, optional
+        Chemical fomula : 'Si'
+
+    Returns
+    -------
+    V : float
+        Volume of the unit cell
+    """
+    ID = check_id(ID)
+    a, b, c, alpha, beta, gamma = lattice_parameters[ID]
+    ca, cb, cg = cosd(alpha), cosd(beta), cosd(gamma)
+    return (a*b*c/u['ang']**3 *
+            np.sqrt(1 - ca**2 - cb**2 - cg**2 + 2*ca*cb*cg))
+
+def darwin_width(E=None, ID="Si", hkl=(2,2,0)):
+    """
+    Computes the Darwin width (deg) of the specified material, reflection and
+    photon energy, the full width of the intrinsic rocking curve of a perfect
+    crystal in the symmetric Bragg geometry.
+
+    Parameters
+    ----------
+    E : float, optional
+        Photon energy in eV or keV (default is LCLS value)
+
+    ID : str, optional
+        Chemical fomula : 'Si'
+
+    hlk : tuple, optional
+        The reflection : (2,2,0)
+
+    Returns
+    -------
+    width : float
+        Darwin width in degrees
+    """
+    ID = check_id(ID)
+    E = get_e(energy=E, correct_ev=False)
+    theta = bragg_angle(E=E, ID=ID, hkl=hkl)
+    F = structure_factor(ID, hkl)
+    width = (2*r_e*lam(E)**2*np.abs(F) /
+             (np.pi*unit_cell_volume(ID)*sind(2*theta)))
+    return np.rad2deg(width)
+
+def rocking_width(E=None, ID="Si", hkl=(2,2,0)):
+    """
+    Computes the expected Bragg angle and intrinsic rocking curve width of the
+    specified material, reflection and photon energy.
+
+    Parameters
+    ----------
+    E : float, optional
+        Photon energy in eV or keV (default is LCLS value)
+
+    ID : str, optional
+        Chemical fomula : 'Si'
+
+    hlk : tuple, optional
+        The reflection : (2,2,0)
+
+    Returns
+    -------
+    theta : float
+        Expected bragg angle in degrees
+
+    width : float
+        Darwin width in degrees
+    """
+    return bragg_angle(E=E, ID=ID, hkl=hkl), darwin_width(E=E, ID=ID, hkl=hkl)
+
 def snd_L(E1, E2, delay, gap=55):
     """
     Calculates the theta angles of the towers and the delay length based on the
@@ -0,0 +1,185 @@
+"""
+On-disk storage of the motor calibrations.
+"""
+import time
+import logging
+from pathlib import Path
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from .exceptions import InputError
+from .utils import DIR_CALIBRATIONS
+
+logger = logging.getLogger(__name__)
+
+
+class CalibrationStore(object):
+    """
+    Versioned store of motor calibrations saved as compressed numpy archives.
+
+    Every saved calibration is a new version, stored as
+    ``<directory>/<motor name>/<timestamp>.npz``. Each version contains the
+    correction table, the centroid scan, the quality metrics, the scales, the
+    start positions, the names of the calibration motors and the energy
+    configuration of the system when it was saved, so the right version can be
+    picked for the current energies.
+
+    Parameters
+    ----------
+    directory : str or Path, optional
+        Directory of the store. Defaults to the calibrations directory of the
+        package.
+    """
+    _frames = ("calib", "scan", "quality")
+    _arrays = ("scale", "start")
+
+    def __init__(self, directory=None):
+        self.directory = Path(directory or DIR_CALIBRATIONS)
+
+    def _motor_directory(self, name):
+        return self.directory / name
+
+    def save(self, name, calibration, energies=None):
+        """
+        Saves a new version of the calibration of a motor.
+
+        Parameters
+        ----------
+        name : str
+            Name of the calibrated motor.
+
+        calibration : dict
+            Calibration to save, as returned by :attr:`.CalibMotor.calibration`,
+            optionally with the quality metrics under "quality".
+
+        energies : dict, optional
+            Energy configuration of the system, for example
+            ``{'E1': 8, 'E2': 8}``.
+
+        Returns
+        -------
+        path : Path
+            Path of the saved version.
+        """
+        energies = OrderedDict(energies or {})
+        timestamp = time.time()
+        arrays = OrderedDict()
+        arrays['timestamp'] = np.array(timestamp)
+        arrays['motors'] = np.array(calibration.get('motors') or [], dtype=str)
+        arrays['energy_keys'] = np.array(list(energies.keys()), dtype=str)
+        arrays['energy_values'] = np.array(list(energies.values()),
+                                           dtype=float)
+        for key in self._frames:
+            df = calibration.get(key)
+            if df is None:
+                continue
+            arrays[key+'_values'] = df.values.astype(float)
+            arrays[key+'_columns'] = np.array(df.columns, dtype=str)
+            # Numeric indices are saved as floats and the others as strings
+            numeric = pd.api.types.is_numeric_dtype(df.index)
+            arrays[key+'_index'] = np.asarray(df.index, dtype=float if numeric
+                                              else str)
+        for key in self._arrays:
+            if calibration.get(key) is not None:
+                arrays[key] = np.array(calibration[key], dtype=float)
+
+        directory = self._motor_directory(name)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / "{0:.6f}.npz".format(timestamp)
+        np.savez_compressed(str(path), **arrays)
+        logger.info("Saved calibration of '{0}' to {1}.".format(name, path))
+        return path
+
+    def versions(self, name):
+        """
+        Lists the saved versions of the calibration of a motor.
+
+        Parameters
+        ----------
+        name : str
+            Name of the calibrated motor.
+
+        Returns
+        -------
+        versions : pd.DataFrame
+            DataFrame with one row per version, oldest first, containing the
+            timestamp, the path and one column per energy.
+        """
+        rows = []
+        for path in sorted(self._motor_directory(name).glob("*.npz")):
+            with np.load(str(path), allow_pickle=False) as data:
+                row = OrderedDict([('timestamp', float(data['timestamp'])),
+                                   ('path', path)])
+                row.update(zip(data['energy_keys'].tolist(),
+                               data['energy_values'].tolist()))
+            rows.append(row)
+        if not rows:
+            return pd.DataFrame(columns=['timestamp', 'path'])
+        versions = pd.DataFrame(rows)
+        return versions.sort_values('timestamp').reset_index(drop=True)
+
+    def load(self, name, version=None, energies=None):
+        """
+        Loads a saved version of the calibration of a motor.
+
+        Parameters
+        ----------
+        name : str
+            Name of the calibrated motor.
+
+        version : int, optional
+            Index of the version in :meth:`.versions`. Defaults to the latest.
+
+        energies : dict, optional
+            Energy configuration to match. The version with the closest
+            energies is loaded, the latest one among equally close versions.
+
+        Returns
+        -------
+        calibration : dict
+            Dictionary containing the calib, scan, quality, motors, scale,
+            start, timestamp and energies of the version. The quality is None
+            if it was not saved.
+
+        Raises
+        ------
+        InputError
+            If there are no saved calibrations for the motor.
+        """
+        versions = self.versions(name)
+        if versions.empty:
+            raise InputError("No saved calibrations for '{0}' in {1}.".format(
+                name, self.directory))
+        if version is None:
+            version = len(versions) - 1
+            if energies:
+                keys = [k for k in energies if k in versions.columns]
+                if keys:
+                    distance = np.sqrt(sum(
+                        (versions[k] - energies[k])**2 for k in keys))
+                    # Latest version among the closest ones
+                    closest = distance.fillna(np.inf).values
+                    version = np.flatnonzero(closest == closest.min())[-1]
+        path = versions.loc[version, 'path']
+
+        calibration = OrderedDict()
+        with np.load(str(path), allow_pickle=False) as data:
+            for key in self._frames:
+                if key+'_values' in data:
+                    calibration[key] = pd.DataFrame(
+                        data[key+'_values'],
+                        columns=data[key+'_columns'].tolist(),
+                        index=data[key+'_index'])
+                else:
+                    calibration[key] = None
+            calibration['motors'] = data['motors'].tolist() or None
+            for key in self._arrays:
+                calibration[key] = (data[key].tolist() if key in data else None)
+            calibration['timestamp'] = float(data['timestamp'])
+            calibration['energies'] = OrderedDict(zip(
+                data['energy_keys'].tolist(), data['energy_values'].tolist()))
+        logger.debug("Loaded calibration of '{0}' from {1}.".format(name,
+                                                                    path))
+        return calibration
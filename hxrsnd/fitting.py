@@ -0,0 +1,418 @@
+"""
+Fast peak fitting for the alignment plans.
+"""
+import logging
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+from bluesky.callbacks import CallbackBase
+from pswalker.callbacks import apply_filters
+
+logger = logging.getLogger(__name__)
+
+# Conversion between the Gaussian sigma and the half width of a pseudo-Voigt
+_S2LN2 = np.sqrt(2*np.log(2))
+
+
+def lorentzian(x, amplitude=1, center=0, sigma=1):
+    """
+    Lorentzian with the same parameterization as lmfit's ``LorentzianModel``,
+    where ``amplitude`` is the area and ``sigma`` the half width at half
+    maximum.
+    """
+    return amplitude / np.pi * sigma / ((x - center)**2 + sigma**2)
+
+def pseudo_voigt(x, amplitude=1, center=0, sigma=1, fraction=0.5):
+    """
+    Pseudo-Voigt with the same parameterization as lmfit's
+    ``PseudoVoigtModel``, where ``fraction`` is the Lorentzian fraction and
+    both components have the half width ``sigma``.
+    """
+    sigma_g = sigma / _S2LN2
+    gaussian = (np.exp(-(x - center)**2 / (2*sigma_g**2)) /
+                (sigma_g*np.sqrt(2*np.pi)))
+    return ((1 - fraction)*amplitude*gaussian +
+            fraction*lorentzian(x, amplitude, center, sigma))
+
+def _lorentzian_jacobian(x, amplitude, center, sigma):
+    """
+    Columns of the derivatives of the Lorentzian with respect to amplitude,
+    center and sigma.
+    """
+    d = x - center
+    denom = d**2 + sigma**2
+    return np.column_stack([sigma / (np.pi*denom),
+                            amplitude*sigma*2*d / (np.pi*denom**2),
+                            amplitude*(d**2 - sigma**2) / (np.pi*denom**2)])
+
+def _pseudo_voigt_jacobian(x, amplitude, center, sigma, fraction):
+    """
+    Columns of the derivatives of the pseudo-Voigt with respect to amplitude,
+    center, sigma and fraction.
+    """
+    d = x - center
+    sigma_g = sigma / _S2LN2
+    gaussian = (np.exp(-d**2 / (2*sigma_g**2)) /
+                (sigma_g*np.sqrt(2*np.pi)))
+    lorentz = lorentzian(x, 1, center, sigma)
+    jac_l = _lorentzian_jacobian(x, amplitude, center, sigma)
+    return np.column_stack([
+        (1 - fraction)*gaussian + fraction*lorentz,
+        (1 - fraction)*amplitude*gaussian*d/sigma_g**2 + fraction*jac_l[:, 1],
+        ((1 - fraction)*amplitude*gaussian*(d**2/sigma_g**2 - 1) /
+         (sigma_g*_S2LN2) + fraction*jac_l[:, 2]),
+        amplitude*(lorentz - gaussian)])
+
+
+FitParameter = namedtuple("FitParameter", ["value", "stderr"])
+
+
+class FitResult(object):
+    """
+    Result of a :class:`.PeakFitter` fit.
+
+    The ``values`` and ``params`` attributes mirror the ones of lmfit's
+    ``ModelResult`` so the result can be used in place of it.
+
+    Attributes
+    ----------
+    values : OrderedDict
+        Fitted value of every parameter.
+
+    params : OrderedDict
+        :class:`.FitParameter` of every parameter, with the value and the
+        standard error, None if it could not be estimated.
+
+    chisqr : float
+        Sum of the squared residuals.
+
+    nfev : int
+        Number of evaluations of the model.
+
+    success : bool
+        Whether the fit converged.
+    """
+    def __init__(self, names, values, stderr, chisqr, nfev, success):
+        self.values = OrderedDict(zip(names, values))
+        self.params = OrderedDict(
+            (name, FitParameter(value, err))
+            for name, value, err in zip(names, values, stderr))
+        self.chisqr = chisqr
+        self.nfev = nfev
+        self.success = success
+
+    def fit_report(self):
+        """
+        Returns a short text report of the fit.
+        """
+        lines = ["[[Fit Statistics]]",
+                 "    # function evals = {0}".format(self.nfev),
+                 "    chi-square       = {0:.6g}".format(self.chisqr),
+                 "    success          = {0}".format(self.success),
+                 "[[Variables]]"]
+        for name, param in self.params.items():
+            err = ("+/- {0:.6g}".format(param.stderr)
+                   if param.stderr is not None else "")
+            lines.append("    {0}: {1:.6g} {2}".format(name, param.value, err))
+        return "\n".join(lines)
+
+
+class PeakFitter(object):
+    """
+    Levenberg-Marquardt fitter of a single peak with analytic derivatives.
+
+    Initial guesses are computed in closed form from the data: the background
+    from the lowest point, the center from the first moment of the peak above
+    background, the width from the points above half maximum and the
+    amplitude from the peak height. Every fit is warm started from the
+    previous result, so refitting as points are added only takes a few
+    iterations.
+
+    Parameters
+    ----------
+    model : str, optional
+        Peak shape, "lorentzian" or "pseudo_voigt".
+
+    background : bool, optional
+        Add a constant background ``c`` to the peak.
+
+    warm_start : bool, optional
+        Start every fit from the previous result instead of a new guess.
+
+    max_iter : int, optional
+        Maximum number of iterations of each fit.
+    """
+    models = ("lorentzian", "pseudo_voigt")
+
+    def __init__(self, model="lorentzian", background=False, warm_start=True,
+                 max_iter=100):
+        if model not in self.models:
+            raise ValueError("Invalid peak model '{0}'. Must be one of {1}."
+                             "".format(model, self.models))
+        self.model = model
+        self.background = background
+        self.warm_start = warm_start
+        self.max_iter = max_iter
+        self.result = None
+        if model == "lorentzian":
+            self._func, self._jac = lorentzian, _lorentzian_jacobian
+            self.param_names = ["amplitude", "center", "sigma"]
+        else:
+            self._func, self._jac = pseudo_voigt, _pseudo_voigt_jacobian
+            self.param_names = ["amplitude", "center", "sigma", "fraction"]
+        self._n_peak = len(self.param_names)
+        if background:
+            self.param_names = self.param_names + ["c"]
+
+    def eval(self, x, **params):
+        """
+        Evaluates the model at the inputted positions.
+        """
+        x = np.asarray(x, dtype=float)
+        peak = [params[name] for name in self.param_names[:self._n_peak]]
+        return self._func(x, *peak) + (params['c'] if self.background else 0)
+
+    def _residuals(self, p, x, y):
+        return y - self._func(x, *p[:self._n_peak]) - (
+            p[-1] if self.background else 0)
+
+    def _jacobian(self, p, x):
+        jac = self._jac(x, *p[:self._n_peak])
+        if self.background:
+            jac = np.column_stack([jac, np.ones_like(x)])
+        return jac
+
+    def _project(self, p):
+        """
+        Keeps the width positive and the Lorentzian fraction within [0, 1].
+        """
+        p[2] = abs(p[2]) or 1e-12
+        if self.model == "pseudo_voigt":
+            p[3] = min(max(p[3], 0), 1)
+        return p
+
+    def guess(self, x, y):
+        """
+        Computes initial guesses of the parameters from the moments of the
+        data.
+
+        Parameters
+        ----------
+        x : array-like
+            Positions
+
+        y : array-like
+            Measured signal
+
+        Returns
+        -------
+        guess : OrderedDict
+            Guess of every parameter.
+        """
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        order = np.argsort(x)
+        x, y = x[order], y[order]
+        c = y.min() if self.background else 0
+        weights = np.clip(y - c, 0, None)
+        height = weights.max()
+        if height > 0:
+            center = np.sum(x*weights) / np.sum(weights)
+            above = x[weights >= height / 2]
+            fwhm = above[-1] - above[0]
+        else:
+            center, fwhm = x.mean(), 0
+        if not fwhm:
+            fwhm = np.min(np.diff(x)) if len(x) > 1 else 1
+        sigma = fwhm / 2
+        guess = OrderedDict([('amplitude', height*np.pi*sigma),
+                             ('center', center), ('sigma', sigma)])
+        if self.model == "pseudo_voigt":
+            guess['fraction'] = 0.5
+            guess['amplitude'] = height / pseudo_voigt(center, 1, center,
+                                                       sigma, 0.5)
+        if self.background:
+            guess['c'] = c
+        return guess
+
+    def fit(self, x, y, init_guess=None):
+        """
+        Fits the model to the data.
+
+        Parameters
+        ----------
+        x : array-like
+            Positions
+
+        y : array-like
+            Measured signal
+
+        init_guess : dict, optional
+            Starting values of some or all of the parameters. The other
+            parameters start from the previous result when warm starting, or
+            from :meth:`.guess`.
+
+        Returns
+        -------
+        result : :class:`.FitResult`
+            Result of the fit, also saved as ``result``.
+        """
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        starts = [self.guess(x, y)]
+        if self.warm_start and self.result is not None:
+            starts.insert(0, OrderedDict(self.result.values))
+        # Start from whichever of the previous result and the guess fits best
+        cost = np.inf
+        for start in starts:
+            start.update({k: v for k, v in (init_guess or {}).items()
+                          if k in start})
+            candidate = self._project(np.array(
+                [start[n] for n in self.param_names], dtype=float))
+            candidate_residuals = self._residuals(candidate, x, y)
+            candidate_cost = candidate_residuals @ candidate_residuals
+            if candidate_cost < cost:
+                p, residuals = candidate, candidate_residuals
+                cost = candidate_cost
+        nfev = len(starts)
+        success = False
+        damping = 1e-3
+        for _ in range(self.max_iter):
+            jac = self._jacobian(p, x)
+            jtj = jac.T @ jac
+            gradient = jac.T @ residuals
+            # Increase the damping until the step reduces the cost
+            while damping < 1e12:
+                lhs = jtj + damping*np.diag(np.diag(jtj) + 1e-12)
+                try:
+                    step = np.linalg.solve(lhs, gradient)
+                except np.linalg.LinAlgError:
+                    damping *= 10
+                    continue
+                p_new = self._project(p + step)
+                new_residuals = self._residuals(p_new, x, y)
+                new_cost = new_residuals @ new_residuals
+                nfev += 1
+                if new_cost <= cost:
+                    break
+                damping *= 10
+            else:
+                # No step reduces the cost, we are at the minimum
+                success = True
+                break
+            improvement = cost - new_cost
+            p, residuals, cost = p_new, new_residuals, new_cost
+            damping = max(damping / 10, 1e-12)
+            if improvement <= 1e-12*max(cost, 1e-300):
+                success = True
+                break
+
+        # Standard errors from the covariance at the solution
+        jac = self._jacobian(p, x)
+        dof = len(x) - len(p)
+        stderr = [None]*len(p)
+        if dof > 0:
+            try:
+                covariance = np.linalg.inv(jac.T @ jac) * cost / dof
+                stderr = [float(np.sqrt(v)) if v >= 0 else None
+                          for v in np.diag(covariance)]
+            except np.linalg.LinAlgError:
+                logger.debug("Singular jacobian, no standard errors.")
+        self.result = FitResult(self.param_names, p.tolist(), stderr, cost,
+                                nfev, success)
+        return self.result
+
+
+class LivePeakFit(CallbackBase):
+    """
+    Callback that fits a :class:`.PeakFitter` to the event stream, in the same
+    way as ``pswalker.callbacks.LiveBuild``.
+
+    Parameters
+    ----------
+    fitter : :class:`.PeakFitter`
+        Fitter to use.
+
+    y : str
+        Key of the measured signal.
+
+    x : str
+        Key of the positions.
+
+    init_guess : dict, optional
+        Initial guesses of the parameters used by the first fit.
+
+    refit_every : int, optional
+        Number of new points between refits. The fit is always updated once
+        there are enough points for the first fit.
+
+    filters : dict, optional
+        Filters used to drop events, see :meth:`.apply_filters`.
+
+    drop_missing : bool, optional
+        Drop events missing a filter key.
+
+    average : int, optional
+        Number of events averaged into every point.
+    """
+    def __init__(self, fitter, y, x, init_guess=None, refit_every=1,
+                 filters=None, drop_missing=True, average=1):
+        super().__init__()
+        self.fitter = fitter
+        self.y = y
+        self.x = x
+        self.init_guess = init_guess or {}
+        self.refit_every = refit_every
+        self.filters = filters or {}
+        self.drop_missing = drop_missing
+        self.average = average
+        self.xdata, self.ydata = [], []
+        self._avg_cache = []
+        self._stale = False
+
+    @property
+    def result(self):
+        """
+        Latest fit result, None before the first fit.
+        """
+        return self.fitter.result
+
+    def event(self, doc):
+        data = doc['data']
+        if self.y not in data or self.x not in data:
+            return
+        if not apply_filters(data, filters=self.filters,
+                             drop_missing=self.drop_missing):
+            return
+        self._avg_cache.append(data)
+        if len(self._avg_cache) < self.average:
+            return
+        self.xdata.append(np.mean([d[self.x] for d in self._avg_cache]))
+        self.ydata.append(np.mean([d[self.y] for d in self._avg_cache]))
+        self._avg_cache.clear()
+        self._stale = True
+
+        n_points = len(self.ydata)
+        n_params = len(self.fitter.param_names)
+        if n_points >= n_params and (self.result is None or
+                                     (n_points - n_params) %
+                                     self.refit_every == 0):
+            self.update_fit()
+
+    def update_fit(self):
+        """
+        Refits the model to all the points collected.
+        """
+        if len(self.ydata) < len(self.fitter.param_names):
+            logger.debug("Not enough points to fit yet.")
+            return
+        # The initial guess only seeds the first fit, later fits warm start
+        init_guess = self.init_guess if self.result is None else None
+        self.fitter.fit(self.xdata, self.ydata, init_guess)
+        self._stale = False
+
+    def stop(self, doc):
+        # Make sure the final result includes every point
+        if self._stale:
+            self.update_fit()
+        super().stop(doc)
@@ -0,0 +1,322 @@
+"""
+Parallel homing of the aerotech stages in the SnD towers.
+"""
+import time
+import logging
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from ophyd.utils import LimitError
+
+from .aerotech import AeroBase, InterlockedAero
+from .exceptions import SndException
+from .utils import as_list
+
+logger = logging.getLogger(__name__)
+
+
+class _HomingNode(ABC):
+    """
+    Base node of the homing dependency graph.
+    """
+    def __init__(self, name, requires=None):
+        self.name = name
+        self.requires = as_list(requires)
+        self.state = "waiting"
+        self.start_time = np.nan
+        self.end_time = np.nan
+        self.error = None
+
+    def start(self):
+        """
+        Starts the action of the node.
+        """
+        self.start_time = time.time()
+        self.state = "running"
+
+    @property
+    @abstractmethod
+    def done(self):
+        """
+        Returns if the action of the node has completed.
+        """
+
+    def finish(self, state="done", error=None):
+        """
+        Marks the node as finished with the inputted state.
+        """
+        self.end_time = time.time()
+        self.state = state
+        self.error = error
+        if error is not None:
+            logger.error("Homing step '{0}' {1}: {2}".format(self.name, state,
+                                                           error))
+
+
+class _PressureNode(_HomingNode):
+    """
+    Opens the N2 valve of a tower and waits for the pressure switch to read
+    good.
+    """
+    def __init__(self, name, valve, pressure):
+        super().__init__(name)
+        self.valve = valve
+        self.pressure = pressure
+
+    def start(self):
+        super().start()
+        logger.info("Pressurizing the air bearings of '{0}'.".format(
+            self.pressure.desc))
+        self.valve.open()
+
+    @property
+    def done(self):
+        return self.pressure.good
+
+
+class _AxisNode(_HomingNode):
+    """
+    Homes a single aerotech axis and verifies the dial position afterwards.
+    """
+    def __init__(self, axis, direction="forward", requires=None,
+                 start_timeout=2):
+        super().__init__(axis.name, requires=requires)
+        self.axis = axis
+        self.direction = direction
+        self.start_timeout = start_timeout
+        self._seen_moving = False
+        self.dial = np.nan
+
+    def start(self):
+        super().start()
+        home = self.axis.homf if self.direction == "forward" else self.axis.homr
+        home(print_set=False)
+
+    @property
+    def done(self):
+        moving = not self.axis.motor_done_move.get()
+        if moving:
+            self._seen_moving = True
+            return False
+        # Give the motor record a chance to register the homing request before
+        # assuming the axis was already at home
+        return (self._seen_moving or
+                time.time() - self.start_time > self.start_timeout)
+
+    def verify(self, home_dial=0, tolerance=0.01):
+        """
+        Checks that the dial readback is at the home position.
+
+        Returns
+        -------
+        verified : bool
+            True if the dial is within the tolerance of the home position.
+        """
+        self.dial = self.axis.dial.get()
+        return bool(np.isclose(self.dial, home_dial, atol=tolerance))
+
+
+class HomingSequencer(object):
+    """
+    Homes all the aerotech axes of the SnD towers in parallel.
+
+    A dependency graph is built across the tower axes where every
+    :class:`.InterlockedAero` axis depends on the N2 pressure of its tower. The
+    sequencer starts every step as soon as its dependencies are satisfied, so
+    the air bearings are pressurized while the independent axes are already
+    homing, and the interlocked axes start as soon as their tower reads good
+    pressure. Homed axes are verified using the dial readback (``.DRBV``).
+
+    Parameters
+    ----------
+    snd : :class:`.SplitAndDelay`
+        System containing the towers and the air bearing pneumatics.
+
+    axes : list, optional
+        Aerotech axes to home. Defaults to all the aerotech axes in the towers.
+
+    direction : str or dict, optional
+        Homing direction, "forward" or "reverse". A dictionary of axis names to
+        directions can be passed to home axes in different directions.
+
+    home_dial : float, optional
+        Expected dial position of the axes once homed.
+
+    tolerance : float, optional
+        Tolerance of the dial verification.
+
+    pressure_timeout : float, optional
+        Time in seconds to wait for the pressure to read good.
+
+    home_timeout : float, optional
+        Time in seconds to wait for all the axes to finish homing.
+
+    poll : float, optional
+        Interval in seconds between checks of the running steps.
+    """
+    def __init__(self, snd, axes=None, direction="forward", home_dial=0,
+                 tolerance=0.01, pressure_timeout=30, home_timeout=300,
+                 poll=0.1):
+        self.snd = snd
+        self.axes = as_list(axes) or self._tower_axes()
+        self.direction = direction
+        self.home_dial = home_dial
+        self.tolerance = tolerance
+        self.pressure_timeout = pressure_timeout
+        self.home_timeout = home_timeout
+        self.poll = poll
+        self.graph = self._build_graph()
+
+    def _tower_axes(self):
+        """
+        Returns all the aerotech axes in the towers of the system.
+        """
+        axes = []
+        for tower in self.snd._towers:
+            for comp_name in tower.component_names:
+                component = getattr(tower, comp_name)
+                if isinstance(component, AeroBase):
+                    axes.append(component)
+        return axes
+
+    def _get_direction(self, axis):
+        """
+        Returns the homing direction of the inputted axis.
+        """
+        if isinstance(self.direction, dict):
+            direction = self.direction.get(axis.name, "forward")
+        else:
+            direction = self.direction
+        if direction not in ("forward", "reverse"):
+            raise ValueError("Invalid homing direction '{0}'. Must be "
+                             "'forward' or 'reverse'.".format(direction))
+        return direction
+
+    def _build_graph(self):
+        """
+        Builds the dependency graph of the homing steps.
+
+        Returns
+        -------
+        graph : OrderedDict
+            Dictionary of step names to steps. Pressure steps are listed before
+            the axes that require them.
+        """
+        graph = OrderedDict()
+        for axis in self.axes:
+            requires = None
+            if isinstance(axis, InterlockedAero):
+                tower = axis._tower.lower()
+                requires = "{0}_pressure".format(tower)
+                if requires not in graph:
+                    graph[requires] = _PressureNode(
+                        requires,
+                        getattr(self.snd.ab, "{0}_valve".format(tower)),
+                        getattr(self.snd.ab, "{0}_pressure".format(tower)))
+            graph[axis.name] = _AxisNode(axis, self._get_direction(axis),
+                                         requires=requires)
+        return graph
+
+    def _ready(self, node):
+        """
+        Returns if all the dependencies of the node finished successfully.
+        """
+        return all(self.graph[req].state == "done" for req in node.requires)
+
+    def _blocked(self, node):
+        """
+        Returns if any of the dependencies of the node failed.
+        """
+        return any(self.graph[req].state in ("failed", "skipped")
+                   for req in node.requires)
+
+    def _start(self, node):
+        """
+        Starts a step, marking it failed if the start raises.
+        """
+        try:
+            node.start()
+        except (SndException, LimitError) as e:
+            node.finish("failed", e)
+
+    def _timed_out(self, node, now):
+        """
+        Returns if a running step has exceeded its timeout.
+        """
+        timeout = (self.pressure_timeout if isinstance(node, _PressureNode)
+                   else self.home_timeout)
+        return now - node.start_time > timeout
+
+    def run(self, print_report=True):
+        """
+        Runs the homing sequence, blocking until every step finished.
+
+        Parameters
+        ----------
+        print_report : bool, optional
+            Log the timeline report instead of returning it.
+
+        Returns
+        -------
+        report : pd.DataFrame
+            Timeline of every step relative to the start of the sequence, the
+            final state, and for the axes the dial readback and whether it was
+            verified.
+        """
+        t0 = time.time()
+        logger.info("Homing {0} axes.".format(len(self.axes)))
+        try:
+            while any(n.state in ("waiting", "running")
+                      for n in self.graph.values()):
+                now = time.time()
+                for node in self.graph.values():
+                    if node.state == "waiting":
+                        if self._blocked(node):
+                            node.finish("skipped", "dependency failed")
+                        elif self._ready(node):
+                            self._start(node)
+                    elif node.state == "running":
+                        if node.done:
+                            node.finish()
+                        elif self._timed_out(node, now):
+                            if isinstance(node, _AxisNode):
+                                node.axis.stop()
+                            node.finish("failed", "timed out")
+                time.sleep(self.poll)
+        except KeyboardInterrupt:
+            for node in self.graph.values():
+                if isinstance(node, _AxisNode) and node.state == "running":
+                    node.axis.stop()
+                    node.finish("stopped")
+            logger.info("Homing stopped by keyboard interrupt.")
+
+        report = self._report(t0)
+        if print_report:
+            logger.info("\n{0}".format(report))
+        else:
+            return report
+
+    def _report(self, t0):
+        """
+        Builds the timeline report, verifying the homed axes.
+        """
+        rows = OrderedDict()
+        for name, node in self.graph.items():
+            row = OrderedDict([('start', node.start_time - t0),
+                               ('end', node.end_time - t0),
+                               ('duration', node.end_time - node.start_time),
+                               ('state', node.state),
+                               ('dial', np.nan),
+                               ('verified', None)])
+            if isinstance(node, _AxisNode) and node.state == "done":
+                row['verified'] = node.verify(self.home_dial, self.tolerance)
+                row['dial'] = node.dial
+                if not row['verified']:
+                    logger.warning("Axis '{0}' finished homing with dial {1}, "
+                                   "expected {2}.".format(
+                                       node.axis.desc, node.dial,
+                                       self.home_dial))
+            rows[name] = row
+        return pd.DataFrame.from_dict(rows, orient='index')
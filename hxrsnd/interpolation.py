@@ -0,0 +1,251 @@
+"""
+Interpolation of the calibration tables used for corrected motions.
+"""
+import logging
+
+import numpy as np
+from scipy.interpolate import (CubicSpline, PchipInterpolator,
+                               RegularGridInterpolator, LinearNDInterpolator,
+                               NearestNDInterpolator)
+
+from .exceptions import InputError
+
+logger = logging.getLogger(__name__)
+
+
+class CalibrationTable(object):
+    """
+    Correction table compiled into sorted contiguous arrays for fast lookups.
+
+    The first column of the table is the position of the main motor and the
+    remaining columns are the positions of the calibration motors. Linear
+    lookups use a binary search into the sorted main motor positions and
+    extrapolate linearly using the outermost segments. Cubic spline and PCHIP
+    lookups use the scipy interpolators, extrapolating the end polynomials.
+
+    Parameters
+    ----------
+    calib : pd.DataFrame
+        Correction table with the main motor positions in the first column.
+
+    method : str, optional
+        Interpolation method, "linear", "cubic" or "pchip".
+    """
+    methods = ("linear", "cubic", "pchip")
+
+    def __init__(self, calib, method="linear"):
+        if method not in self.methods:
+            raise ValueError("Invalid interpolation method '{0}'. Must be one "
+                             "of {1}.".format(method, self.methods))
+        self.method = method
+        self.columns = list(calib.columns[1:])
+
+        calib = calib.dropna()
+        x = calib.iloc[:, 0].values.astype(float)
+        y = calib.iloc[:, 1:].values.astype(float)
+
+        # Sort by the main motor position, averaging repeated positions
+        x, inverse, counts = np.unique(x, return_inverse=True,
+                                       return_counts=True)
+        summed = np.zeros((len(x), y.shape[1]))
+        np.add.at(summed, inverse, y)
+        y = summed / counts[:, np.newaxis]
+
+        if len(x) < 2:
+            raise InputError("Calibration tables need at least two distinct "
+                             "main motor positions to interpolate. Got {0}."
+                             "".format(len(x)))
+        self.x = np.ascontiguousarray(x)
+        self.y = np.ascontiguousarray(y)
+
+        if method == "cubic":
+            self._interpolator = CubicSpline(self.x, self.y, axis=0,
+                                             extrapolate=True)
+        elif method == "pchip":
+            self._interpolator = PchipInterpolator(self.x, self.y, axis=0,
+                                                   extrapolate=True)
+        else:
+            self._interpolator = self._linear
+
+    def _linear(self, positions):
+        """
+        Linear interpolation using a binary search into the table.
+        """
+        # Clipping the indices extrapolates using the end segments
+        idx = np.clip(np.searchsorted(self.x, positions), 1, len(self.x) - 1)
+        x0, x1 = self.x[idx - 1], self.x[idx]
+        weights = ((positions - x0) / (x1 - x0))[:, np.newaxis]
+        return self.y[idx - 1] + weights * (self.y[idx] - self.y[idx - 1])
+
+    @property
+    def bounds(self):
+        """
+        Returns the range of main motor positions covered by the table.
+        """
+        return self.x[0], self.x[-1]
+
+    def __call__(self, positions):
+        """
+        Returns the calibration motor positions at the inputted main motor
+        positions.
+
+        Parameters
+        ----------
+        positions : float or array-like
+            Main motor positions.
+
+        Returns
+        -------
+        calib_positions : np.ndarray
+            Array of shape (n_motors,) for a single position, otherwise of
+            shape (n_positions, n_motors).
+        """
+        scalar = np.ndim(positions) == 0
+        positions = np.atleast_1d(np.asarray(positions, dtype=float))
+        if ((positions < self.x[0]) | (positions > self.x[-1])).any():
+            logger.debug("Extrapolating the calibration table outside of "
+                         "{0}.".format(self.bounds))
+        calib_positions = self._interpolator(positions)
+        return calib_positions[0] if scalar else calib_positions
+
+    def __len__(self):
+        return len(self.x)
+
+
+class GridCalibrationTable(object):
+    """
+    Multi-dimensional correction table, for example corrections as a function
+    of both the delay energy and the delay.
+
+    The axis columns are all the columns of the table that do not end in
+    "_post", and the remaining columns are the positions of the calibration
+    motors. Tables that fill a full regular grid are interpolated using
+    :class:`scipy.interpolate.RegularGridInterpolator`, extrapolating linearly
+    outside of the grid. Any other set of points is triangulated and
+    interpolated as scattered data, falling back to the nearest point outside
+    of the convex hull of the table.
+
+    Parameters
+    ----------
+    calib : pd.DataFrame
+        Correction table with the axis columns and the "_post" columns.
+
+    method : str, optional
+        Interpolation method, "linear" or "nearest".
+    """
+    methods = ("linear", "nearest")
+
+    def __init__(self, calib, method="linear"):
+        if method not in self.methods:
+            raise ValueError("Invalid interpolation method '{0}'. Must be one "
+                             "of {1}.".format(method, self.methods))
+        self.method = method
+        self.axes = grid_axes(calib)
+        self.columns = [c for c in calib.columns if c not in self.axes]
+        if len(self.axes) < 2 or not self.columns:
+            raise InputError("Grid calibration tables need at least two axis "
+                             "columns and one '_post' column. Got {0}.".format(
+                                 list(calib.columns)))
+
+        calib = calib.dropna()
+        points = calib[self.axes].values.astype(float)
+        values = calib[self.columns].values.astype(float)
+        self.grid = [np.unique(points[:, i]) for i in range(len(self.axes))]
+        shape = tuple(len(g) for g in self.grid)
+        self._size = len(points)
+        unique_points = len(np.unique(points, axis=0))
+        self.regular = (unique_points == len(points) == np.prod(shape) and 
+                        min(shape) > 1)
+
+        if self.regular:
+            # Place every row of the table at its spot in the grid
+            grid_values = np.empty(shape + (len(self.columns),))
+            idx = tuple(np.searchsorted(g, points[:, i]) 
+                        for i, g in enumerate(self.grid))
+            grid_values[idx] = values
+            self._interpolator = RegularGridInterpolator(
+                self.grid, grid_values, method=method, bounds_error=False,
+                fill_value=None)
+        else:
+            # Normalize the axes so the triangulation does not depend on units
+            self._offset = points.min(axis=0)
+            self._scale = np.ptp(points, axis=0)
+            self._scale[self._scale == 0] = 1
+            normalized = (points - self._offset) / self._scale
+            self._nearest = NearestNDInterpolator(normalized, values)
+            if method == "linear":
+                try:
+                    self._linear = LinearNDInterpolator(normalized, values)
+                except (RuntimeError, ValueError) as e:
+                    logger.debug(e)
+                    raise InputError("Could not triangulate the calibration "
+                                     "points, they may all lie on a line.")
+            self._interpolator = self._scattered
+
+    def _scattered(self, points):
+        """
+        Scattered data interpolation with a nearest point fallback.
+        """
+        normalized = (points - self._offset) / self._scale
+        if self.method == "nearest":
+            return self._nearest(normalized)
+        values = self._linear(normalized)
+        outside = np.isnan(values).any(axis=1)
+        if outside.any():
+            values[outside] = self._nearest(normalized[outside])
+        return values
+
+    def __call__(self, points):
+        """
+        Returns the calibration motor positions at the inputted points.
+
+        Parameters
+        ----------
+        points : array-like
+            Point of shape (n_axes,) or array of points of shape 
+            (n_points, n_axes), with the axes ordered as in ``axes``.
+
+        Returns
+        -------
+        calib_positions : np.ndarray
+            Array of shape (n_motors,) for a single point, otherwise of shape
+            (n_points, n_motors).
+        """
+        points = np.asarray(points, dtype=float)
+        single = points.ndim == 1
+        points = np.atleast_2d(points)
+        if points.shape[1] != len(self.axes):
+            raise ValueError("Expected points with {0} coordinates {1}, got "
+                             "{2}.".format(len(self.axes), self.axes, 
+                                           points.shape[1]))
+        calib_positions = self._interpolator(points)
+        return calib_positions[0] if single else calib_positions
+
+    def __len__(self):
+        return self._size
+
+
+def grid_axes(calib):
+    """
+    Returns the axis columns of a correction table, all the columns that do
+    not end in "_post".
+
+    Parameters
+    ----------
+    calib : pd.DataFrame
+        Correction table.
+
+    Returns
+    -------
+    axes : list
+        Names of the axis columns.
+    """
+    return [c for c in calib.columns if not str(c).endswith("_post")]
+
+
+def is_grid_table(calib):
+    """
+    Returns if a correction table has several axis columns as well as "_post"
+    columns, and should be interpolated as a :class:`.GridCalibrationTable`.
+    """
+    return 1 < len(grid_axes(calib)) < len(calib.columns)
@@ -381,21 +381,21 @@ class DelayTowerMacro(MacroBase):
         delay : float
             The desired delay in picoseconds.
 
-        theta1 : float or None, optional
-            Bragg angle the delay line is set to maximize.
+        theta1 : float, array-like or None, optional
+            Bragg angle the delay line is set to maximize, or array of angles.
 
         theta2 : float or None, optional
             Bragg angle the channel cut line is set to maximize.
 
         Returns
         -------
-        length : float
+        length : float or np.ndarray
             The distance between the delay crystal and the splitting or
             recombining crystal.
         """
-        # Check if any other inputs were used
-        theta1 = theta1 or self.parent.theta1
-        theta2 = theta2 or self.parent.theta2
+        # Check if any other inputs were used, allowing arrays of angles
+        theta1 = self.parent.theta1 if theta1 is None else np.asarray(theta1)
+        theta2 = self.parent.theta2 if theta2 is None else theta2
 
         # Length calculation
         length = ((delay*self.c/2 + self.gap*(1 - cosd(2*theta2)) /
@@ -410,7 +410,7 @@ class DelayTowerMacro(MacroBase):
 
         Parameters
         ----------
-        E1 : float or None, optional
+        E1 : float, array-like or None, optional
             Energy in eV to use for the delay line. Uses the current energy if 
             None is inputted.
 
@@ -424,9 +424,9 @@ class DelayTowerMacro(MacroBase):
 
         Returns
         -------
-        position : float
+        position : float or np.ndarray
             Position in mm the delay diagnostic should move to given the 
-            inputted parameters.
+            inputted parameters, an array for an array of energies.
         """
         # Use current bragg angle
         if E1 is None:
@@ -487,6 +487,7 @@ class DelayMacro(CalibMotor, DelayTowerMacro):
             self.calib_motors=[self.parent.t1.chi1, self.parent.t1.y1]
             self.calib_fields=[field_prepend('user_readback', calib_motor)
                                for calib_motor in self.calib_motors]
+            self.calib_grid_motors=[self.parent.E1]
             self.calib_detector=PCDSDetector('XCS:USR:O1000:01', name='Opal 1')
             self.detector_fields=['stats2_centroid_x', 'stats2_centroid_y',]
 
@@ -498,8 +499,8 @@ class DelayMacro(CalibMotor, DelayTowerMacro):
 
         Parameters
         ----------
-        L : float or None, optional
-            Position of the linear delay stage.
+        L : float, array-like or None, optional
+            Position of the linear delay stage, or array of positions.
         
         theta1 : float or None, optional
             Bragg angle the delay line is set to maximize.
@@ -509,13 +510,13 @@ class DelayMacro(CalibMotor, DelayTowerMacro):
 
         Returns
         -------
-        delay : float
-            The delay of the system in picoseconds.
+        delay : float or np.ndarray
+            The delay of the system in picoseconds, for every inputted length.
         """
-        # Check if any other inputs were used
-        L = L or self.parent.t1.length
-        theta1 = theta1 or self.parent.theta1
-        theta2 = theta2 or self.parent.theta2
+        # Check if any other inputs were used, allowing arrays of lengths
+        L = self.parent.t1.length if L is None else np.asarray(L)
+        theta1 = self.parent.theta1 if theta1 is None else theta1
+        theta2 = self.parent.theta2 if theta2 is None else theta2
 
         # Delay calculation
         delay = (2*(L*(1 - cosd(2*theta1)) - self.gap*(1 - cosd(2*theta2)) /
@@ -655,9 +656,10 @@ class DelayMacro(CalibMotor, DelayTowerMacro):
             # Move the delay diagnostic to the inputted position
             status += [self.parent.dd.x.move(position_dd, wait=False)]
 
-        # Perform the compensation
-        if self.has_calib and self.use_calib:
-            status.append(self._calib_compensate(delay))
+        # Perform the compensation, loading a saved calibration if needed
+        calib_status = self._calib_compensate(delay)
+        if calib_status is not None:
+            status.append(calib_status)
     
         return status
 
@@ -712,10 +714,33 @@ class DelayMacro(CalibMotor, DelayTowerMacro):
             logger.info("Setting positions for delay to {0}.".format(delay))
 
 
-class Energy1Macro(DelayTowerMacro):
+class Energy1Macro(CalibMotor, DelayTowerMacro):
     """
     Macro-motor for the energy 1 macro-motor.
+
+    Energy changes shift the pointing of the delay line, so a calibration can
+    be configured to correct it with the first crystal attocubes of t1. The
+    corrections are moved alongside the energy motors.
+
+    The delay calibration also moves the t1 attocubes, to absolute positions.
+    The energy corrections are therefore applied as offsets, the change of the
+    table between the current and the target energies, so they add to the
+    delay corrections. A delay move afterwards resets the attocubes to the
+    delay table, which only holds at the energy it was taken at. Delay 
+    calibrations used over several energies should be (E1, delay) grids.
     """
+    calib_relative = True
+
+    def __init__(self, prefix, name=None, *args, **kwargs):
+        super().__init__(prefix, name=name, *args, **kwargs)
+        if self.parent:
+            self.motor_fields=['readback']
+            self.calib_motors=[self.parent.t1.chi1, self.parent.t1.y1]
+            self.calib_fields=[field_prepend('user_readback', calib_motor)
+                               for calib_motor in self.calib_motors]
+            self.calib_detector=PCDSDetector('XCS:USR:O1000:01', name='Opal 1')
+            self.detector_fields=['stats2_centroid_x', 'stats2_centroid_y',]
+
     # @property
     # def aligned(self, rtol=0, atol=0.001):
     #     """
@@ -750,8 +775,8 @@ class Energy1Macro(DelayTowerMacro):
 
         Parameters
         ----------
-        L : float or None, optional
-            Position of the linear delay stage.
+        L : float, array-like or None, optional
+            Position of the linear delay stage, or array of positions.
         
         theta1 : float or None, optional
             Bragg angle the delay line is set to maximize.
@@ -761,13 +786,13 @@ class Energy1Macro(DelayTowerMacro):
 
         Returns
         -------
-        delay : float
-            The delay of the system in picoseconds.
+        delay : float or np.ndarray
+            The delay of the system in picoseconds, for every inputted length.
         """
-        # Check if any other inputs were used
-        L = L or self.parent.t1.length
-        theta1 = theta1 or self.parent.theta1
-        theta2 = theta2 or self.parent.theta2
+        # Check if any other inputs were used, allowing arrays of lengths
+        L = self.parent.t1.length if L is None else np.asarray(L)
+        theta1 = self.parent.theta1 if theta1 is None else theta1
+        theta2 = self.parent.theta2 if theta2 is None else theta2
 
         # Delay calculation
         delay = (2*(L*(1 - cosd(2*theta1)) - self.gap*(1 - cosd(2*theta2)) /
@@ -891,6 +916,10 @@ class Energy1Macro(DelayTowerMacro):
         status : list
             Nested list of status objects from each tower.
         """
+        # Start the compensation while the energy is unchanged, loading a 
+        # saved calibration if needed
+        calib_status = self._calib_compensate(E1)
+
         # Move the towers to the specified energy
         status = [tower.set_energy(E1, wait=False, check_status=False) for
                    tower in self._delay_towers]
@@ -901,6 +930,9 @@ class Energy1Macro(DelayTowerMacro):
         if use_diag:
             status += [self.parent.dd.x.move(position_dd, wait=False)]
 
+        if calib_status is not None:
+            status.append(calib_status)
+
         return status
 
     def _get_delay_diagnostic_position(self, E1=None):
@@ -1097,6 +1129,10 @@ class Energy1CCMacro(Energy1Macro):
         status : list
             Nested list of status objects from each tower.
         """
+        # Start the compensation while the energy is unchanged, loading a 
+        # saved calibration if needed
+        calib_status = self._calib_compensate(E1)
+
         # Move the towers to the specified energy
         status = [tower.tth.move(2*bragg_angle(E1), wait=False, 
                                  check_status=False)
@@ -1108,6 +1144,9 @@ class Energy1CCMacro(Energy1Macro):
         if use_diag:
             status += [self.parent.dd.x.move(position_dd, wait=False)]
 
+        if calib_status is not None:
+            status.append(calib_status)
+
         return status
 
     def set_position(self, E1=None, print_set=True, verify_move=True,
@@ -1150,10 +1189,25 @@ class Energy1CCMacro(Energy1Macro):
             logger.info("Setting positions for E1 to {0}.".format(E1))
 
 
-class Energy2Macro(MacroBase):
+class Energy2Macro(CalibMotor, MacroBase):
     """
     Macro-motor for the energy 2 macro-motor.
+
+    The channel cut towers have no attocubes, so the pointing of the channel 
+    cut line is corrected with the second crystal attocubes of t4, which 
+    recombine both lines, as seen on the channel cut diagnostic camera. The
+    corrections are moved alongside the energy motors.
     """
+    def __init__(self, prefix, name=None, *args, **kwargs):
+        super().__init__(prefix, name=name, *args, **kwargs)
+        if self.parent:
+            self.motor_fields=['readback']
+            self.calib_motors=[self.parent.t4.chi2, self.parent.t4.y2]
+            self.calib_fields=[field_prepend('user_readback', calib_motor)
+                               for calib_motor in self.calib_motors]
+            self.calib_detector=self.parent.dcc.cam
+            self.detector_fields=['stats2_centroid_x', 'stats2_centroid_y',]
+
     def _get_channelcut_diagnostic_position(self, E2=None):
         """
         Gets the position the channel cut diagnostic needs to move to based on 
@@ -1336,6 +1390,11 @@ class Energy2Macro(MacroBase):
         # Log the energy change
         logger.debug("Setting E2 to {0}.".format(E2))
 
+        # Perform the compensation, loading a saved calibration if needed
+        calib_status = self._calib_compensate(E2)
+        if calib_status is not None:
+            status.append(calib_status)
+
         return status        
 
     @property
@@ -0,0 +1,620 @@
+"""
+Monitor-rate data collection for the SnD motors.
+"""
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from ophyd.signal import Signal
+
+from .utils import as_list
+
+logger = logging.getLogger(__name__)
+
+
+class RingBuffer(object):
+    """
+    Fixed size circular buffer of timestamped values backed by preallocated
+    numpy arrays.
+
+    Parameters
+    ----------
+    size : int
+        Maximum number of entries held by the buffer. Once full, the oldest
+        entries are overwritten.
+
+    width : int, optional
+        Number of values stored per entry.
+    """
+    def __init__(self, size, width=1):
+        self.size = int(size)
+        self.width = int(width)
+        self._timestamps = np.full(self.size, np.nan)
+        self._values = np.full((self.size, self.width), np.nan)
+        self._index = 0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def append(self, timestamp, *values):
+        """
+        Adds an entry to the buffer, overwriting the oldest if it is full.
+
+        Parameters
+        ----------
+        timestamp : float
+            Timestamp of the entry.
+
+        values : float
+            Values of the entry. Missing values are filled with nan.
+        """
+        with self._lock:
+            self._timestamps[self._index] = timestamp
+            self._values[self._index, :] = np.nan
+            self._values[self._index, :len(values)] = values
+            self._index = (self._index + 1) % self.size
+            self._count = min(self._count + 1, self.size)
+
+    def clear(self):
+        """
+        Empties the buffer without reallocating it.
+        """
+        with self._lock:
+            self._timestamps[:] = np.nan
+            self._values[:] = np.nan
+            self._index = 0
+            self._count = 0
+
+    @property
+    def full(self):
+        """
+        Returns if the buffer has wrapped around.
+        """
+        return self._count == self.size
+
+    def _ordered(self, array):
+        """
+        Returns a chronologically ordered copy of the valid part of an array.
+        """
+        with self._lock:
+            if self._count < self.size:
+                return array[:self._count].copy()
+            return np.roll(array, -self._index, axis=0)
+
+    @property
+    def timestamps(self):
+        """
+        Returns the timestamps of the entries, oldest first.
+
+        Returns
+        -------
+        timestamps : np.ndarray
+        """
+        return self._ordered(self._timestamps)
+
+    @property
+    def values(self):
+        """
+        Returns the values of the entries, oldest first.
+
+        Returns
+        -------
+        values : np.ndarray
+            Array of shape (len(buffer), width).
+        """
+        return self._ordered(self._values)
+
+    def __len__(self):
+        return self._count
+
+
+def stability_statistics(timestamps, values):
+    """
+    Computes the stability statistics of a position trace.
+
+    The drift rate is the slope of a linear fit to the trace and the RMS jitter
+    is the standard deviation of the residuals of that fit, so slow drifts do
+    not inflate the jitter.
+
+    Parameters
+    ----------
+    timestamps : np.ndarray
+        Timestamps of each sample in seconds.
+
+    values : np.ndarray
+        Position of each sample.
+
+    Returns
+    -------
+    stats : OrderedDict
+        Number of samples, duration, mean, rms_jitter, peak_to_peak and
+        drift_rate (egu/s) of the trace.
+    """
+    timestamps = np.asarray(timestamps, dtype=float)
+    values = np.asarray(values, dtype=float)
+    stats = OrderedDict([('samples', len(values)), ('duration', np.nan),
+                         ('mean', np.nan), ('rms_jitter', np.nan),
+                         ('peak_to_peak', np.nan), ('drift_rate', np.nan)])
+    if len(values) == 0:
+        return stats
+    stats['duration'] = timestamps[-1] - timestamps[0]
+    stats['mean'] = values.mean()
+    stats['peak_to_peak'] = np.ptp(values)
+    if len(values) < 3 or stats['duration'] <= 0:
+        stats['rms_jitter'] = values.std()
+        return stats
+
+    # Remove the linear drift before computing the jitter
+    t = timestamps - timestamps[0]
+    slope, intercept = np.polyfit(t, values, 1)
+    stats['drift_rate'] = slope
+    stats['rms_jitter'] = np.std(values - (slope*t + intercept))
+    return stats
+
+
+def amplitude_spectrum(timestamps, values, sample_rate=None):
+    """
+    Computes the single sided amplitude spectrum of a position trace.
+
+    Monitor updates arrive at irregular intervals, so the trace is first
+    resampled onto a uniform grid, detrended and then Hann windowed before
+    taking the FFT.
+
+    Parameters
+    ----------
+    timestamps : np.ndarray
+        Timestamps of each sample in seconds.
+
+    values : np.ndarray
+        Position of each sample.
+
+    sample_rate : float, optional
+        Rate in Hz of the uniform grid. Defaults to the inverse of the median
+        interval between samples.
+
+    Returns
+    -------
+    frequencies : np.ndarray
+        Frequencies of the spectrum in Hz.
+
+    amplitudes : np.ndarray
+        Amplitude of each frequency component in the units of the trace.
+    """
+    timestamps = np.asarray(timestamps, dtype=float)
+    values = np.asarray(values, dtype=float)
+    if len(values) < 4:
+        return np.array([]), np.array([])
+    if sample_rate is None:
+        sample_rate = 1 / np.median(np.diff(timestamps))
+
+    # Resample onto a uniform grid
+    t = np.arange(timestamps[0], timestamps[-1], 1/sample_rate)
+    resampled = np.interp(t, timestamps, values)
+
+    # Detrend and window
+    resampled -= np.polyval(np.polyfit(t - t[0], resampled, 1), t - t[0])
+    window = np.hanning(len(resampled))
+    spectrum = np.fft.rfft(resampled * window)
+
+    # Normalize so a sine of amplitude A shows up as A
+    amplitudes = 2 * np.abs(spectrum) / window.sum()
+    frequencies = np.fft.rfftfreq(len(resampled), d=1/sample_rate)
+    return frequencies, amplitudes
+
+
+class PositionMonitor(object):
+    """
+    Collects the readbacks of a set of motors at the full monitor rate.
+
+    Each motor gets a preallocated ring buffer that is filled by a
+    subscription to its readback signal, ``user_readback`` for both the
+    attocubes and the aerotechs. Signals can also be passed directly.
+
+    Parameters
+    ----------
+    motors : motors or signals
+        Devices to monitor.
+
+    size : int, optional
+        Number of samples kept for each motor.
+
+    Examples
+    --------
+    >>> monitor = PositionMonitor(snd.t1.chi1, snd.t1.L)
+    >>> monitor.record(60)
+    >>> monitor.report()
+    """
+    def __init__(self, *motors, size=100000):
+        self.motors = as_list(motors)
+        self.size = size
+        self._signals = OrderedDict()
+        for motor in self.motors:
+            signal = self._readback_signal(motor)
+            self._signals[signal.name] = signal
+        self._buffers = OrderedDict((name, RingBuffer(size))
+                                    for name in self._signals)
+        self._cids = OrderedDict()
+
+    @staticmethod
+    def _readback_signal(motor):
+        """
+        Returns the readback signal of the inputted motor.
+        """
+        if isinstance(motor, Signal):
+            return motor
+        try:
+            return motor.user_readback
+        except AttributeError:
+            raise TypeError("Cannot monitor '{0}', it is not a signal and has "
+                            "no user_readback.".format(motor))
+
+    def _get_callback(self, name):
+        """
+        Returns the subscription callback that fills the buffer of the inputted
+        signal.
+        """
+        buffer = self._buffers[name]
+        def fill_buffer(value=None, timestamp=None, **kwargs):
+            if value is None:
+                return
+            buffer.append(timestamp or time.time(), value)
+        return fill_buffer
+
+    @property
+    def running(self):
+        """
+        Returns if the monitor is currently collecting data.
+        """
+        return bool(self._cids)
+
+    def start(self, clear=True):
+        """
+        Subscribes to all the readbacks and starts filling the buffers.
+
+        Parameters
+        ----------
+        clear : bool, optional
+            Empty the buffers before starting.
+        """
+        if self.running:
+            logger.warning("Position monitor is already running.")
+            return
+        if clear:
+            self.clear()
+        for name, signal in self._signals.items():
+            self._cids[name] = signal.subscribe(self._get_callback(name),
+                                                event_type=signal.SUB_VALUE,
+                                                run=False)
+        logger.debug("Started monitoring {0}.".format(list(self._signals)))
+
+    def stop(self):
+        """
+        Unsubscribes from all the readbacks.
+        """
+        for name, cid in self._cids.items():
+            self._signals[name].unsubscribe(cid)
+        self._cids.clear()
+        logger.debug("Stopped monitoring {0}.".format(list(self._signals)))
+
+    def clear(self):
+        """
+        Empties all the buffers.
+        """
+        for buffer in self._buffers.values():
+            buffer.clear()
+
+    def record(self, duration):
+        """
+        Collects data for the inputted duration, blocking the console.
+
+        Parameters
+        ----------
+        duration : float
+            Time in seconds to collect data for.
+        """
+        logger.info("Monitoring positions for {0} seconds...".format(duration))
+        self.start()
+        try:
+            time.sleep(duration)
+        finally:
+            self.stop()
+        logger.info("Monitoring completed.")
+
+    def data(self, name):
+        """
+        Returns the collected data of a single signal.
+
+        Parameters
+        ----------
+        name : str
+            Name of the readback signal.
+
+        Returns
+        -------
+        timestamps : np.ndarray
+
+        values : np.ndarray
+        """
+        buffer = self._buffers[name]
+        return buffer.timestamps, buffer.values[:, 0]
+
+    def spectrum(self, name, sample_rate=None):
+        """
+        Returns the amplitude spectrum of a single signal. See
+        :func:`.amplitude_spectrum` for more details.
+
+        Parameters
+        ----------
+        name : str
+            Name of the readback signal.
+
+        sample_rate : float, optional
+            Rate in Hz of the uniform grid the data is resampled onto.
+
+        Returns
+        -------
+        frequencies : np.ndarray
+
+        amplitudes : np.ndarray
+        """
+        return amplitude_spectrum(*self.data(name), sample_rate=sample_rate)
+
+    def report(self, print_report=True):
+        """
+        Computes the stability statistics and the dominant frequency of every
+        monitored signal.
+
+        Parameters
+        ----------
+        print_report : bool, optional
+            Log the report instead of returning it.
+
+        Returns
+        -------
+        report : pd.DataFrame
+            DataFrame indexed by signal name.
+        """
+        rows = OrderedDict()
+        for name in self._signals:
+            timestamps, values = self.data(name)
+            stats = stability_statistics(timestamps, values)
+            frequencies, amplitudes = amplitude_spectrum(timestamps, values)
+            if len(amplitudes) > 1:
+                # Ignore the DC component
+                peak = amplitudes[1:].argmax() + 1
+                stats['peak_frequency'] = frequencies[peak]
+                stats['peak_amplitude'] = amplitudes[peak]
+            else:
+                stats['peak_frequency'] = np.nan
+                stats['peak_amplitude'] = np.nan
+            rows[name] = stats
+        report = pd.DataFrame.from_dict(rows, orient='index')
+        if print_report:
+            logger.info("\n{0}".format(report))
+        else:
+            return report
+
+
+def trapezoidal_profile(t, start, stop, velocity, accel_time):
+    """
+    Computes the ideal position of a trapezoidal move at the inputted times.
+
+    Follows the motor record convention where the acceleration is given as the
+    time taken to reach the full velocity. Moves too short to reach the full
+    velocity follow a triangular profile.
+
+    Parameters
+    ----------
+    t : np.ndarray
+        Times since the start of the move in seconds.
+
+    start : float
+        Starting position of the move.
+
+    stop : float
+        Target position of the move.
+
+    velocity : float
+        Velocity of the motor in egu/s.
+
+    accel_time : float
+        Time in seconds to reach the full velocity.
+
+    Returns
+    -------
+    positions : np.ndarray
+        Ideal position at each time.
+
+    duration : float
+        Duration of the ideal move in seconds.
+    """
+    t = np.asarray(t, dtype=float)
+    distance = abs(stop - start)
+    direction = np.sign(stop - start)
+    if distance == 0 or velocity <= 0:
+        return np.full(t.shape, float(stop)), 0.
+    # Time spent accelerating and the peak velocity reached
+    if accel_time > 0:
+        accel = velocity / accel_time
+        t_acc = min(accel_time, np.sqrt(distance / accel))
+    else:
+        accel, t_acc = 0., 0.
+    v_peak = velocity if t_acc == 0 else accel * t_acc
+    t_const = (distance - accel * t_acc**2) / v_peak
+    duration = 2*t_acc + t_const
+
+    tc = np.clip(t, 0, duration)
+    travelled = np.select(
+        [tc < t_acc, tc < t_acc + t_const],
+        [0.5 * accel * tc**2, 0.5 * accel * t_acc**2 + v_peak * (tc - t_acc)],
+        distance - 0.5 * accel * (duration - tc)**2)
+    return start + direction * travelled, float(duration)
+
+
+class FollowingErrorCapture(object):
+    """
+    Records the readback of a motor at the monitor rate during a single move
+    and compares it against the ideal trapezoidal profile of the move.
+
+    The motor record only holds the final target, so the setpoint trajectory is
+    reconstructed from the velocity (``.VELO``) and acceleration time
+    (``.ACCL``) of the motor at the start of the move. Both the user
+    (``.RBV``) and dial (``.DRBV``) readbacks are buffered, timestamped on
+    arrival so they share a clock with the start of the move. The dial
+    readback is reported alongside the user readback, along with the offset
+    between the two.
+
+    Parameters
+    ----------
+    motor : :class:`.AeroBase`
+        Motor to capture.
+
+    size : int, optional
+        Number of samples kept for each readback.
+
+    tolerance : float, optional
+        Half width of the band around the target used for the settle time.
+        Defaults to the retry deadband of the motor.
+    """
+    def __init__(self, motor, size=20000, tolerance=None):
+        self.motor = motor
+        self.size = size
+        self.tolerance = tolerance
+        self.readback = RingBuffer(size)
+        self.dial = RingBuffer(size)
+        self.target = None
+        self.start_position = None
+        self.start_dial = None
+        self.velocity = None
+        self.accel_time = None
+        self.start_time = None
+        self.end_time = None
+        self._cids = OrderedDict()
+
+    def _get_callback(self, buffer):
+        def fill_buffer(value=None, **kwargs):
+            if value is not None:
+                buffer.append(time.time(), value)
+        return fill_buffer
+
+    def start(self, target):
+        """
+        Starts capturing a move to the inputted target.
+
+        Parameters
+        ----------
+        target : float
+            Target position of the move.
+        """
+        self.readback.clear()
+        self.dial.clear()
+        self.target = target
+        self.start_position = self.motor.user_readback.get()
+        self.start_dial = self.motor.dial.get()
+        self.velocity = self.motor.velocity.get()
+        self.accel_time = self.motor.acceleration.get()
+        if self.tolerance is None:
+            self.tolerance = self.motor.retries_deadband.get()
+        self.end_time = None
+        self.start_time = time.time()
+        self.readback.append(self.start_time, self.start_position)
+        self.dial.append(self.start_time, self.start_dial)
+        for signal, buffer in ((self.motor.user_readback, self.readback),
+                               (self.motor.dial, self.dial)):
+            self._cids[signal] = signal.subscribe(
+                self._get_callback(buffer), event_type=signal.SUB_VALUE,
+                run=False)
+
+    def stop(self, *args, **kwargs):
+        """
+        Stops capturing. Accepts and ignores any arguments so it can be used as
+        a status callback.
+        """
+        for signal, cid in self._cids.items():
+            signal.unsubscribe(cid)
+        self._cids.clear()
+        if self.end_time is None:
+            self.end_time = time.time()
+
+    @property
+    def running(self):
+        """
+        Returns if the capture is in progress.
+        """
+        return bool(self._cids)
+
+    def data(self):
+        """
+        Returns the captured readbacks alongside the ideal profile.
+
+        Returns
+        -------
+        df : pd.DataFrame
+            DataFrame indexed by the time since the start of the move
+            containing the readback, the ideal position, the following error,
+            the latest dial readback at each sample and the offset between the
+            user and dial readbacks.
+        """
+        t = self.readback.timestamps - self.start_time
+        readback = self.readback.values[:, 0]
+        ideal, _ = trapezoidal_profile(t, self.start_position, self.target,
+                                       self.velocity, self.accel_time)
+        # Latest dial update at or before each readback sample
+        dial_t = self.dial.timestamps - self.start_time
+        idx = np.searchsorted(dial_t, t, side='right') - 1
+        dial = self.dial.values[np.clip(idx, 0, None), 0]
+        return pd.DataFrame(OrderedDict([('readback', readback),
+                                         ('ideal', ideal),
+                                         ('following_error', readback-ideal),
+                                         ('dial', dial),
+                                         ('offset', readback-dial)]),
+                            index=pd.Index(t, name='time'))
+
+    def results(self):
+        """
+        Computes the figures of merit of the captured move.
+
+        Returns
+        -------
+        results : OrderedDict
+            Samples, move_time, ideal_time, peak_following_error, overshoot,
+            settle_time, final_error and offset of the move. Overshoot is
+            measured past the target in the direction of the move, the settle
+            time is the time since the start after which the readback stays
+            within the tolerance of the target and the offset is the final
+            difference between the user and dial readbacks.
+        """
+        df = self.data()
+        t = df.index.values
+        readback = df['readback'].values
+        _, ideal_time = trapezoidal_profile(0, self.start_position, self.target,
+                                            self.velocity, self.accel_time)
+        results = OrderedDict([('samples', len(df)),
+                               ('move_time', np.nan),
+                               ('ideal_time', ideal_time),
+                               ('peak_following_error', np.nan),
+                               ('overshoot', np.nan),
+                               ('settle_time', np.nan),
+                               ('final_error', np.nan),
+                               ('offset', np.nan)])
+        if self.end_time is not None:
+            results['move_time'] = self.end_time - self.start_time
+        if len(df) == 0:
+            return results
+
+        during_move = t <= ideal_time
+        if during_move.any():
+            results['peak_following_error'] = np.abs(
+                df['following_error'].values[during_move]).max()
+        direction = np.sign(self.target - self.start_position) or 1
+        results['overshoot'] = max(
+            0., (direction * (readback - self.target)).max())
+        outside = np.abs(readback - self.target) > self.tolerance
+        if not outside[-1]:
+            results['settle_time'] = (t[np.nonzero(outside)[0][-1] + 1]
+                                      if outside.any() else t[0])
+        results['final_error'] = readback[-1] - self.target
+        results['offset'] = readback[-1] - self.dial.values[-1, 0]
+        return results
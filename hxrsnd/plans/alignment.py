@@ -3,16 +3,23 @@ Alignment plans for the HXRSnD
 """
 
 import logging
+from collections import OrderedDict
+
 import numpy as np
+import pandas as pd
 from lmfit.models import LorentzianModel
 from bluesky import Msg
 from bluesky.plans import scan, list_scan
 from bluesky.utils import short_uid as _short_uid
-from bluesky.plan_stubs import abs_set, checkpoint, trigger_and_read
+from bluesky.plan_stubs import (abs_set, checkpoint, trigger_and_read,
+                                wait as plan_wait)
 from bluesky.preprocessors import msg_mutator, subs_decorator
 from pswalker.plans import measure_average
 from pswalker.callbacks import LiveBuild
-from .plan_stubs import block_run_control
+from .plan_stubs import block_run_control, adaptive_average
+from ..bragg import rocking_width
+from ..fitting import PeakFitter, LivePeakFit
+from ..utils import as_list
 from ..exceptions import UndefinedBounds
 
 logger = logging.getLogger(__name__)
@@ -20,7 +27,10 @@ logger = logging.getLogger(__name__)
 
 def maximize_lorentz(detector, motor, read_field, step_size=1,
                      bounds=None, average=None, filters=None,
-                     position_field='user_readback', initial_guess=None):
+                     position_field='user_readback', initial_guess=None,
+                     tolerance=None, seed_points=5, max_points=30,
+                     fit_backend='hxrsnd', fit_model='lorentzian',
+                     background=False, refit_every=1, target_error=None):
     """
     Maximize a signal with a Lorentzian relationship to a motor
 
@@ -29,6 +39,14 @@ def maximize_lorentz(detector, motor, read_field, step_size=1,
     has completed, the created model will be queried to find the estimated
     motor position that will yield the absolute maximum of the Lorentz equation
 
+    If a ``tolerance`` is given, an adaptive search is performed instead of the
+    linear scan. After ``seed_points`` evenly spaced points, the model is refit
+    after every point and the next point is placed where the signal is the
+    most sensitive to the center of the Lorentzian, ``center +/- sigma/sqrt(3)``,
+    or at the center itself, picking the candidate farthest from the points
+    already measured. The search stops once the standard error of the center is
+    below the tolerance or ``max_points`` have been measured.
+
     Parameters
     ----------
     detector : obj
@@ -64,7 +82,40 @@ def maximize_lorentz(detector, motor, read_field, step_size=1,
     initial_guess : dict, optional
         Initial guess to the Lorentz model parameters of `sigma` `center`
         `amplitude`
+
+    tolerance : float, optional
+        Standard error of the center at which the adaptive search stops. If
+        left as None, the linear scan is performed.
+
+    seed_points : int, optional
+        Number of evenly spaced points measured before the adaptive search
+
+    max_points : int, optional
+        Maximum number of points measured by the adaptive search
+
+    fit_backend : str, optional
+        Fitting engine, either "hxrsnd" to use the analytic
+        :class:`.PeakFitter` or "lmfit" to use ``LorentzianModel``
+
+    fit_model : str, optional
+        Peak shape, "lorentzian" or, with the "hxrsnd" backend,
+        "pseudo_voigt"
+
+    background : bool, optional
+        Fit a constant background under the peak. Only supported by the
+        "hxrsnd" backend
+
+    refit_every : int, optional
+        Number of new points between refits of the model. The model is
+        always refit with every point at the end of the scan
+
+    target_error : float, optional
+        Average every step until the standard error of the signal is below
+        this value, see :func:`.adaptive_average`. The ``average`` is then the
+        maximum number of shots, 100 by default, and every accepted shot is a
+        point of the fit
     """
+    max_shots = average or 100
     average = average or 1
     # Define bounds
     if not bounds:
@@ -81,11 +132,11 @@ def maximize_lorentz(detector, motor, read_field, step_size=1,
     # Include the last step even if this is smaller than the step_size
     steps = np.append(steps, bounds[1])
     # Create Lorentz fit and live model build
-    fit    = LorentzianModel(missing='drop')
-    i_vars = {'x' : position_field}
-    model  = LiveBuild(fit, read_field, i_vars, filters=filters,
-                       average=average, init_guess=initial_guess)#,
-                       # update_every=len(steps)) # Set to fit only on last step
+    model = live_peak_model(read_field, position_field, backend=fit_backend,
+                            model=fit_model, background=background,
+                            refit_every=refit_every, filters=filters,
+                            average=average if target_error is None else 1,
+                            init_guess=initial_guess)
 
     # Create per_step plan
     def measure(detectors, motor, step):
@@ -94,16 +145,59 @@ def maximize_lorentz(detector, motor, read_field, step_size=1,
         yield from checkpoint()
         yield from abs_set(motor, step, wait=True)
         # Measure the average
+        if target_error is not None:
+            reads, _ = yield from adaptive_average([motor, detector],
+                                                   [read_field], target_error,
+                                                   max_shots=max_shots,
+                                                   filters=filters)
+            return reads
         return (yield from measure_average([motor, detector],
                                            num=average,
                                            filters=filters))
-    # Create linear scan
-    plan = list_scan([detector], motor, steps, per_step=measure)
+    def adaptive_search():
+        positions = list(np.linspace(bounds[0], bounds[1], seed_points))
+        xdata, ydata = [], []
+        while positions:
+            reads = yield from measure([detector], motor, positions.pop(0))
+            xdata.append(reads[position_field])
+            ydata.append(reads[read_field])
+            if model.result is not None:
+                # Warm start every fit from the previous one
+                model.init_guess = dict(model.result.values)
+            elif not initial_guess and fit_backend == 'lmfit':
+                # Guess using the highest point until the first fit
+                sigma = (bounds[1] - bounds[0]) / seed_points
+                model.init_guess = {'center': xdata[int(np.argmax(ydata))],
+                                    'sigma': sigma,
+                                    'amplitude': np.max(ydata)*np.pi*sigma}
+            if positions:
+                continue
+            if model.result is not None:
+                stderr = model.result.params['center'].stderr
+                if stderr is not None and stderr < tolerance:
+                    logger.debug("Center found to %s after %s points", stderr,
+                                 len(xdata))
+                    break
+            if len(xdata) >= max_points:
+                logger.warning("Center was not found to %s within %s points",
+                               tolerance, max_points)
+                break
+            positions.append(next_lorentz_position(model.result, xdata, 
+                                                   ydata, bounds))
+
+    if tolerance is None:
+        # Create linear scan
+        plan = list_scan([detector], motor, steps, per_step=measure)
+    else:
+        plan = adaptive_search()
 
     @subs_decorator(model)
     def inner():
         # Run plan (stripping open/close run messages)
         yield from msg_mutator(plan, block_run_control)
+        if refit_every != 1:
+            # Include the points collected since the last refit
+            model.update_fit()
 
         # Yield result of Lorentz model
         logger.debug(model.result.fit_report())
@@ -123,9 +217,167 @@ def maximize_lorentz(detector, motor, read_field, step_size=1,
     return model
 
 
-def rocking_curve(detector, motor, read_field, coarse_step, fine_step,
-                  bounds=None, average=None, fine_space=5, initial_guess=None,
-                  position_field='user_readback', show_plot=True):
+def live_peak_model(read_field, position_field, backend='hxrsnd',
+                    model='lorentzian', background=False, refit_every=1,
+                    filters=None, average=1, init_guess=None):
+    """
+    Returns the callback that builds the peak model during an alignment scan
+
+    Parameters
+    ----------
+    read_field : str
+        Key of the measured signal
+
+    position_field : str
+        Key of the motor positions
+
+    backend : str, optional
+        "hxrsnd" for a :class:`.LivePeakFit` or "lmfit" for a ``LiveBuild``
+        of ``LorentzianModel``
+
+    model : str, optional
+        Peak shape, "lorentzian" or "pseudo_voigt"
+
+    background : bool, optional
+        Fit a constant background under the peak
+
+    refit_every : int, optional
+        Number of new points between refits
+
+    filters : dict, optional
+        Filters used to drop shots from the analysis
+
+    average : int, optional
+        Number of shots averaged into every point
+
+    init_guess : dict, optional
+        Initial guess of the model parameters
+
+    Returns
+    -------
+    model : :class:`.LivePeakFit` or ``LiveBuild``
+        Callback with the fit available as ``result``
+    """
+    if backend == 'hxrsnd':
+        return LivePeakFit(PeakFitter(model=model, background=background),
+                           read_field, position_field, filters=filters,
+                           average=average, init_guess=init_guess,
+                           refit_every=refit_every)
+    elif backend == 'lmfit':
+        if model != 'lorentzian' or background:
+            raise ValueError("The lmfit backend only supports a Lorentzian "
+                             "without background")
+        return LiveBuild(LorentzianModel(missing='drop'), read_field,
+                         {'x': position_field}, filters=filters,
+                         average=average, init_guess=init_guess,
+                         update_every=refit_every)
+    raise ValueError("Invalid fit backend '{0}'. Must be 'hxrsnd' or "
+                     "'lmfit'.".format(backend))
+
+
+def rocking_parameters(motor=None, energy=None, hkl=(2,2,0),
+                       search_widths=10):
+    """
+    Returns the scan parameters of a rocking curve derived from the expected
+    Bragg angle and Darwin width of the reflection
+
+    The bounds span ``search_widths`` Darwin widths on either side of the
+    Bragg angle, clipped to the limits of the motor. The coarse scan steps
+    half a width, and the fine scan steps a tenth of a width over two widths
+    on either side of the coarse maximum.
+
+    Parameters
+    ----------
+    motor : obj, optional
+        Motor to rock. Used for its limits and, without an energy, the energy
+        of the tower it belongs to
+
+    energy : float, optional
+        Photon energy in eV or keV
+
+    hkl : tuple, optional
+        Reflection of the crystal
+
+    search_widths : float, optional
+        Half width of the bounds in Darwin widths
+
+    Returns
+    -------
+    params : dict or None
+        Dictionary with the theta, width, bounds, coarse_step, fine_step and
+        fine_space. None if there is no energy
+    """
+    if energy is None:
+        energy = getattr(getattr(motor, 'parent', None), 'energy', None)
+        if not isinstance(energy, (int, float)):
+            return None
+    theta, width = rocking_width(E=energy, hkl=hkl)
+    low, high = theta - search_widths*width, theta + search_widths*width
+    limits = getattr(motor, 'limits', None)
+    if limits and limits[0] < limits[1]:
+        low, high = max(low, limits[0]), min(high, limits[1])
+    return {'theta': theta, 'width': width, 'bounds': (low, high),
+            'coarse_step': width/2, 'fine_step': width/10,
+            'fine_space': 2*width}
+
+
+def next_lorentz_position(result, xdata, ydata, bounds):
+    """
+    Returns the next position to measure to best determine the center of a
+    Lorentzian.
+
+    The derivative of a Lorentzian with respect to its center is largest at
+    ``center +/- sigma/sqrt(3)``, so measurements there shrink the uncertainty
+    of the center the most. These two positions and the center itself are the
+    candidates, and the one farthest from the measured positions is returned.
+    Without a fit, the widest interval next to the highest measurement is
+    bisected instead.
+
+    Parameters
+    ----------
+    result : lmfit.model.ModelResult or None
+        Current fit of the Lorentzian
+
+    xdata : list
+        Measured positions
+
+    ydata : list
+        Measured signal
+
+    bounds : tuple
+        Lower and higher limit of the search space
+
+    Returns
+    -------
+    position : float
+        Next position to measure
+    """
+    xdata = np.asarray(xdata, dtype=float)
+    if result is not None:
+        center = result.values['center']
+        offset = abs(result.values['sigma']) / np.sqrt(3)
+        candidates = np.clip([center - offset, center + offset, center], 
+                             *bounds)
+        distances = np.abs(candidates[:, np.newaxis] - xdata).min(axis=1)
+        return float(candidates[np.argmax(distances)])
+    # Bisect the widest interval around the highest point
+    order = np.argsort(xdata)
+    x = xdata[order]
+    best = int(np.argmax(np.asarray(ydata)[order]))
+    lower = x[best] - x[best-1] if best > 0 else 0
+    upper = x[best+1] - x[best] if best < len(x) - 1 else 0
+    if upper >= lower:
+        return float(x[best] + upper / 2)
+    return float(x[best] - lower / 2)
+
+
+def rocking_curve(detector, motor, read_field, coarse_step=None,
+                  fine_step=None, bounds=None, average=None, fine_space=None,
+                  initial_guess=None, position_field='user_readback',
+                  show_plot=True, tolerance=None, fit_backend='hxrsnd',
+                  fit_model='lorentzian', background=False, refit_every=1,
+                  energy=None, hkl=(2,2,0), search_widths=10,
+                  target_error=None):
     """
     Travel to the maxima of a bell curve
 
@@ -138,6 +390,10 @@ def rocking_curve(detector, motor, read_field, coarse_step, fine_step,
     twice as large as the ``fine_space`` parameter. After this, the motor is
     translated to the calculated maxima of the model
 
+    Any of ``bounds``, ``coarse_step``, ``fine_step`` and ``fine_space`` that
+    are not given are derived from the expected Bragg angle and Darwin width
+    of the reflection at the photon energy, see :func:`.rocking_parameters`
+
     Parameters
     ----------
     detector : obj
@@ -149,15 +405,15 @@ def rocking_curve(detector, motor, read_field, coarse_step, fine_step,
     read_field : str
         Field of detector to maximize
 
-    coarse_step : float
+    coarse_step : float, optional
         Step size for the initial rough scan
 
-    fine_step : float
+    fine_step : float, optional
         Step size for the fine scan
 
     bounds : tuple, optional
-        Bounds for the original rough scan. If not provided, the soft limits of
-        the motor are used
+        Bounds for the original rough scan. If not provided and there is no
+        energy, the soft limits of the motor are used
 
     average : int, optional
         Number of shots to average at each step
@@ -177,7 +433,53 @@ def rocking_curve(detector, motor, read_field, coarse_step, fine_step,
 
     show_plot : bool, optional
         Create a plot displaying the progress of the `rocking_curve`
+
+    tolerance : float, optional
+        If given, a single adaptive :func:`.maximize_lorentz` search over the
+        bounds replaces the coarse and fine scans, stopping once the center is
+        known to this tolerance.
+
+    fit_backend : str, optional
+        Fitting engine passed to :func:`.maximize_lorentz`
+
+    fit_model : str, optional
+        Peak shape passed to :func:`.maximize_lorentz`
+
+    background : bool, optional
+        Fit a constant background under the peak
+
+    refit_every : int, optional
+        Number of new points between refits of the model
+
+    energy : float, optional
+        Photon energy in eV or keV. Defaults to the energy of the tower the
+        motor belongs to, if any
+
+    hkl : tuple, optional
+        Reflection of the crystal
+
+    search_widths : float, optional
+        Half width of the derived bounds in Darwin widths
+
+    target_error : float, optional
+        Standard error of the signal to average every step to, passed to
+        :func:`.maximize_lorentz`
     """
+    params = rocking_parameters(motor, energy=energy, hkl=hkl,
+                                search_widths=search_widths)
+    if params is not None:
+        logger.debug("Derived rocking curve parameters %s", params)
+        bounds = bounds or params['bounds']
+        coarse_step = coarse_step or params['coarse_step']
+        fine_step = fine_step or params['fine_step']
+        fine_space = fine_space or params['fine_space']
+    elif coarse_step is None or fine_step is None:
+        raise ValueError("The step sizes of the rocking curve were not given "
+                         "and there is no energy to derive them from")
+    fine_space = fine_space or 5
+    fit_kwargs = dict(fit_backend=fit_backend, fit_model=fit_model,
+                      background=background, refit_every=refit_every,
+                      target_error=target_error)
     # Define bounds
     if not bounds:
         try:
@@ -188,6 +490,17 @@ def rocking_curve(detector, motor, read_field, coarse_step, fine_step,
         except AttributeError as exc:
             raise UndefinedBounds("Bounds are not defined by motor {} or "
                                   "plan".format(motor.name)) from exc
+    if tolerance is not None:
+        try:
+            return (yield from maximize_lorentz(detector, motor, read_field,
+                                                bounds=bounds, average=average,
+                                                position_field=position_field,
+                                                initial_guess=initial_guess,
+                                                tolerance=tolerance,
+                                                **fit_kwargs))
+        except ValueError as exc:
+            raise ValueError("Unable to find a proper maximum value"
+                             "during adaptive search") from exc
     if show_plot:
         # Create plot
         # subscribe first plot to rough_scan
@@ -198,7 +511,8 @@ def rocking_curve(detector, motor, read_field, coarse_step, fine_step,
                                             step_size=coarse_step,
                                             bounds=bounds, average=average,
                                             position_field=position_field,
-                                            initial_guess=initial_guess)
+                                            initial_guess=initial_guess,
+                                            **fit_kwargs)
     except ValueError as exc:
         raise ValueError("Unable to find a proper maximum value"
                          "during rough scan") from exc
@@ -222,7 +536,8 @@ def rocking_curve(detector, motor, read_field, coarse_step, fine_step,
                                           step_size=fine_step, bounds=bounds,
                                           average=average,
                                           position_field=position_field,
-                                          initial_guess=model.result.values)
+                                          initial_guess=model.result.values,
+                                          **fit_kwargs)
     except ValueError as exc:
         raise ValueError("Unable to find a proper maximum value"
                          "during fine scan") from exc
@@ -232,3 +547,394 @@ def rocking_curve(detector, motor, read_field, coarse_step, fine_step,
         pass
 
     return fit
+
+
+def multi_rocking_curve(detectors, motors, read_fields, coarse_step=None,
+                        fine_step=None, bounds=None, average=None,
+                        fine_space=None, position_fields=None, filters=None,
+                        energy=None, hkl=(2,2,0), search_widths=10,
+                        fit_model='lorentzian', background=False,
+                        refit_every=1):
+    """
+    Run rocking curves of several independent crystals at the same time
+
+    Every motor is rocked through the coarse and fine scans of
+    :func:`.rocking_curve`, but all of the motors move together at each step
+    and all of the detectors are read in the same event, so aligning every
+    crystal takes as long as the crystal with the most steps. Each signal is
+    fit separately, only using the steps where its own motor moved. Finally,
+    all of the motors are moved to their fitted maxima together.
+
+    The detectors, motors, read fields and position fields are paired by
+    their order. The other parameters can either be one value used by every
+    pair or a list with one value per pair, including ``bounds`` which is a
+    list of tuples when given per pair.
+
+    Parameters
+    ----------
+    detectors : list
+        Detectors observing each crystal. A detector can be repeated if it
+        reads the signal of several crystals
+
+    motors : list
+        Motors rocking each crystal
+
+    read_fields : list
+        Field of each detector to maximize
+
+    coarse_step : float or list, optional
+        Step size of the coarse scans
+
+    fine_step : float or list, optional
+        Step size of the fine scans
+
+    bounds : tuple or list, optional
+        Bounds of the coarse scans
+
+    average : int, optional
+        Number of shots to average at each step
+
+    fine_space : float or list, optional
+        Distance to scan on either side of the coarse maxima
+
+    position_fields : list, optional
+        Motor fields with the Lorentzian relationship to the signals.
+        Defaults to the names of the motors
+
+    filters : dict, optional
+        Filters used to drop shots from the analysis
+
+    energy : float or list, optional
+        Photon energies used to derive the missing bounds and steps, see
+        :func:`.rocking_parameters`
+
+    hkl : tuple, optional
+        Reflection of the crystals
+
+    search_widths : float, optional
+        Half width of the derived bounds in Darwin widths
+
+    fit_model : str, optional
+        Peak shape, "lorentzian" or "pseudo_voigt"
+
+    background : bool, optional
+        Fit a constant background under the peaks
+
+    refit_every : int, optional
+        Number of new points between refits of the models
+
+    Returns
+    -------
+    models : list
+        :class:`.LivePeakFit` of the fine scan of each crystal
+    """
+    motors = as_list(motors)
+    detectors = as_list(detectors)
+    read_fields = as_list(read_fields)
+    num = len(motors)
+    if not len(detectors) == len(read_fields) == num:
+        raise ValueError("Expected the same number of detectors, read fields "
+                         "and motors, got {0}, {1} and {2}.".format(
+                             len(detectors), len(read_fields), num))
+    position_fields = (as_list(position_fields) if position_fields
+                       else [motor.name for motor in motors])
+
+    def per_axis(value):
+        if isinstance(value, list):
+            if len(value) != num:
+                raise ValueError("Expected {0} values, got {1}.".format(
+                    num, value))
+            return list(value)
+        return [value] * num
+
+    coarse_step, fine_step = per_axis(coarse_step), per_axis(fine_step)
+    fine_space, energy = per_axis(fine_space), per_axis(energy)
+    bounds = per_axis(bounds)
+    for i, motor in enumerate(motors):
+        params = rocking_parameters(motor, energy=energy[i], hkl=hkl,
+                                    search_widths=search_widths)
+        if params is not None:
+            bounds[i] = bounds[i] or params['bounds']
+            coarse_step[i] = coarse_step[i] or params['coarse_step']
+            fine_step[i] = fine_step[i] or params['fine_step']
+            fine_space[i] = fine_space[i] or params['fine_space']
+        elif coarse_step[i] is None or fine_step[i] is None:
+            raise ValueError("The step sizes of the rocking curve of {0} were "
+                             "not given and there is no energy to derive "
+                             "them from".format(motor.name))
+        if not bounds[i]:
+            try:
+                bounds[i] = motor.limits
+            except AttributeError as exc:
+                raise UndefinedBounds("Bounds are not defined by motor {} or "
+                                      "plan".format(motor.name)) from exc
+        fine_space[i] = fine_space[i] or 5
+
+    # Read every device once per step, even if it is paired several times
+    devices = []
+    for device in detectors + motors:
+        if device not in devices:
+            devices.append(device)
+
+    def concurrent_scan(steps, init_guesses):
+        models = [LivePeakFit(PeakFitter(model=fit_model,
+                                         background=background),
+                              read_fields[i], position_fields[i],
+                              init_guess=init_guesses[i],
+                              refit_every=refit_every)
+                  for i in range(num)]
+        for step in range(max(len(s) for s in steps)):
+            # Motors that finished their scan stay at their last step
+            active = [i for i in range(num) if step < len(steps[i])]
+            yield from checkpoint()
+            group = _short_uid('set')
+            for i in active:
+                yield from abs_set(motors[i], steps[i][step], group=group)
+            yield from plan_wait(group=group)
+            reads = yield from measure_average(devices, num=average or 1,
+                                               filters=filters)
+            for i in active:
+                models[i].event({'data': reads})
+        for model in models:
+            model.update_fit()
+        return models
+
+    def centers(models, scan_bounds, name):
+        centers = []
+        for model, motor, (low, high) in zip(models, motors, scan_bounds):
+            if model.result is None:
+                raise ValueError("Unable to fit the {0} scan of {1}".format(
+                    name, motor.name))
+            center = model.result.values['center']
+            if not low < center < high:
+                raise ValueError("Predicted maximum position of {} is "
+                                 "outside the bounds {} during the {} scan"
+                                 "".format(center, (low, high), name))
+            centers.append(center)
+        return centers
+
+    def linear_steps(low, high, step_size):
+        return np.append(np.arange(low, high, step_size), high)
+
+    def inner():
+        # Coarse scans over the full bounds
+        models = yield from concurrent_scan(
+            [linear_steps(*bounds[i], coarse_step[i]) for i in range(num)],
+            [None] * num)
+        coarse = centers(models, bounds, "coarse")
+        logger.info("Coarse scans yielded maxima at %s, performing fine "
+                    "scans ...", coarse)
+
+        # Fine scans around each coarse maximum
+        fine_bounds = [(max(c - space, b[0]), min(c + space, b[1]))
+                       for c, space, b in zip(coarse, fine_space, bounds)]
+        models = yield from concurrent_scan(
+            [linear_steps(*fine_bounds[i], fine_step[i]) for i in range(num)],
+            [dict(model.result.values) for model in models])
+        fine = centers(models, fine_bounds, "fine")
+
+        # Move every crystal to its maximum together
+        logger.debug("Travelling to maxima at %s", fine)
+        group = _short_uid('set')
+        for motor, center in zip(motors, fine):
+            yield from abs_set(motor, center, group=group)
+        yield from plan_wait(group=group)
+        return models
+
+    return (yield from inner())
+
+
+def optimize_alignment(detector, motors, read_field, steps=None, bounds=None,
+                       max_step=None, xtol=None, ftol=1e-3,
+                       max_evaluations=100, average=None, filters=None,
+                       initial=None):
+    """
+    Maximize a signal over several coupled axes at once
+
+    Runs a Nelder-Mead simplex search over all of the motors together, so
+    couplings between the axes are followed instead of requiring repeated
+    one dimensional scans. Every vertex of the simplex is one measurement:
+    the motors move together to the vertex and the signal is averaged there.
+    Vertices are clipped to the bounds, and moves larger than ``max_step``
+    from the previous measurement are shortened, the shortened position being
+    the one used by the search. The search stops once the simplex is smaller
+    than ``xtol`` along every axis and the signals of its vertices are within
+    ``ftol`` of the best, or after ``max_evaluations`` measurements. The motors
+    are then moved to the best measured position.
+
+    Parameters
+    ----------
+    detector : obj
+        The object to be read during the plan
+
+    motors : list
+        Motors to move
+
+    read_field : str
+        Field of detector to maximize
+
+    steps : float or list, optional
+        Size of the initial simplex along each axis. Defaults to a tenth of
+        the bounds
+
+    bounds : list, optional
+        Tuple of the lower and higher limit of each motor. Defaults to the
+        limits of the motors
+
+    max_step : float or list, optional
+        Largest move of each axis between two measurements
+
+    xtol : float or list, optional
+        Size of the simplex along each axis at which the search stops.
+        Defaults to a twentieth of the steps
+
+    ftol : float, optional
+        Relative spread of the signal in the simplex at which the search stops
+
+    max_evaluations : int, optional
+        Maximum number of measurements
+
+    average : int, optional
+        Number of shots to average at every measurement
+
+    filters : dict, optional
+        Filters used to drop shots from the analysis
+
+    initial : list, optional
+        Positions to start the search from, for example the best positions of
+        a previous search. Defaults to the current positions
+
+    Returns
+    -------
+    df_evaluations : pd.DataFrame
+        DataFrame with the position of every motor and the signal of each
+        measurement, in order
+    """
+    motors = as_list(motors)
+    num = len(motors)
+    names = [motor.name for motor in motors]
+
+    def per_axis(value, name):
+        values = np.array(as_list(value) * (num if np.ndim(value) == 0 else 1),
+                          dtype=float)
+        if len(values) != num:
+            raise ValueError("Expected {0} values of {1}, got {2}.".format(
+                num, name, value))
+        return values
+
+    # Define bounds
+    if bounds is None:
+        bounds = []
+        for motor in motors:
+            limits = getattr(motor, 'limits', None)
+            if limits and limits[0] < limits[1]:
+                bounds.append(limits)
+            else:
+                bounds.append((-np.inf, np.inf))
+    if len(bounds) != num:
+        raise ValueError("Expected bounds for {0} motors, got {1}.".format(
+            num, bounds))
+    low, high = np.array(bounds, dtype=float).T
+    if steps is None:
+        if not np.isfinite(high - low).all():
+            raise UndefinedBounds("Steps can not be derived without the "
+                                  "bounds of every motor")
+        steps = list((high - low) / 10)
+    steps = per_axis(steps, "steps")
+    xtol = per_axis(steps / 20 if xtol is None else xtol, "xtol")
+    max_step = per_axis(np.inf if max_step is None else max_step, "max_step")
+
+    if initial is not None:
+        start = per_axis(initial, "initial")
+        logger.debug("Starting from the inputted positions %s", start)
+    else:
+        start = np.array([motor.position for motor in motors], dtype=float)
+    start = np.clip(start, low, high)
+
+    rows = []
+    last = start.copy()
+
+    def evaluate(point):
+        nonlocal last
+        # Shorten moves that are too large and keep within bounds
+        point = np.clip(last + np.clip(point - last, -max_step, max_step),
+                        low, high)
+        yield from checkpoint()
+        group = _short_uid('set')
+        for motor, position in zip(motors, point):
+            yield from abs_set(motor, position, group=group)
+        yield from plan_wait(group=group)
+        reads = yield from measure_average([detector] + motors,
+                                           num=average or 1, filters=filters)
+        last = point
+        rows.append(list(point) + [reads[read_field]])
+        # The simplex minimizes the negative signal
+        return point, -reads[read_field]
+
+    def inner():
+        # Initial simplex, stepping inside the bounds along each axis
+        simplex, values = [], []
+        for i in range(num + 1):
+            point = start.copy()
+            if i:
+                axis = i - 1
+                step = steps[axis]
+                if point[axis] + step > high[axis]:
+                    step = -step
+                point[axis] += step
+            point, value = yield from evaluate(point)
+            simplex.append(point)
+            values.append(value)
+        simplex, values = np.array(simplex), np.array(values)
+
+        while len(rows) < max_evaluations:
+            order = np.argsort(values)
+            simplex, values = simplex[order], values[order]
+            spread = np.abs(simplex[1:] - simplex[0]).max(axis=0)
+            if ((spread <= xtol).all() and np.abs(values[1:] - values[0]).max()
+                    <= ftol*max(abs(values[0]), np.finfo(float).tiny)):
+                logger.debug("Simplex converged after %s measurements",
+                             len(rows))
+                break
+            centroid = simplex[:-1].mean(axis=0)
+            reflected, f_r = yield from evaluate(2*centroid - simplex[-1])
+            if f_r < values[0]:
+                expanded, f_e = yield from evaluate(3*centroid - 2*simplex[-1])
+                if f_e < f_r:
+                    simplex[-1], values[-1] = expanded, f_e
+                else:
+                    simplex[-1], values[-1] = reflected, f_r
+            elif f_r < values[-2]:
+                simplex[-1], values[-1] = reflected, f_r
+            else:
+                # Contract towards the better of the worst and reflected
+                if f_r < values[-1]:
+                    target = reflected
+                else:
+                    target = simplex[-1]
+                contracted, f_c = yield from evaluate((centroid + target) / 2)
+                if f_c < min(f_r, values[-1]):
+                    simplex[-1], values[-1] = contracted, f_c
+                else:
+                    # Shrink around the best vertex
+                    for i in range(1, num + 1):
+                        if len(rows) >= max_evaluations:
+                            break
+                        simplex[i], values[i] = yield from evaluate(
+                            (simplex[0] + simplex[i]) / 2)
+        else:
+            logger.warning("Alignment did not converge within %s "
+                           "measurements", max_evaluations)
+
+        df_evaluations = pd.DataFrame(rows, columns=names + [read_field])
+        best = df_evaluations[names].values[
+            int(df_evaluations[read_field].values.argmax())]
+        logger.info("Moving to the best position %s",
+                    OrderedDict(zip(names, best)))
+        group = _short_uid('set')
+        for motor, position in zip(motors, best):
+            yield from abs_set(motor, position, group=group)
+        yield from plan_wait(group=group)
+        return df_evaluations
+
+    return (yield from inner())
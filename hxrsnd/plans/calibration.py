@@ -2,6 +2,7 @@
 Calibration of the delay macromotor
 """
 import logging
+from collections import OrderedDict
 
 import pandas as pd
 import numpy as np
@@ -13,9 +14,12 @@ from bluesky.plan_stubs import rel_set, wait as plan_wait, abs_set
 from bluesky.preprocessors import msg_mutator, stub_wrapper
 
 from pswalker.plans import measure_average, walk_to_pixel
+from pswalker.utils import field_prepend
 
-from .scans import centroid_scan
-from .preprocessors import return_to_start as _return_to_start
+from .scans import centroid_scan, centroid_list_scan, detector_field_lists
+from .preprocessors import return_to_start as _return_to_start, average_frames
+from ..interpolation import CalibrationTable
+from ..exceptions import InputError
 from ..utils import as_list, flatten
 
 logger = logging.getLogger(__name__)
@@ -60,8 +64,9 @@ def calibrate_motor(detector, detector_fields, motor, motor_fields,
     """    
     calib_motors = as_list(calib_motors)    
     # Check for motor having a _calib field
-    motor_config = motor.read_configuration()
-    if motor_config['calib']['value'] and motor_config['motors']['value']:
+    motor_config = motor.read_configuration(full=True)
+    if (motor_config['calib']['value'] is not None and 
+            motor_config['motors']['value']):
         logger.warning("Running the calibration procedure will overwrite the "
                        "existing calibration.")        
         # If a calibration is loaded, prompt the user for verification
@@ -98,7 +103,8 @@ def calibrate_motor(detector, detector_fields, motor, motor_fields,
 def calibration_scan(detector, detector_fields, motor, motor_fields, 
                      calib_motors, calib_fields, start, stop, steps,
                      first_step=0.01, average=None, filters=None, 
-                     return_to_start=True, *args, **kwargs):
+                     return_to_start=True, refine_tolerance=None, 
+                     max_points=None, frame_average=None, *args, **kwargs):
     """Performs a calibration scan for the main motor and returns a correction
     table for the calibration motors.
 
@@ -153,6 +159,20 @@ def calibration_scan(detector, detector_fields, motor, motor_fields,
     return_to_start : bool, optional
         Move all the motors to their original positions after the scan has been
         completed
+
+    refine_tolerance : float, optional
+        If passed, the scan is performed using
+        :func:`.adaptive_calibration_centroid_scan`, treating ``steps`` as the
+        number of points of the coarse pass and refining until the estimated
+        interpolation error of the centroids is below this tolerance, in
+        detector units.
+
+    max_points : int, optional
+        Maximum number of points of the adaptive scan.
+
+    frame_average : int, optional
+        Number of frames the detector averages on the IOC for every trigger
+        during the scan and the walks, see :func:`.average_frames`
     
     Returns
     -------
@@ -183,18 +203,30 @@ def calibration_scan(detector, detector_fields, motor, motor_fields,
         raise ValueError("Must have same number of calibration fields as "
                          "detector fields.")
     
+    @average_frames(detector, num=frame_average)
     @_return_to_start(motor, *calib_motors, perform=return_to_start)
     def inner():
         # Perform the main scan, reading the positions of all the devices
         logger.debug("Beginning calibration scan")
-        df_scan = yield from calibration_centroid_scan(
-            detector, motor, calib_motors,
-            start, stop, steps,
-            detector_fields=detector_fields,
-            motor_fields=motor_fields,
-            calib_fields=calib_fields,
-            average=average,
-            filters=filters)
+        if refine_tolerance is None:
+            df_scan = yield from calibration_centroid_scan(
+                detector, motor, calib_motors,
+                start, stop, steps,
+                detector_fields=detector_fields,
+                motor_fields=motor_fields,
+                calib_fields=calib_fields,
+                average=average,
+                filters=filters)
+        else:
+            df_scan = yield from adaptive_calibration_centroid_scan(
+                detector, motor, calib_motors,
+                start, stop, steps, refine_tolerance,
+                max_points=max_points,
+                detector_fields=detector_fields,
+                motor_fields=motor_fields,
+                calib_fields=calib_fields,
+                average=average,
+                filters=filters)
 
         # Find the distance per detector value scaling and initial positions
         scaling, start_positions = yield from detector_scaling_walk(
@@ -216,6 +248,142 @@ def calibration_scan(detector, detector_fields, motor, motor_fields,
     
     return (yield from inner())
 
+def multi_calibration_scan(detectors, detector_fields, motor, motor_fields, 
+                           calib_motors, calib_fields, start, stop, steps,
+                           first_step=0.01, average=None, filters=None, 
+                           return_to_start=True, frame_average=None, *args,
+                           **kwargs):
+    """Performs the calibration scans of several detectors, for example the
+    delay line and channel cut diagnostics, from a single motion of the main
+    motor and returns a correction table per detector.
+
+    All the detectors and calibration motors are measured at every step of one
+    centroid scan. The scaling walk is then performed for each detector using
+    its own calibration motors, returning them to their starting positions
+    before the next detector.
+
+    Parameters
+    ----------
+    detectors : list
+        Detectors from which to take the value measurements
+
+    detector_fields : iterable
+        Fields shared by all the detectors, or one list of fields per detector
+
+    motor : :class:`.Motor`
+        Main motor to perform the scan
+
+    motor_fields : iterable
+        Fields of the main motor to add to the scan
+
+    calib_motors : list
+        One list of calibration motors per detector, one motor per detector
+        field
+
+    calib_fields : list
+        One list of calibration motor fields per detector
+
+    start : float
+        Starting position of motor
+
+    stop : float
+        Ending position of motor
+
+    steps : int
+        Number of steps to take
+    
+    first_step : float, optional
+        First step to take on each calibration motor when performing the 
+        correction
+
+    average : int, optional
+        Number of averages to take for each measurement
+
+    return_to_start : bool, optional
+        Move all the motors to their original positions after the scan has been
+        completed
+
+    frame_average : int, optional
+        Number of frames the detectors average on the IOC for every trigger
+        during the scan and the walks, see :func:`.average_frames`
+
+    Returns
+    -------
+    calibrations : OrderedDict
+        Dictionary of detector names to the df_calibration, df_scan, scaling
+        and start_positions of the detector, as returned by
+        :func:`.calibration_scan`.
+    """
+    detectors = as_list(detectors)
+    detector_fields = detector_field_lists(detectors, detector_fields)
+    calib_motors = [as_list(motors) for motors in calib_motors]
+    calib_fields = [as_list(fields or [m.name for m in motors]) for 
+                    fields, motors in zip(as_list(calib_fields, 
+                                                  len(detectors)), 
+                                          calib_motors)]
+    motor_fields = as_list(motor_fields or motor.read().keys())
+    if not len(calib_motors) == len(calib_fields) == len(detectors):
+        raise ValueError("Must have one list of calibration motors and fields "
+                         "per detector.")
+    for det, fields, motors, cfields in zip(detectors, detector_fields, 
+                                            calib_motors, calib_fields):
+        if not len(fields) == len(motors) == len(cfields):
+            raise ValueError("Must have same number of calibration motors and "
+                             "fields as detector fields for '{0}'.".format(
+                                 det.name))
+
+    # Measure every calibration motor once, even if shared between detectors
+    all_calib_motors, all_calib_fields = [], []
+    for motors, fields in zip(calib_motors, calib_fields):
+        for mot, fld in zip(motors, fields):
+            if fld not in all_calib_fields:
+                all_calib_motors.append(mot)
+                all_calib_fields.append(fld)
+
+    @average_frames(*detectors, num=frame_average)
+    @_return_to_start(motor, *all_calib_motors, perform=return_to_start)
+    def inner():
+        logger.debug("Beginning multi-detector calibration scan")
+        df_all = yield from calibration_centroid_scan(
+            detectors, motor, all_calib_motors,
+            start, stop, steps,
+            detector_fields=detector_fields,
+            motor_fields=motor_fields,
+            calib_fields=all_calib_fields,
+            average=average,
+            filters=filters)
+
+        calibrations = OrderedDict()
+        for det, fields, motors, cfields in zip(detectors, detector_fields,
+                                                calib_motors, calib_fields):
+            # Only keep the columns of this detector and its motors
+            df_scan = df_all[motor_fields + [f+"_pre" for f in cfields] + 
+                             [field_prepend(fld, det) for fld in fields]]
+
+            # Read the same devices as the scan during the walk
+            system = ([motor] + [m for m in all_calib_motors if m not in motors]
+                      + [d for d in detectors if d is not det])
+
+            @_return_to_start(*motors)
+            def walk():
+                return (yield from detector_scaling_walk(
+                    df_scan, det, motors,
+                    first_step=first_step,
+                    average=average,
+                    filters=filters,
+                    system=system,
+                    *args, **kwargs))
+            scaling, start_positions = yield from walk()
+
+            df_calibration = build_calibration_df(df_scan, scaling, 
+                                                  start_positions, det)
+            calibrations[det.name] = (df_calibration, df_scan, scaling, 
+                                      start_positions)
+        logger.debug("Completed multi-detector calibration scan.")
+        return calibrations
+
+    return (yield from inner())
+
 def calibration_centroid_scan(detector, motor, calib_motors, start, stop, steps,
                               calib_fields=None, *args, **kwargs):
     """Performs a centroid scan producing a dataframe with the values of the
@@ -278,17 +446,173 @@ def calibration_centroid_scan(detector, motor, calib_motors, start, stop, steps,
                                   start, stop, steps,
                                   system=calib_motors,
                                   system_fields=calib_fields,
-                                  return_to_start=False
+                                  return_to_start=False,
                                   *args, **kwargs)
 
     # Let's adjust the column names of the calib motors
     df.columns = [c+"_pre" if c in calib_fields else c for c in df.columns]
     return df    
 
+def refinement_positions(positions, values, tolerance, min_step=0):
+    """Returns the positions to add to a scan so linear interpolation of the
+    measured values stays within the tolerance.
+
+    The linear interpolation error of an interval of width h is estimated as
+    ``|f''| h**2 / 8``, using the largest finite difference estimate of the
+    second derivative at the two ends of the interval. The midpoints of the
+    intervals with an estimated error above the tolerance are returned, the
+    largest errors first.
+
+    Parameters
+    ----------
+    positions : array-like
+        Measured motor positions.
+
+    values : array-like
+        Values measured at each position, of shape (n_positions,) or
+        (n_positions, n_fields).
+
+    tolerance : float
+        Largest acceptable interpolation error, in the units of the values.
+
+    min_step : float, optional
+        Intervals narrower than twice this width are not refined.
+
+    Returns
+    -------
+    new_positions : np.ndarray
+        Midpoints of the intervals to refine, ordered by decreasing estimated
+        error.
+    """
+    positions = np.asarray(positions, dtype=float)
+    values = np.asarray(values, dtype=float).reshape(len(positions), -1)
+    order = np.argsort(positions)
+    x, y = positions[order], values[order]
+    if len(x) < 3:
+        raise InputError("Need at least three points to estimate the "
+                         "curvature, got {0}.".format(len(x)))
+    h = np.diff(x)
+    slopes = np.diff(y, axis=0) / h[:, np.newaxis]
+    # Second derivative at the interior points, reused at the end points
+    curvature = np.abs(2 * np.diff(slopes, axis=0) / 
+                       (x[2:] - x[:-2])[:, np.newaxis])
+    curvature = np.vstack([curvature[:1], curvature, curvature[-1:]])
+    interval_curvature = np.maximum(curvature[:-1], curvature[1:]).max(axis=1)
+    errors = interval_curvature * h**2 / 8
+    refine = np.flatnonzero((errors > tolerance) & (h >= 2*min_step))
+    refine = refine[np.argsort(-errors[refine], kind='stable')]
+    return x[:-1][refine] + h[refine] / 2
+
+def adaptive_calibration_centroid_scan(detector, motor, calib_motors, start, 
+                                       stop, steps, tolerance, calib_fields=None,
+                                       max_points=None, max_passes=5, 
+                                       min_step=None, detector_fields=None, 
+                                       *args, **kwargs):
+    """Performs a centroid scan that concentrates points where the centroids
+    change fastest, producing the same dataframe as
+    :func:`.calibration_centroid_scan`.
+
+    A coarse pass of ``steps`` evenly spaced points is taken first. Then on
+    every pass the curvature of the centroid response is estimated and points
+    are only added in the middle of the intervals where the interpolation
+    error would exceed the tolerance, see :func:`.refinement_positions`.
+
+    Parameters
+    ----------
+    detector : :class:`.BeamDetector`
+        Detector from which to take the value measurements
+    
+    motor : :class:`.Motor`
+        Main motor to perform the scan
+
+    calib_motors : iterable
+        Calibration motors
+
+    start : float
+        Starting position of motor
+
+    stop : float
+        Ending position of motor
+
+    steps : int
+        Number of points of the coarse pass, at least three
+
+    tolerance : float
+        Largest acceptable interpolation error of the centroids, in detector
+        units
+
+    calib_fields : list, optional
+        Fields of the of the calibration motors to add to the returned dataframe
+
+    max_points : int, optional
+        Maximum total number of points. Defaults to four times ``steps``.
+
+    max_passes : int, optional
+        Maximum number of refinement passes
+
+    min_step : float, optional
+        Smallest spacing between points. Defaults to the coarse spacing divided
+        by ``2**max_passes``.
+
+    detector_fields : iterable, optional
+        Fields of the detector to add to the returned dataframe
+
+    Returns
+    -------
+    df : pd.DataFrame
+        DataFrame containing the detector, motor, and calibration motor fields
+        at every point of the scan, sorted by position.
+    """
+    calib_motors = as_list(calib_motors)
+    calib_fields = as_list(calib_fields or [m.name for m in calib_motors])
+    if len(calib_motors) != len(calib_fields):
+        raise ValueError("Must one calibration field for every calibration "
+                         "motor, but got {0} fields for {1} motors.".format(
+                             len(calib_fields), len(calib_motors)))
+    if steps < 3:
+        raise InputError("Adaptive scans need at least three coarse points, "
+                         "got {0}.".format(steps))
+    max_points = max_points or 4*steps
+    if min_step is None:
+        min_step = abs(stop - start) / (steps - 1) / 2**max_passes
+    if detector_fields is not None:
+        kwargs['detector_fields'] = detector_fields
+
+    def measure(positions):
+        return (yield from centroid_list_scan(detector, motor, positions,
+                                              system=calib_motors,
+                                              system_fields=calib_fields,
+                                              return_to_start=False,
+                                              *args, **kwargs))
+
+    df = yield from measure(np.linspace(start, stop, steps))
+    detector_name = getattr(detector, "name", detector)
+    centroid_fields = [col for col in df.columns if detector_name in col]
+    for n_pass in range(max_passes):
+        new_positions = refinement_positions(
+            df.index.values, df[centroid_fields].values, tolerance, 
+            min_step=min_step)
+        # Keep the points with the largest errors if we would go over
+        remaining = max_points - len(df)
+        if not len(new_positions) or remaining <= 0:
+            break
+        new_positions = np.sort(new_positions[:remaining])
+        logger.debug("Refinement pass {0}, measuring {1} new points.".format(
+            n_pass+1, len(new_positions)))
+        df_new = yield from measure(new_positions)
+        df = pd.concat([df, df_new]).sort_index()
+    logger.info("Adaptive calibration scan measured {0} points.".format(
+        len(df)))
+
+    # Let's adjust the column names of the calib motors
+    df.columns = [c+"_pre" if c in calib_fields else c for c in df.columns]
+    return df
+
 def detector_scaling_walk(df_scan, detector, calib_motors,
                           first_step=0.01, average=None, filters=None,
                           tolerance=1, delay=None, max_steps=5, system=None,
-                          drop_missing=True, gradients=None, *args, **kwargs):
+                          drop_missing=True, gradients=None, concurrent=False,
+                          coupled=None, *args, **kwargs):
     """Performs a walk to to the detector value farthest from the current value
     using each of calibration motors, and then determines the motor to detector
     scaling
@@ -300,6 +624,11 @@ def detector_scaling_walk(df_scan, detector, calib_motors,
     as it is recorded, if a RuntimeError or LimitError is raised, the plan will
     simply use the current motor position for the scaling calculation.
 
+    In concurrent mode, the calibration motors that drive independent detector
+    fields are walked together using :func:`.joint_walk`, moving all of them
+    and taking a single measurement at every step. Calibration motors listed
+    as coupled are then walked one at a time as above.
+
     Parameters
     ----------
     df_scan : pd.DataFrame
@@ -335,6 +664,13 @@ def detector_scaling_walk(df_scan, detector, calib_motors,
         Assume an initial gradient for the relationship between detector value
         and calibration motor position
 
+    concurrent : bool, optional
+        Walk the independent calibration motors together
+
+    coupled : iterable, optional
+        Calibration motors, or motor names, whose detector fields also respond
+        to the other calibration motors. They are always walked one at a time.
+
     Returns
     -------
     scaling : list
@@ -361,12 +697,42 @@ def detector_scaling_walk(df_scan, detector, calib_motors,
     system = as_list(system or []) + calib_motors
     
     # Define the list that will hold the scaling
-    scaling, start_positions = [], []
+    scaling, start_positions = [None]*num, [None]*num
+
+    # Split the motors that can be walked together from the coupled ones
+    coupled = [getattr(mot, 'name', mot) for mot in as_list(coupled)]
+    sequential = list(range(num))
+    if concurrent:
+        joint = [i for i in sequential if calib_motors[i].name not in coupled]
+        sequential = [i for i in sequential if i not in joint]
+        if joint:
+            # Store the current motor and detector values
+            reads = yield from measure_average([detector]+system,
+                                               num=average,
+                                               filters=filters)
+            motor_start = [reads[calib_fields[i]] for i in joint]
+            dfld_start = [reads[detector_fields[i]] for i in joint]
+            # Walk every motor to the farthest value of its field at once
+            targets = [df_scan[detector_fields[i]].iloc[
+                abs(df_scan[detector_fields[i]] - start).values.argmax()]
+                       for i, start in zip(joint, dfld_start)]
+            reads = yield from joint_walk(
+                detector, [calib_motors[i] for i in joint],
+                [detector_fields[i] for i in joint], targets,
+                motor_fields=[calib_fields[i] for i in joint],
+                first_step=[first_step[i] for i in joint],
+                tolerance=[tolerance[i] for i in joint],
+                max_steps=[max_steps[i] for i in joint],
+                gradients=[gradients[i] for i in joint],
+                average=average, filters=filters, system=system)
+            for i, m_start, d_start in zip(joint, motor_start, dfld_start):
+                scaling[i] = ((reads[calib_fields[i]] - m_start) / 
+                              (reads[detector_fields[i]] - d_start))
+                start_positions[i] = m_start
 
     # Now let's get the detector value to motor position conversion for each fld
-    for i, (dfld, cfld, cmotor) in enumerate(zip(detector_fields, 
-                                                 calib_fields, 
-                                                 calib_motors)):
+    for i in sequential:
+        dfld, cfld, cmotor = detector_fields[i], calib_fields[i], calib_motors[i]
         # Get a list of devices without the cmotor we are inputting
         inp_system = list(system)
         inp_system.remove(cmotor)
@@ -396,7 +762,7 @@ def detector_scaling_walk(df_scan, detector, calib_motors,
                                      tolerance=tolerance[i],
                                      system=inp_system,
                                      average=average,
-                                     max_steps=max_steps[i]
+                                     max_steps=max_steps[i],
                                      *args, **kwargs)
             
         except RuntimeError:
@@ -416,13 +782,124 @@ def detector_scaling_walk(df_scan, detector, calib_motors,
         dfld_end = reads[dfld]
 
         # Now lets find the conversion from signal value to motor distance
-        scaling.append((motor_end - motor_start)/(dfld_end - dfld_start))
+        scaling[i] = (motor_end - motor_start)/(dfld_end - dfld_start)
         # Add the starting position to the motor start list
-        start_positions.append(motor_start)
+        start_positions[i] = motor_start
 
     # Return the final scaling list
     return scaling, start_positions
 
+def joint_walk(detector, motors, detector_fields, targets, motor_fields=None,
+               first_step=0.01, tolerance=1, max_steps=5, gradients=None,
+               average=None, filters=None, system=None):
+    """Walks several motors to their detector targets at the same time,
+    assuming each motor only moves its own detector field.
+
+    Every step moves all the motors that have not reached their target yet
+    together and takes a single averaged measurement of all the fields. The
+    next position of each motor is found using the secant through its last two
+    measurements, the first step being ``first_step`` unless a gradient is
+    passed. Motors that hit their limits or stop changing their field are left
+    where they are.
+
+    Parameters
+    ----------
+    detector : :class:`.Detector`
+        Detector from which to take the value measurements
+
+    motors : iterable
+        Motors to walk
+
+    detector_fields : iterable
+        Full names of the detector field moved by each motor
+
+    targets : iterable
+        Target value of each detector field
+
+    motor_fields : iterable, optional
+        Fields of the motors to read their positions from. Defaults to the
+        motor names.
+
+    first_step : float or iterable, optional
+        First step of each motor if no gradient is passed
+
+    tolerance : float or iterable, optional
+        Tolerance of each detector field
+
+    max_steps : int or iterable, optional
+        Maximum number of steps of each motor
+
+    gradients : float or iterable, optional
+        Initial gradient of each detector field with respect to its motor
+
+    average : int, optional
+        Number of averages to take for each measurement
+
+    filters : dict, optional
+        Filters applied to the measurements, see :meth:`.apply_filters`
+
+    system : list, optional
+        Extra devices to include in the measurements
+
+    Returns
+    -------
+    reads : dict
+        Last averaged measurement of the detector, motors and system.
+    """
+    motors = as_list(motors)
+    num = len(motors)
+    motor_fields = as_list(motor_fields or [m.name for m in motors])
+    detector_fields = as_list(detector_fields)
+    targets = np.asarray(as_list(targets), dtype=float)
+    first_step = np.asarray(as_list(first_step, num, float))
+    tolerance = np.asarray(as_list(tolerance, num, float))
+    max_steps = np.asarray(as_list(max_steps, num, int))
+    gradients = np.array([np.nan if g is None else g 
+                          for g in as_list(gradients, num)], dtype=float)
+    devices = [detector] + [d for d in as_list(system or []) 
+                            if d not in motors] + motors
+
+    def measure():
+        reads = yield from measure_average(devices, num=average or 1, 
+                                           filters=filters)
+        return (reads, np.array([reads[f] for f in motor_fields], dtype=float),
+                np.array([reads[f] for f in detector_fields], dtype=float))
+
+    reads, positions, values = yield from measure()
+    steps = np.zeros(num, dtype=int)
+    active = np.abs(values - targets) > tolerance
+    while active.any():
+        # Secant step if we know the gradient, otherwise the first step
+        known = np.isfinite(gradients) & (gradients != 0)
+        new_positions = np.where(known, positions + (targets - values) / 
+                                 np.where(known, gradients, 1),
+                                 positions + first_step)
+        group = short_uid('set')
+        for i in np.flatnonzero(active):
+            try:
+                yield from abs_set(motors[i], new_positions[i], group=group)
+            except LimitError:
+                logger.warning("Joint walk tried to exceed the limits of motor "
+                               "'{0}'. Leaving it at {1}.".format(
+                                   motors[i].name, positions[i]))
+                active[i] = False
+        yield from plan_wait(group=group)
+        steps[active] += 1
+        reads, new_positions, new_values = yield from measure()
+
+        # Update the gradients of the motors that moved
+        moved = active & (new_positions != positions)
+        gradients[moved] = ((new_values - values)[moved] / 
+                            (new_positions - positions)[moved])
+        stuck = active & ~moved | (moved & (gradients == 0))
+        for i in np.flatnonzero(stuck):
+            logger.warning("Motor '{0}' is not changing '{1}', stopping its "
+                           "walk.".format(motors[i].name, detector_fields[i]))
+        positions, values = new_positions, new_values
+        active &= (~stuck & (np.abs(values - targets) > tolerance) & 
+                   (steps < max_steps))
+    return reads
+
 def build_calibration_df(df_scan, scaling, start_positions, detector):
     """Takes the scan dataframe, scaling, and starting positions to build a 
     calibration table for the calibration motors.
@@ -454,7 +931,8 @@ def build_calibration_df(df_scan, scaling, start_positions, detector):
         relative corrections.
     """
     # Get the fields being used in the scan df
-    detector_fields = [col for col in df_scan.columns if detector.name in col]
+    detector_name = getattr(detector, "name", detector)
+    detector_fields = [col for col in df_scan.columns if detector_name in col]
     calib_fields = [col[:-4] for col in df_scan.columns if col.endswith("_pre")]
     motor_fields = [col for col in df_scan.columns 
                     if col not in detector_fields and not col.endswith("_pre")]
@@ -465,16 +943,378 @@ def build_calibration_df(df_scan, scaling, start_positions, detector):
                          "detector fields, but got {0} and {1}.".format(
                              len(calib_fields), len(detector_fields)))
 
-    df_corrections = pd.DataFrame(index=df_scan.index)
-
-    # Use the conversion to create an expected correction table
-    for scale, start, cfld, dfld in zip(scaling, start_positions, calib_fields,
-                                        detector_fields):
-        # Absolute move to make to perform correction for this motor
-        df_corrections[cfld+"_post"] = \
-          start - (df_scan[dfld] - df_scan[dfld].iloc[0]) * scale
+    # Use the conversion to create the absolute corrections of every motor in
+    # a single pass over the detector values
+    detector_values = df_scan[detector_fields].values.astype(float)
+    corrections = (np.asarray(start_positions, dtype=float) - 
+                   (detector_values - detector_values[0]) * 
+                   np.asarray(scaling, dtype=float))
+    df_corrections = pd.DataFrame(corrections, index=df_scan.index,
+                                  columns=[c+"_post" for c in calib_fields])
 
     # Put together the calibration table
     df_calibration = pd.concat([df_scan[motor_fields], df_corrections], axis=1)
     
     return df_calibration
+
+def smooth_centroids(window_length=5, polyorder=2):
+    """Returns a post-processing function that smooths the detector values of
+    a centroid scan using a Savitzky-Golay filter.
+
+    Parameters
+    ----------
+    window_length : int, optional
+        Length of the filter window. Must be odd and no longer than the scan.
+
+    polyorder : int, optional
+        Order of the polynomial fit in each window.
+
+    Returns
+    -------
+    post_process : callable
+        Function taking and returning a dataframe of detector values.
+    """
+    def post_process(df_detector):
+        return pd.DataFrame(savgol_filter(df_detector.values, window_length, 
+                                          polyorder, axis=0),
+                            index=df_detector.index, 
+                            columns=df_detector.columns)
+    return post_process
+
+def recompute_calibration(df_scan, detector, scaling, start_positions,
+                          post_process=None, axis_fields=None):
+    """Rebuilds a calibration table from a stored centroid scan without
+    performing any new scans.
+
+    This allows the scaling, the starting positions, or the processing of the
+    detector values to be changed after the fact, for example using the scan
+    saved alongside an existing calibration.
+
+    Parameters
+    ----------
+    df_scan : pd.DataFrame
+        Dataframe containing the results of a centroid scan performed using the
+        detector, motor, and calibration motors.
+
+    detector : :class:`.Detector` or str
+        Detector, or detector name, used in the scan.
+
+    scaling : list
+        List of scales in the units of motor egu / detector value
+
+    start_positions : list
+        List of the initial positions of the motors before the walk
+
+    post_process : callable, optional
+        Function applied to the dataframe of detector values before building
+        the table, such as :func:`.smooth_centroids`. It must return a 
+        dataframe of the same shape.
+
+    axis_fields : list, optional
+        Axis columns of a grid scan from :func:`.calibration_grid_scan`. If
+        passed, a grid correction table is built instead.
+
+    Returns
+    -------
+    df_calibration : pd.DataFrame
+        Calibration dataframe that has all the scan motor fields and the 
+        absolute corrections of the calibration motors.
+    """
+    if post_process is not None:
+        detector_name = getattr(detector, "name", detector)
+        detector_fields = [col for col in df_scan.columns 
+                           if detector_name in col]
+        df_detector = post_process(df_scan[detector_fields])
+        if df_detector.shape != (len(df_scan), len(detector_fields)):
+            raise ValueError("Post-processing must return a dataframe of shape "
+                             "{0}, got {1}.".format(
+                                 (len(df_scan), len(detector_fields)), 
+                                 df_detector.shape))
+        df_scan = df_scan.copy()
+        df_scan[detector_fields] = df_detector.values
+    if axis_fields:
+        return build_grid_calibration_df(df_scan, scaling, detector, 
+                                         axis_fields)
+    return build_calibration_df(df_scan, scaling, start_positions, detector)
+
+def _leave_one_out(table):
+    """Interpolates every point of a compiled correction table using all the
+    other points of the table.
+
+    Parameters
+    ----------
+    table : :class:`.CalibrationTable`
+        Compiled correction table.
+
+    Returns
+    -------
+    predicted : np.ndarray
+        Array of shape (n_points, n_motors) of the interpolated corrections.
+    """
+    x, y = table.x, table.y
+    n = len(x)
+    if n < 3:
+        raise InputError("Leave-one-out evaluation needs at least three "
+                         "distinct main motor positions. Got {0}.".format(n))
+    if table.method == "linear":
+        # Every point is interpolated between its neighbours, and the end
+        # points are extrapolated from the two closest points
+        left = np.r_[1, np.arange(n - 2), n - 3]
+        right = np.r_[2, np.arange(2, n), n - 2]
+        weights = ((x - x[left]) / (x[right] - x[left]))[:, np.newaxis]
+        return y[left] + weights * (y[right] - y[left])
+    predicted = np.empty_like(y)
+    for i in range(n):
+        df_other = pd.DataFrame(np.column_stack([np.delete(x, i), 
+                                                 np.delete(y, i, axis=0)]))
+        predicted[i] = CalibrationTable(df_other, method=table.method)(x[i])
+    return predicted
+
+def calibration_quality(df_calib, df_scan=None, scaling=None, 
+                        start_positions=None, detector=None, method="linear"):
+    """Evaluates how well a correction table describes the corrections
+    measured in its centroid scan.
+
+    Three metrics are computed for every calibration motor. The residuals are
+    the differences between the interpolated table and the corrections
+    computed from the scan at every scan position, which are non-zero when the
+    table was post-processed or has repeated positions. The leave-one-out
+    errors are the differences between every point of the table and the
+    interpolation of all the other points, estimating the interpolation error
+    between the points of the table. The spread is the standard deviation of
+    the leave-one-out errors converted into detector units using the scaling,
+    predicting the spread of the centroid after corrected moves.
+
+    Parameters
+    ----------
+    df_calib : pd.DataFrame
+        Correction table with the main motor positions in the first column.
+
+    df_scan : pd.DataFrame, optional
+        Centroid scan used to build the table. Residuals are only computed if
+        the scan, scaling, start positions and detector are all passed.
+
+    scaling : list, optional
+        List of scales in the units of motor egu / detector value
+
+    start_positions : list, optional
+        List of the initial positions of the motors before the walk
+
+    detector : :class:`.Detector` or str, optional
+        Detector, or detector name, used in the scan.
+
+    method : str, optional
+        Interpolation method of the table, see :class:`.CalibrationTable`.
+
+    Returns
+    -------
+    df_quality : pd.DataFrame
+        Dataframe indexed by the correction columns of the table containing
+        the number of points, the rms and maximum residuals and leave-one-out
+        errors in motor units, and the predicted spread in detector units.
+    """
+    table = CalibrationTable(df_calib, method=method)
+    loo_errors = _leave_one_out(table) - table.y
+    df_quality = pd.DataFrame(index=table.columns)
+    df_quality["points"] = len(table)
+    df_quality["residual_rms"] = np.nan
+    df_quality["residual_max"] = np.nan
+
+    if (df_scan is not None and scaling is not None and 
+            start_positions is not None and detector is not None):
+        df_raw = build_calibration_df(df_scan, scaling, start_positions, 
+                                      detector)
+        try:
+            raw = df_raw[table.columns].values.astype(float)
+        except KeyError as e:
+            raise InputError("Scan does not contain the corrections of the "
+                             "table: {0}".format(e))
+        residuals = table(df_raw.iloc[:, 0].values.astype(float)) - raw
+        df_quality["residual_rms"] = np.sqrt(np.nanmean(residuals**2, axis=0))
+        df_quality["residual_max"] = np.nanmax(np.abs(residuals), axis=0)
+
+    df_quality["loo_rms"] = np.sqrt(np.mean(loo_errors**2, axis=0))
+    df_quality["loo_max"] = np.abs(loo_errors).max(axis=0)
+    if scaling is not None:
+        df_quality["spread"] = (loo_errors / np.abs(np.asarray(
+            scaling, dtype=float))).std(axis=0)
+    else:
+        df_quality["spread"] = np.nan
+    return df_quality
+
+def calibration_grid_scan(detector, detector_fields, motor, motor_fields,
+                          calib_motors, calib_fields, grid_motor, 
+                          grid_positions, start, stop, steps, grid_field=None, first_step=0.01,
+                          average=None, filters=None, return_to_start=True,
+                          *args, **kwargs):
+    """Performs calibration scans of the main motor at several positions of a
+    second motor, for example the delay energy, and returns a grid correction
+    table over both motors.
+
+    The grid is filled in a snake pattern, alternating the direction of the
+    main motor scan at each grid position so no time is spent moving back to
+    the start. The detector scaling only depends on the calibration motors, so
+    the scaling walk is only performed once, after the first scan.
+
+    Parameters
+    ----------
+    detector : :class:`.BeamDetector`
+        Detector from which to take the value measurements
+
+    detector_fields : iterable
+        Fields of the detector to measure
+
+    motor : :class:`.Motor`
+        Main motor to perform the scans
+
+    motor_fields : iterable
+        Fields of the main motor to add to the scan dataframe. The first one is
+        used as the axis of the correction table.
+
+    calib_motors : iterable, :class:`.Motor`
+        Motor to calibrate each detector field with
+
+    calib_fields : iterable
+        Fields of the calibration motors
+
+    grid_motor : :class:`.Motor`
+        Second motor of the grid
+
+    grid_positions : iterable
+        Positions of the grid motor to perform the scans at
+
+    start : float
+        Starting position of main motor
+
+    stop : float
+        Ending position of main motor
+
+    steps : int
+        Number of steps to take at each grid position
+
+    grid_field : str, optional
+        Name of the grid axis column. Defaults to the name of the grid motor.
+
+    first_step : float, optional
+        First step to take on each calibration motor when performing the 
+        scaling walk
+
+    average : int, optional
+        Number of averages to take for each measurement
+
+    return_to_start : bool, optional
+        Move all the motors to their original positions after the scan has been
+        completed
+    
+    Returns
+    -------
+    df_calibration : pd.DataFrame
+        Grid correction table with the grid and main motor axis columns and
+        the absolute positions of the calibration motors.
+
+    df_calibration_scan : pd.DataFrame
+        Combined scans at every grid position, with the grid axis column.
+
+    scaling : list
+        List of the scaling values in units of motor egu / detector value used 
+        to calculate the calibration.
+
+    start_positions : list
+        List of starting positions used to perform the scaling walk.
+    """
+    calib_motors = as_list(calib_motors)
+    calib_fields = as_list(calib_fields or [m.name for m in calib_motors])
+    motor_fields = as_list(motor_fields or motor.read().keys())
+    grid_field = grid_field or grid_motor.name
+    if len(calib_motors) != len(as_list(detector_fields)):
+        raise ValueError("Must have same number of calibration motors as "
+                         "detector fields.")
+
+    @_return_to_start(motor, grid_motor, *calib_motors, 
+                      perform=return_to_start)
+    def inner():
+        scans = []
+        scaling = start_positions = None
+        for i, grid_position in enumerate(as_list(grid_positions)):
+            logger.debug("Calibration scan at {0} = {1}".format(grid_field,
+                                                                grid_position))
+            yield from abs_set(grid_motor, grid_position, wait=True)
+            # Snake through the grid
+            scan_start, scan_stop = (start, stop) if i % 2 == 0 else (stop, 
+                                                                      start)
+            df_scan = yield from calibration_centroid_scan(
+                detector, motor, calib_motors,
+                scan_start, scan_stop, steps,
+                detector_fields=detector_fields,
+                motor_fields=motor_fields,
+                calib_fields=calib_fields,
+                average=average,
+                filters=filters)
+            df_scan.insert(0, grid_field, grid_position)
+            scans.append(df_scan)
+
+            # Only the first grid position needs the scaling walk
+            if scaling is None:
+                scaling, start_positions = yield from detector_scaling_walk(
+                    df_scan.drop(columns=grid_field),
+                    detector,
+                    calib_motors,
+                    first_step=first_step,
+                    average=average,
+                    filters=filters,
+                    system=[motor, grid_motor],
+                    *args, **kwargs)
+
+        df_scan = pd.concat(scans)
+        df_calibration = build_grid_calibration_df(
+            df_scan, scaling, detector, [grid_field, motor_fields[0]])
+        return df_calibration, df_scan, scaling, start_positions
+
+    return (yield from inner())
+
+def build_grid_calibration_df(df_scan, scaling, detector, axis_fields):
+    """Builds a grid correction table from the combined scans of
+    :func:`.calibration_grid_scan`.
+
+    The positions of the calibration motors during each scan are recorded in
+    the "_pre" columns, so every row is corrected back to the detector values
+    of the first row of the combined scan.
+
+    Parameters
+    ----------
+    df_scan : pd.DataFrame
+        Combined scans containing the axis fields, the "_pre" calibration 
+        motor positions and the detector fields.
+
+    scaling : list
+        List of scales in the units of motor egu / detector value
+
+    detector : :class:`.Detector` or str
+        Detector, or detector name, used in the scan.
+
+    axis_fields : list
+        Columns of the scan to use as the axes of the table.
+
+    Returns
+    -------
+    df_calibration : pd.DataFrame
+        Grid correction table with the axis columns and the absolute positions
+        of the calibration motors.
+    """
+    detector_name = getattr(detector, "name", detector)
+    detector_fields = [col for col in df_scan.columns if detector_name in col]
+    pre_fields = [col for col in df_scan.columns if col.endswith("_pre")]
+    if len(detector_fields) != len(pre_fields):
+        raise ValueError("Must have same number of calibration fields as "
+                         "detector fields, but got {0} and {1}.".format(
+                             len(pre_fields), len(detector_fields)))
+
+    detector_values = df_scan[detector_fields].values.astype(float)
+    corrections = (df_scan[pre_fields].values.astype(float) - 
+                   (detector_values - detector_values[0]) * 
+                   np.asarray(scaling, dtype=float))
+    df_calibration = pd.DataFrame(
+        corrections, columns=[c[:-4]+"_post" for c in pre_fields])
+    for i, field in enumerate(axis_fields):
+        df_calibration.insert(i, field, df_scan[field].values)
+    return df_calibration
@@ -0,0 +1,142 @@
+"""
+Characterization plans for the SnD motors
+"""
+import time
+import logging
+import itertools
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from bluesky.utils import short_uid
+from bluesky.plan_stubs import abs_set, wait as plan_wait, checkpoint
+from bluesky.preprocessors import finalize_wrapper
+
+from .preprocessors import return_to_start as _return_to_start
+from ..utils import as_list
+
+logger = logging.getLogger(__name__)
+
+def retry_characterization(motor, move_sizes, retries_max=(0, 1, 3),
+                           retries_deadband=None, repeats=3,
+                           return_to_start=True):
+    """
+    Characterizes how the retry settings of an aerotech axis trade the total
+    move time against the final position error.
+
+    For every combination of maximum retries (``.RTRY``) and retry deadband
+    (``.RDBD``), the motor is moved back and forth around its starting position
+    by each of the move sizes. The time each move takes to complete, the final
+    error relative to the target and the number of retries used (``.RCNT``) are
+    recorded. The original retry settings are always restored at the end.
+
+    Parameters
+    ----------
+    motor : :class:`.AeroBase`
+        Aerotech axis to characterize.
+
+    move_sizes : iterable
+        Sizes of the moves to perform, in the units of the motor.
+
+    retries_max : iterable, optional
+        Maximum number of retries to test.
+
+    retries_deadband : iterable, optional
+        Retry deadbands to test. Defaults to the current deadband.
+
+    repeats : int, optional
+        Number of times each move is performed in each direction.
+
+    return_to_start : bool, optional
+        Move the motor back to its starting position at the end of the plan.
+
+    Returns
+    -------
+    df_retry : pd.DataFrame
+        DataFrame with one row per move containing the retries_max,
+        retries_deadband, move_size, direction, move_time, error and retries
+        used.
+    """
+    move_sizes = as_list(move_sizes)
+    retries_max = as_list(retries_max)
+    original_settings = OrderedDict([
+        (motor.retries_max, motor.retries_max.get()),
+        (motor.retries_deadband, motor.retries_deadband.get())])
+    retries_deadband = as_list(retries_deadband or
+                               original_settings[motor.retries_deadband])
+    start = motor.position
+
+    @_return_to_start(motor, perform=return_to_start)
+    def inner():
+        rows = []
+        for rtry, rdbd in itertools.product(retries_max, retries_deadband):
+            logger.info("Characterizing '{0}' with RTRY={1} and RDBD={2}."
+                        "".format(motor.desc, rtry, rdbd))
+            yield from abs_set(motor.retries_max, rtry, wait=True)
+            yield from abs_set(motor.retries_deadband, rdbd, wait=True)
+            for size, _, direction in itertools.product(move_sizes,
+                                                        range(repeats),
+                                                        (1, -1)):
+                # Alternate directions so the motor stays around the start
+                target = start + size if direction > 0 else start
+                yield from checkpoint()
+                group = short_uid('set')
+                t0 = time.time()
+                yield from abs_set(motor, target, group=group)
+                yield from plan_wait(group=group)
+                move_time = time.time() - t0
+                rows.append([rtry, rdbd, size, direction, move_time,
+                             abs(motor.position - target),
+                             motor.retries.get()])
+        return pd.DataFrame(rows, columns=["retries_max", "retries_deadband",
+                                           "move_size", "direction",
+                                           "move_time", "error", "retries"])
+
+    def restore_settings():
+        group = short_uid('set')
+        for signal, value in original_settings.items():
+            yield from abs_set(signal, value, group=group)
+        yield from plan_wait(group=group)
+
+    return (yield from finalize_wrapper(inner(), restore_settings()))
+
+def recommend_retry_settings(df_retry, tolerance, quantile=0.95):
+    """
+    Recommends the retry settings that meet the position tolerance with the
+    shortest move time.
+
+    Parameters
+    ----------
+    df_retry : pd.DataFrame
+        Results of :func:`.retry_characterization`.
+
+    tolerance : float
+        Largest acceptable final position error.
+
+    quantile : float, optional
+        Quantile of the final errors of a setting that has to be within the
+        tolerance.
+
+    Returns
+    -------
+    summary : pd.DataFrame
+        DataFrame indexed by retries_max and retries_deadband containing the
+        error quantile, the mean move time, the mean number of retries used and
+        whether the setting is recommended.
+    """
+    grouped = df_retry.groupby(["retries_max", "retries_deadband"])
+    summary = pd.DataFrame({
+        "error": grouped["error"].quantile(quantile),
+        "move_time": grouped["move_time"].mean(),
+        "retries": grouped["retries"].mean()})
+    summary["recommended"] = False
+
+    within_tolerance = summary[summary["error"] <= tolerance]
+    if within_tolerance.empty:
+        logger.warning("No retry setting kept the error within {0}, "
+                       "recommending the most accurate one.".format(tolerance))
+        best = summary["error"].idxmin()
+    else:
+        best = within_tolerance["move_time"].idxmin()
+    summary.loc[best, "recommended"] = True
+    return summary
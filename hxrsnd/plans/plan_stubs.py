@@ -10,12 +10,15 @@ import math
 ###############
 # Third Party #
 ###############
+import numpy as np
+from bluesky import Msg
 
 ########
 # SLAC #
 ########
 from pswalker.utils             import field_prepend
 from pswalker.plans             import measure_average
+from pswalker.utils.exceptions  import FilterCountError
 
 ##########
 # Module #
@@ -34,8 +37,175 @@ def block_run_control(msg):
         return None
     return msg
 
+def adaptive_average(detectors, fields, target_error, min_shots=3,
+                     max_shots=100, filters=None, drop_missing=True,
+                     max_dropped=50):
+    """
+    Averages the detectors until the standard error of every field is below a
+    target.
+
+    Shots are taken in batches like :func:`pswalker.plans.measure`, emitting
+    an event per shot. After the first ``min_shots``, the size of the next
+    batch is estimated from the current spread of the fields as the number of
+    shots needed to reach the target. The filters are evaluated over all of
+    the shots of a batch at once, and the sums of the accepted shots are kept
+    to update the mean and standard error of every field.
+
+    Parameters
+    ----------
+    detectors : list
+        Detectors to read at every shot
+
+    fields : iterable
+        Fields whose standard errors have to reach the target
+
+    target_error : float or dict
+        Target standard error of the fields, or a dictionary with the target
+        of each field
+
+    min_shots : int, optional
+        Minimum number of accepted shots
+
+    max_shots : int, optional
+        Maximum number of accepted shots, reached when the target is not
+
+    filters : dict, optional
+        Key, callable pairs of event keys and single input functions that
+        evaluate to True or False. For more infromation see
+        :meth:`.apply_filters`
+
+    drop_missing : bool, optional
+        Drop shots where the filter keys are missing, NaN or infinite
+
+    max_dropped : int, optional
+        Maximum number of shots dropped by the filters in a row
+
+    Returns
+    -------
+    average : dict
+        Mean of every field read over the accepted shots, or the last value of
+        the fields that can not be averaged
+
+    error : dict
+        Standard error of the mean of each of the requested fields
+
+    Raises
+    ------
+    FilterCountError
+        If more than ``max_dropped`` shots in a row are dropped by the filters
+    """
+    detectors = as_list(detectors)
+    fields = as_list(fields)
+    filters = filters or dict()
+    if not isinstance(target_error, dict):
+        target_error = dict.fromkeys(fields, target_error)
+    min_shots = max(min(min_shots, max_shots), 1)
+    targets = np.array([target_error[fld] for fld in fields], dtype=float)
+
+    accepted, dropped = 0, 0
+    totals, squares = np.zeros(len(fields)), np.zeros(len(fields))
+    last = dict()
+    sums = dict()
+    batch = min_shots
+    while batch > 0:
+        # Take a batch of shots, emitting an event for each
+        shots = list()
+        for _ in range(batch):
+            for det in detectors:
+                yield Msg('trigger', det, group='adaptive_average')
+            yield Msg('wait', None, 'adaptive_average')
+            yield Msg('create', None, name='primary')
+            reads = dict()
+            for det in detectors:
+                cur_det = yield Msg('read', det)
+                reads.update((k, v['value']) for k, v in cur_det.items())
+            yield Msg('save')
+            shots.append(reads)
+
+        # Filter all of the shots of the batch at once
+        mask = _filter_mask(shots, filters, drop_missing)
+        good = [shot for shot, keep in zip(shots, mask) if keep]
+        dropped = 0 if good else dropped + len(shots)
+        if dropped > max_dropped:
+            raise FilterCountError("Dropped {0} shots in a row".format(
+                dropped))
+
+        # Update the running sums of the accepted shots
+        if good:
+            values = np.array([[shot[fld] for fld in fields] for shot in good],
+                              dtype=float)
+            totals += values.sum(axis=0)
+            squares += (values**2).sum(axis=0)
+            accepted += len(good)
+            last.update(good[-1])
+            for key in good[-1]:
+                try:
+                    sums[key] = sums.get(key, 0) + sum(shot[key]
+                                                       for shot in good)
+                except TypeError:
+                    sums[key] = None
+
+        # Estimate the number of shots needed to reach the target
+        mean = totals / max(accepted, 1)
+        variance = (np.clip(squares - accepted*mean**2, 0, None) /
+                    max(accepted - 1, 1))
+        if accepted < min_shots:
+            batch = min_shots - accepted
+            continue
+        needed = np.max(np.ceil(variance / targets**2))
+        batch = int(min(needed, max_shots) - accepted)
+        batch = max(batch, 0)
+
+    error = dict(zip(fields, np.sqrt(variance / accepted)))
+    average = dict((key, last[key] if total is None else total / accepted)
+                   for key, total in sums.items())
+    logger.debug("Averaged %s shots, dropped %s, with errors %s", accepted,
+                 dropped, error)
+    return average, error
+
+def _filter_mask(shots, filters, drop_missing=True):
+    """
+    Evaluates the filters over a list of shots at once, returning a boolean
+    mask of the shots that pass all of them.
+    """
+    mask = np.ones(len(shots), dtype=bool)
+    for key, func in filters.items():
+        try:
+            values = np.array([shot[key] for shot in shots], dtype=float)
+        except (KeyError, TypeError, ValueError):
+            # Missing or non numeric values are filtered shot by shot
+            mask &= [_filter_shot(shot, key, func, drop_missing)
+                     for shot in shots]
+            continue
+        finite = np.isfinite(values)
+        if values.ndim > 1:
+            finite = finite.all(axis=tuple(range(1, values.ndim)))
+        try:
+            passed = np.asarray(func(values), dtype=bool)
+        except Exception:
+            passed = None
+        if passed is None or passed.shape != finite.shape:
+            # The filter only accepts single values, or reduced the batch to
+            # a single result instead of one per shot
+            passed = np.array([bool(func(v)) for v in values], dtype=bool)
+        mask &= np.where(finite, passed, not drop_missing)
+    return mask
+
+def _filter_shot(shot, key, func, drop_missing):
+    """
+    Evaluates a single filter on a single shot.
+    """
+    if key not in shot:
+        return not drop_missing
+    try:
+        if not np.isfinite(shot[key]).all():
+            return not drop_missing
+    except TypeError:
+        pass
+    return bool(func(shot[key]))
+
 def euclidean_distance(device, device_fields, targets, average=None,
-                       filters=None):
+                       filters=None, target_error=None):
     """
     Calculates the euclidean distance between the device_fields and targets.
 
@@ -51,13 +221,22 @@ def euclidean_distance(device, device_fields, targets, average=None,
         Target value to calculate the distance from
 
     average : int, optional
-        Number of averages to take for each measurement
+        Number of averages to take for each measurement, or the maximum number
+        of shots with a target error, 100 by default
+
+    filters : dict, optional
+        Filters used to drop shots from the measurement
+
+    target_error : float, optional
+        Average until the standard error of every field is below this value,
+        see :func:`.adaptive_average`
     
     Returns
     -------
     distance : float
         The euclidean distance between the device fields and the targets.
     """
+    max_shots = average or 100
     average = average or 1
     # Turn things into lists
     device_fields = as_list(device_fields)
@@ -72,7 +251,14 @@ def euclidean_distance(device, device_fields, targets, average=None,
                          "Got {0} and {1}".format(len(device_fields, 
                                                       len(targets))))
     # Measure the average
-    read = (yield from measure_average([device], num=average, filters=filters))
+    if target_error is None:
+        read = (yield from measure_average([device], num=average,
+                                           filters=filters))
+    else:
+        read, _ = yield from adaptive_average([device], prep_dev_fields,
+                                              target_error,
+                                              max_shots=max_shots,
+                                              filters=filters)
     # Get the squared differences between the centroids
     squared_differences = [(read[fld]-target)**2 for fld, target in zip(
         prep_dev_fields, targets)]
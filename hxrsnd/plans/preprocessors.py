@@ -1,9 +1,12 @@
 import logging
 from functools import wraps
+from collections import OrderedDict
 
 from bluesky.utils import short_uid
 from bluesky.plan_stubs import wait as plan_wait, abs_set, checkpoint
 
+logger = logging.getLogger(__name__)
+
 def return_to_start(*devices, perform=True):
     """
     Decorator that will find the current positions of all the inputted devices,
@@ -26,3 +29,88 @@ def return_to_start(*devices, perform=True):
                     yield from plan_wait(group=group)
         return wrapper
     return decorator
+
+def frame_average_settings(detector, num, proc='proc1', stats='stats2'):
+    """
+    Returns the area detector settings that average frames on the IOC.
+
+    The processing plugin averages ``num`` frames using its filter and only
+    passes on the average, which the stats plugin then reads from. The camera
+    is put in the "Multiple" image mode and acquires ``num`` frames per
+    trigger, so a single trigger produces one averaged frame.
+
+    Parameters
+    ----------
+    detector : :class:`.PCDSDetector`
+        Area detector to configure
+
+    num : int
+        Number of frames to average
+
+    proc : str, optional
+        Attribute name of the processing plugin
+
+    stats : str, optional
+        Attribute name of the stats plugin that reads the average
+
+    Returns
+    -------
+    settings : OrderedDict
+        Signal, value pairs in the order they should be set
+    """
+    proc_plugin = getattr(detector, proc)
+    stats_plugin = getattr(detector, stats)
+    settings = OrderedDict([
+        (proc_plugin.enable, 1),
+        (proc_plugin.filter_type, 'Average'),
+        (proc_plugin.num_filter, num),
+        (proc_plugin.auto_reset_filter, 1),
+        (proc_plugin.filter_callbacks, 1),
+        (proc_plugin.enable_filter, 1),
+        (stats_plugin.nd_array_port, proc_plugin.port_name.get())])
+    cam = getattr(detector, 'cam', None)
+    if cam is not None and hasattr(cam, 'num_images'):
+        # The number of images is ignored in the Single and Continuous modes
+        settings[cam.image_mode] = 'Multiple'
+        settings[cam.num_images] = num
+    return settings
+
+def average_frames(*detectors, num=None, proc='proc1', stats='stats2'):
+    """
+    Decorator that configures the inputted area detectors to average ``num``
+    frames on the IOC for every trigger while running the inner plan, and
+    restores their original settings afterwards.
+
+    See :func:`.frame_average_settings` for the settings used. If ``num`` is
+    None the inner plan runs unchanged.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not num:
+                return (yield from func(*args, **kwargs))
+            settings = OrderedDict()
+            for det in detectors:
+                settings.update(frame_average_settings(det, num, proc=proc,
+                                                       stats=stats))
+            # Save the current settings to restore them afterwards
+            initial_settings = OrderedDict((sig, sig.get())
+                                           for sig in settings)
+            logger.debug("Averaging %s frames per trigger on %s", num,
+                         [det.name for det in detectors])
+            group = short_uid('set')
+            for sig, value in settings.items():
+                yield from abs_set(sig, value, group=group)
+            for det in detectors:
+                yield from abs_set(getattr(det, proc).reset_filter, 1,
+                                   group=group)
+            yield from plan_wait(group=group)
+            try:
+                return (yield from func(*args, **kwargs))
+            finally:
+                group = short_uid('set')
+                for sig, value in initial_settings.items():
+                    yield from abs_set(sig, value, group=group)
+                yield from plan_wait(group=group)
+        return wrapper
+    return decorator
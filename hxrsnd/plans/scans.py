@@ -2,20 +2,25 @@
 Scans for HXRSnD
 """
 import logging
+from collections import OrderedDict
 
 import numpy as np
 import pandas as pd
 from bluesky import Msg
-from bluesky.plans import scan
+from bluesky.plans import list_scan
 from bluesky.utils import short_uid as _short_uid
-from bluesky.plan_stubs import checkpoint, trigger_and_read, abs_set
+from bluesky.plan_stubs import (checkpoint, trigger_and_read, abs_set,
+                                wait as plan_wait)
 from bluesky.preprocessors import (stage_decorator, run_decorator, msg_mutator,
                                    stub_wrapper)
 
+from ophyd.utils import LimitError
 from pswalker.utils import field_prepend
 from pswalker.plans import measure_average
 
-from .preprocessors import return_to_start as _return_to_start
+from .plan_stubs import adaptive_average
+from .preprocessors import return_to_start as _return_to_start, average_frames
+from ..bragg import bragg_angle
 from ..utils import as_list
 
 logger = logging.getLogger(__name__)
@@ -97,7 +102,8 @@ def linear_scan(motor, start, stop, num, use_diag=True, return_to_start=True,
 def centroid_scan(detector, motor, start, stop, steps, average=None, 
                   detector_fields=['stats2_centroid_x', 'stats2_centroid_y'], 
                   motor_fields=None, system=None, system_fields=None,
-                  filters=None, return_to_start=True, *args, **kwargs):
+                  filters=None, return_to_start=True, callback=None, 
+                  target_error=None, frame_average=None, *args, **kwargs):
     """
     Performs a scan and returns the centroids of the inputted detector.
 
@@ -107,8 +113,9 @@ def centroid_scan(detector, motor, start, stop, steps, average=None,
 
     Parameters
     ----------
-    detector : :class:`.BeamDetector`
-        Detector from which to take the value measurements
+    detector : :class:`.BeamDetector` or list
+        Detector from which to take the value measurements, or list of
+        detectors to measure at every step
     
     motor : :class:`.Motor`
         Main motor to perform the scan
@@ -123,10 +130,13 @@ def centroid_scan(detector, motor, start, stop, steps, average=None,
         Number of steps to take
     
     average : int, optional
-        Number of averages to take for each measurement
+        Number of averages to take for each measurement, or the maximum number
+        of shots with a target error, 100 by default
 
     detector_fields : iterable, optional
-        Fields of the detector to add to the returned dataframe
+        Fields of the detector to add to the returned dataframe. For several
+        detectors, either the fields of all the detectors or one list of
+        fields per detector.
 
     motor_fields : iterable, optional
         Fields of the motor to add to the returned dataframe
@@ -144,6 +154,19 @@ def centroid_scan(detector, motor, start, stop, steps, average=None,
 
     return_to_start : bool, optional
         Move the scan motor back to its initial position after the scan     
+
+    callback : callable, optional
+        Function called after every step with a dataframe of the steps
+        measured so far, for example to plot the scan live.
+
+    target_error : float or dict, optional
+        Average every step until the standard error of each detector field is
+        below this value, see :func:`.adaptive_average`
+
+    frame_average : int, optional
+        Number of frames the area detectors average on the IOC for every
+        trigger during the scan, see :func:`.average_frames`. Leaving
+        ``average`` as None then triggers once per step
     
     Returns
     -------
@@ -151,22 +174,123 @@ def centroid_scan(detector, motor, start, stop, steps, average=None,
         DataFrame containing the detector, motor, and system fields at every
         step of the scan.
     """
+    return (yield from centroid_list_scan(
+        detector, motor, np.linspace(start, stop, steps), average=average,
+        detector_fields=detector_fields, motor_fields=motor_fields,
+        system=system, system_fields=system_fields, filters=filters,
+        return_to_start=return_to_start, callback=callback,
+        target_error=target_error, frame_average=frame_average, *args,
+        **kwargs))
+
+def centroid_list_scan(detector, motor, positions, average=None, 
+                       detector_fields=['stats2_centroid_x', 
+                                        'stats2_centroid_y'], 
+                       motor_fields=None, system=None, system_fields=None,
+                       filters=None, return_to_start=True, callback=None,
+                       target_error=None, frame_average=None, *args, **kwargs):
+    """
+    Performs a scan over a list of positions and returns the centroids of the
+    inputted detector.
+
+    The values are returned in a pandas DataFrame where the indices are the
+    target motor positions, in the order they were measured. Several detectors
+    can be measured at every step of the same motion, in which case their
+    columns are all in the dataframe, prepended by the detector names.
+
+    Parameters
+    ----------
+    detector : :class:`.BeamDetector` or list
+        Detector from which to take the value measurements, or list of
+        detectors to measure at every step
+    
+    motor : :class:`.Motor`
+        Main motor to perform the scan
+
+    positions : iterable
+        Positions of the motor to measure at
+
+    average : int, optional
+        Number of averages to take for each measurement, or the maximum number
+        of shots with a target error, 100 by default
+
+    detector_fields : iterable, optional
+        Fields of the detector to add to the returned dataframe. For several
+        detectors, either the fields of all the detectors or one list of
+        fields per detector.
+
+    motor_fields : iterable, optional
+        Fields of the motor to add to the returned dataframe
+
+    system : list, optional
+        Extra devices to include in the datastream as we measure the average
+        
+    system_fields : list, optional
+        Fields of the extra devices to add to the returned dataframe
+
+    filters : dict, optional
+        Key, callable pairs of event keys and single input functions that
+        evaluate to True or False. For more infromation see
+        :meth:`.apply_filters`
+
+    return_to_start : bool, optional
+        Move the scan motor back to its initial position after the scan     
+
+    callback : callable, optional
+        Function called after every step with a dataframe of the steps
+        measured so far, for example to plot the scan live.
+
+    target_error : float or dict, optional
+        Average every step until the standard error of each detector field is
+        below this value, see :func:`.adaptive_average`. Only the
+        ``min_shots``, ``drop_missing`` and ``max_dropped`` keywords are then
+        passed on to the average
+
+    frame_average : int, optional
+        Number of frames the area detectors average on the IOC for every
+        trigger during the scan, see :func:`.average_frames`. Leaving
+        ``average`` as None then triggers once per step
+    
+    Returns
+    -------
+    df : pd.DataFrame
+        DataFrame containing the detector, motor, and system fields at every
+        step of the scan.
+
+    Raises
+    ------
+    ValueError
+        If keywords that :func:`.adaptive_average` does not accept are passed
+        with a target error
+    """
+    if target_error is not None:
+        unsupported = set(kwargs) - {'min_shots', 'drop_missing', 'max_dropped'}
+        if args or unsupported:
+            raise ValueError("Arguments {0} are not supported when averaging "
+                             "to a target error.".format(
+                                 list(args) + sorted(unsupported)))
+    positions = list(as_list(positions))
+    max_shots = average or 100
     average = average or 1
     system = as_list(system or [])
-    all_devices = [motor] + system + [detector]
+    detectors = as_list(detector)
+    all_devices = [motor] + system + detectors
 
     # Ensure all fields are lists
-    detector_fields = as_list(detector_fields)
+    detector_fields = detector_field_lists(detectors, detector_fields)
     motor_fields = as_list(motor_fields or motor.name)
     system_fields = as_list(system_fields or [])
 
     # Get the full detector fields
-    prep_det_fields = [field_prepend(fld, detector) for fld in detector_fields]
+    prep_det_fields = [field_prepend(fld, det) 
+                       for det, fields in zip(detectors, detector_fields)
+                       for fld in fields]
     # Put all the fields together into one list
     all_fields = motor_fields + system_fields + prep_det_fields
 
-    # Build the dataframe with the centroids
-    df = pd.DataFrame(columns=all_fields, index=np.linspace(start, stop, steps))
+    # Preallocate the values of every step, filled in the order measured
+    values = np.full((len(positions), len(all_fields)), np.nan)
+    index = np.asarray(positions, dtype=float)
+    measured = [0]
 
     # Create a basic measuring plan
     def per_step(detectors, motor, step):
@@ -175,19 +299,407 @@ def centroid_scan(detector, motor, start, stop, steps, average=None,
         logger.debug("Measuring average at step {0} ...".format(step))
         yield from abs_set(motor, step, wait=True)
         # Measure the average
-        reads = (yield from measure_average(all_devices, num=average,
-                                            filters=filters, *args, **kwargs))
-        # Fill the dataframe at this step with the centroid difference
-        for fld in all_fields:
-            df.loc[step, fld] = reads[fld]
+        if target_error is None:
+            reads = (yield from measure_average(all_devices, num=average,
+                                                filters=filters, *args,
+                                                **kwargs))
+        else:
+            reads, _ = yield from adaptive_average(all_devices,
+                                                   prep_det_fields,
+                                                   target_error,
+                                                   max_shots=max_shots,
+                                                   filters=filters, **kwargs)
+        # Fill the row of this step
+        i = measured[0]
+        values[i] = [reads[fld] for fld in all_fields]
+        measured[0] += 1
+        if callback is not None:
+            callback(pd.DataFrame(values[:i+1], index=index[:i+1],
+                                  columns=all_fields))
 
     # Run the inner plan
+    @average_frames(*detectors, num=frame_average)
     @_return_to_start(motor, perform=return_to_start)
     def inner():
-        plan = scan([detector], motor, start, stop, steps, per_step=per_step)
+        plan = list_scan(detectors, motor, positions, per_step=per_step)
         yield from stub_wrapper(plan)
     yield from inner()
 
-    # Return the filled dataframe
-    return df
+    # Build the dataframe once all the steps are measured
+    return pd.DataFrame(values, index=index, columns=all_fields)
     
+
+def detector_field_lists(detectors, detector_fields):
+    """
+    Returns one list of fields per detector.
+
+    Parameters
+    ----------
+    detectors : list
+        Detectors being measured
+
+    detector_fields : iterable
+        Fields shared by all the detectors, or one list of fields per detector
+
+    Returns
+    -------
+    detector_fields : list
+        List containing the list of fields of every detector
+
+    Raises
+    ------
+    ValueError
+        If lists of fields are passed but not one per detector.
+    """
+    detector_fields = as_list(detector_fields)
+    if not any(isinstance(fields, (list, tuple)) for fields in detector_fields):
+        return [detector_fields] * len(detectors)
+    if len(detector_fields) != len(detectors):
+        raise ValueError("Must have one list of fields per detector, got {0} "
+                         "lists for {1} detectors.".format(
+                             len(detector_fields), len(detectors)))
+    return [as_list(fields) for fields in detector_fields]
+
+
+def delay_fly_scan(delay, start, stop, duration=None, velocity=None,
+                   detectors=None, bins=None, period=0.01,
+                   return_to_start=True):
+    """
+    Flies the delay stages continuously from the start to the stop delay,
+    reading the detectors while they move.
+
+    The linear stages of both delay towers are moved to the lengths of the
+    start delay, then sent to the lengths of the stop delay at a constant
+    velocity. While they move, the stage readbacks and the detectors are read
+    every ``period`` seconds. The length of the first tower at the time of
+    every detector reading is interpolated from the timestamps of its
+    readbacks and converted to a delay. Only the delay stages move, so the
+    delay diagnostic and the calibration corrections are not applied during
+    the flight.
+
+    Parameters
+    ----------
+    delay : :class:`.DelayMacro`
+        Delay macromotor of the system
+
+    start : float
+        Starting delay in picoseconds
+
+    stop : float
+        Ending delay in picoseconds
+
+    duration : float, optional
+        Duration of the flight in seconds, used to compute the velocity
+
+    velocity : float, optional
+        Velocity of the delay stages in mm/s. Either the velocity or the
+        duration must be given
+
+    detectors : list, optional
+        Detectors to read during the flight
+
+    bins : int or array-like, optional
+        Number of delay bins or bin edges to average the readings into.
+        Defaults to one bin per 10 readings
+
+    period : float, optional
+        Time between readings in seconds
+
+    return_to_start : bool, optional
+        Move the delay stages back to their initial positions after the scan
+
+    Returns
+    -------
+    df_fly : pd.DataFrame
+        DataFrame with the time, length, delay and detector fields of every
+        reading
+
+    df_binned : pd.DataFrame
+        DataFrame indexed by the delay bin centers with the mean of every
+        field and the number of readings in each bin
+    """
+    if duration is None and velocity is None:
+        raise ValueError("Either the duration or the velocity of the fly scan "
+                         "must be given.")
+    detectors = as_list(detectors or [])
+    stages = [tower.L for tower in delay._delay_towers]
+    readbacks = [stage.user_readback for stage in stages]
+    start_length = float(delay._delay_to_length(start))
+    stop_length = float(delay._delay_to_length(stop))
+    if velocity is None:
+        velocity = abs(stop_length - start_length) / duration
+    original_velocities = [stage.velocity.get() for stage in stages]
+    rows = []
+
+    @_return_to_start(*stages, perform=return_to_start)
+    def inner():
+        # Move to the start at the normal velocity
+        yield from checkpoint()
+        group = _short_uid('set')
+        for stage in stages:
+            yield from abs_set(stage, start_length, group=group)
+        yield from plan_wait(group=group)
+
+        group = _short_uid('set')
+        for stage in stages:
+            yield from abs_set(stage.velocity, velocity, group=group)
+        yield from plan_wait(group=group)
+        try:
+            # Fly to the stop, reading until every stage has arrived
+            logger.debug("Flying the delay stages from %s to %s mm at %s "
+                         "mm/s", start_length, stop_length, velocity)
+            statuses = []
+            for stage in stages:
+                status = yield from abs_set(stage, stop_length)
+                statuses.append(status)
+            while True:
+                done = all(status.done for status in statuses)
+                reads = yield from trigger_and_read(readbacks + detectors)
+                rows.append(reads)
+                if done:
+                    break
+                yield Msg('sleep', None, period)
+        finally:
+            group = _short_uid('set')
+            for stage, vel in zip(stages, original_velocities):
+                yield from abs_set(stage.velocity, vel, group=group)
+            yield from plan_wait(group=group)
+
+    yield from inner()
+    return bin_fly_scan(rows, delay, readbacks[0].name, bins=bins)
+
+def bin_fly_scan(reads, delay, length_field, bins=None):
+    """
+    Converts the readings of :func:`.delay_fly_scan` to delays and averages
+    them into delay bins.
+
+    Parameters
+    ----------
+    reads : list
+        Readings of every event, as returned by ``trigger_and_read``
+
+    delay : :class:`.DelayMacro`
+        Delay macromotor used to convert the lengths to delays
+
+    length_field : str
+        Field of the delay stage readback
+
+    bins : int or array-like, optional
+        Number of delay bins or bin edges. Defaults to one bin per 10 readings
+
+    Returns
+    -------
+    df_fly : pd.DataFrame
+        DataFrame with the time, length, delay and detector fields of every
+        reading
+
+    df_binned : pd.DataFrame
+        DataFrame indexed by the delay bin centers with the mean of every
+        field and the number of readings in each bin
+    """
+    fields = [key for key, reading in reads[0].items()
+              if key != length_field and np.ndim(reading['value']) == 0]
+    length_times = np.array([r[length_field]['timestamp'] for r in reads])
+    lengths = np.array([r[length_field]['value'] for r in reads], dtype=float)
+    values = np.array([[r[fld]['value'] for fld in fields] for r in reads],
+                      dtype=float).reshape(len(reads), len(fields))
+    # Time of each reading, the latest timestamp of the detector fields
+    times = np.array([max([r[fld]['timestamp'] for fld in fields] or
+                          [r[length_field]['timestamp']]) for r in reads])
+
+    # Length at the time of each reading, from the timestamped readbacks
+    order = np.argsort(length_times, kind='stable')
+    lengths = np.interp(times, length_times[order], lengths[order])
+    delays = np.asarray(delay._length_to_delay(lengths), dtype=float)
+
+    df_fly = pd.DataFrame(values, columns=fields)
+    df_fly.insert(0, 'delay', delays)
+    df_fly.insert(0, length_field, lengths)
+    df_fly.insert(0, 'time', times)
+
+    # Average every field into the delay bins
+    if bins is None:
+        bins = max(len(reads) // 10, 1)
+    counts, edges = np.histogram(delays, bins=bins)
+    inside = (delays >= edges[0]) & (delays <= edges[-1])
+    idx = np.clip(np.searchsorted(edges, delays[inside], side='right') - 1, 0,
+                  len(counts) - 1)
+    data = df_fly.drop(columns='time').values[inside]
+    sums = np.zeros((len(counts), data.shape[1]))
+    np.add.at(sums, idx, data)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = sums / counts[:, np.newaxis]
+    df_binned = pd.DataFrame(means, columns=df_fly.columns[1:],
+                             index=(edges[:-1] + edges[1:]) / 2)
+    df_binned.index.name = 'delay_bin'
+    df_binned['count'] = counts
+    return df_fly, df_binned
+
+
+def iso_delay_trajectory(snd, energies, delay=None, use_diag=True):
+    """
+    Computes the positions of the delay line motors that scan E1 through the
+    inputted energies while keeping the delay constant.
+
+    The positions of every energy are computed at once from arrays of
+    energies, using the same tower and macromotor methods as the moves of the
+    energy and delay macromotors, so the scan follows any change of the tower
+    geometry.
+
+    Parameters
+    ----------
+    snd : :class:`.SplitAndDelay`
+        Split and delay system
+
+    energies : array-like
+        Energies of the delay line in eV or keV
+
+    delay : float, optional
+        Delay to keep in picoseconds. Defaults to the current delay
+
+    use_diag : bool, optional
+        Include the delay diagnostic positions
+
+    Returns
+    -------
+    trajectory : pd.DataFrame
+        DataFrame indexed by the energies with a column of positions for every
+        motor, named after the motor
+    """
+    energies = np.asarray(as_list(energies), dtype=float)
+    if delay is None:
+        delay = snd.delay.position
+    length = snd.delay._delay_to_length(delay, theta1=bragg_angle(E=energies),
+                                        theta2=snd.theta2)
+    columns = OrderedDict()
+    for tower in snd.delay._delay_towers:
+        for motor, positions in zip(tower._energy_motors,
+                                    tower._get_move_positions(energies)):
+            columns[motor.name] = positions
+        columns[tower.L.name] = length
+    if use_diag:
+        columns[snd.dd.x.name] = snd.delay._get_delay_diagnostic_position(
+            E1=energies, delay=delay)
+    return pd.DataFrame(columns, index=pd.Index(energies, name='energy'))
+
+def _iso_delay_motors(snd, use_diag=True):
+    """
+    Returns the motors moved by an iso-delay energy scan, in the order of the
+    columns of :func:`.iso_delay_trajectory`.
+    """
+    motors = [motor for tower in snd.delay._delay_towers
+              for motor in tower._energy_motors + [tower.L]]
+    if use_diag:
+        motors.append(snd.dd.x)
+    return motors
+
+def check_trajectory(trajectory, motors):
+    """
+    Checks that every position of a trajectory is within the limits of its
+    motor and that the motors are ready to move, before any of them moves.
+
+    Parameters
+    ----------
+    trajectory : pd.DataFrame
+        DataFrame with a column of positions for every motor
+
+    motors : list
+        Motors in the order of the columns
+
+    Raises
+    ------
+    LimitError
+        If any of the positions is outside the limits of its motor
+    """
+    for motor, column in zip(motors, trajectory.columns):
+        positions = trajectory[column].values
+        low, high = getattr(motor, 'limits', (0, 0))
+        if low < high:
+            outside = (positions < low) | (positions > high)
+            if outside.any():
+                raise LimitError("Positions {0} of '{1}' are outside of its "
+                                 "limits {2}.".format(
+                                     positions[outside].tolist(), column,
+                                     (low, high)))
+        # Check the motor is enabled and not faulted only once
+        if hasattr(motor, 'check_status'):
+            motor.check_status()
+
+def iso_delay_energy_scan(snd, energies, delay=None, detectors=None,
+                          use_diag=True, average=None, filters=None,
+                          return_to_start=True):
+    """
+    Scans the energy of the delay line while keeping the delay constant.
+
+    The whole trajectory is computed with :func:`.iso_delay_trajectory` and
+    checked against the motor limits before anything moves. At each energy,
+    the angles and lengths of both delay towers and the delay diagnostic are
+    moved together, and the detectors are read once they all arrive. The
+    calibration corrections of the energy and delay macromotors are not
+    applied.
+
+    Parameters
+    ----------
+    snd : :class:`.SplitAndDelay`
+        Split and delay system
+
+    energies : array-like
+        Energies of the delay line in eV or keV
+
+    delay : float, optional
+        Delay to keep in picoseconds. Defaults to the current delay
+
+    detectors : list, optional
+        Detectors to read at every energy
+
+    use_diag : bool, optional
+        Move the delay diagnostic to follow the beam
+
+    average : int, optional
+        Number of averages to take for each measurement
+
+    filters : dict, optional
+        Key, callable pairs of event keys and single input functions that
+        evaluate to True or False. For more infromation see
+        :meth:`.apply_filters`
+
+    return_to_start : bool, optional
+        Move every motor back to its initial position after the scan
+
+    Returns
+    -------
+    df : pd.DataFrame
+        DataFrame indexed by the energies with the target positions of every
+        motor and the fields read at every energy
+
+    Raises
+    ------
+    LimitError
+        If any of the targets is outside the limits of its motor
+    """
+    trajectory = iso_delay_trajectory(snd, energies, delay=delay,
+                                      use_diag=use_diag)
+    motors = _iso_delay_motors(snd, use_diag=use_diag)
+    check_trajectory(trajectory, motors)
+    detectors = as_list(detectors or [])
+    rows = []
+
+    @_return_to_start(*motors, perform=return_to_start)
+    def inner():
+        for energy, targets in zip(trajectory.index, trajectory.values):
+            yield from checkpoint()
+            logger.debug("Moving the delay line to {0} eV.".format(energy))
+            group = _short_uid('set')
+            for motor, target in zip(motors, targets):
+                yield from abs_set(motor, target, group=group)
+            yield from plan_wait(group=group)
+            reads = yield from measure_average(detectors + motors,
+                                               num=average or 1,
+                                               filters=filters)
+            rows.append(reads)
+    yield from inner()
+
+    df_reads = pd.DataFrame(rows, index=trajectory.index)
+    df_reads = df_reads[[c for c in df_reads.columns
+                         if c not in trajectory.columns]]
+    return pd.concat([trajectory, df_reads], axis=1)
@@ -2,6 +2,8 @@
 Pneumatics for SnD
 """
 import logging
+import threading
+from weakref import WeakSet
 
 from ophyd import Component as Cmp
 from ophyd.signal import EpicsSignal, EpicsSignalRO
@@ -185,6 +187,115 @@ class PressureSwitch(PneuBase):
         return (self.position == "BAD")
 
 
+class PressureInterlock(object):
+    """
+    Subscription backed cache of a pressure switch state.
+
+    The state is kept up to date by a monitor on the pressure signal, so
+    checking the interlock before a move does not require a read. Monitors only
+    fire when the value changes, so a steady pressure is trusted for as long as
+    the signal stays connected. The signal is only read if no value has been
+    received yet or the connection was lost. When the pressure goes bad, any
+    registered axis that is moving is stopped immediately.
+
+    The interlock is owned by whoever creates it. Axes of the same tower can
+    share one by passing it to each of them.
+
+    Parameters
+    ----------
+    switch : :class:`.PressureSwitch`
+        Pressure switch to monitor.
+    """
+    def __init__(self, switch):
+        self.switch = switch
+        self._value = None
+        self._axes = WeakSet()
+        self._lock = threading.Lock()
+        self._cid = self.switch.pressure.subscribe(
+            self._update, event_type=self.switch.pressure.SUB_VALUE, run=False)
+
+    def register(self, axis):
+        """
+        Registers an axis that should be stopped if the pressure goes bad.
+
+        Parameters
+        ----------
+        axis : :class:`.InterlockedAero`
+            Axis using this interlock.
+        """
+        self._axes.add(axis)
+
+    def unsubscribe(self):
+        """
+        Removes the monitor on the pressure signal, after which the cached state
+        is no longer updated.
+        """
+        if self._cid is not None:
+            self.switch.pressure.unsubscribe(self._cid)
+            self._cid = None
+            self._value = None
+
+    def _update(self, value=None, timestamp=None, **kwargs):
+        """
+        Subscription callback that updates the cached state, aborting the moves
+        of all the registered axes if the pressure just went bad.
+        """
+        with self._lock:
+            was_bad = self._value == 1
+            self._value = value
+        if value == 1 and not was_bad:
+            # Do not put to the motors from within the monitor callback
+            threading.Thread(target=self._abort_moves, daemon=True).start()
+
+    def _abort_moves(self):
+        """
+        Stops all the registered axes that are currently moving.
+        """
+        for axis in list(self._axes):
+            try:
+                if axis.moving:
+                    logger.error("Pressure in {0} went bad, stopping '{1}'."
+                                 "".format(self.switch.desc, axis.desc))
+                    axis.stop()
+            except Exception as e:
+                logger.error("Failed to stop '{0}' after pressure loss: {1}"
+                             "".format(axis.desc, e))
+
+    @property
+    def fresh(self):
+        """
+        Returns if the cached state can be used without a read, which is the
+        case once a value was received and the signal is still connected.
+        """
+        return self._value is not None and self.switch.pressure.connected
+
+    @property
+    def value(self):
+        """
+        Returns the cached pressure switch value, reading it first if the cache
+        cannot be trusted.
+        """
+        if not self.fresh:
+            value = self.switch.pressure.get()
+            with self._lock:
+                self._value = value
+        return self._value
+
+    @property
+    def good(self):
+        """
+        Returns if the pressure is in the 'good' state.
+        """
+        return self.value == 0
+
+    @property
+    def bad(self):
+        """
+        Returns if the pressure is in the 'bad' state.
+        """
+        return self.value == 1
+
+
 class SndPneumatics(SndDevice):
     """
     Class that contains the various pneumatic components of the system.
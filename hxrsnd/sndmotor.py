@@ -2,10 +2,12 @@
 Script for abstract motor classes used in the SnD.
 """
 import time
+import hashlib
 import logging
 from functools import reduce
 from collections import OrderedDict
 
+import numpy as np
 import pandas as pd
 from ophyd.device import Component as Cmp
 from ophyd.signal import Signal
@@ -16,7 +18,11 @@ from bluesky.preprocessors  import run_wrapper
 from pcdsdevices.signal import Signal
 
 from .snddevice import SndDevice
-from .plans.calibration import calibrate_motor
+from .interpolation import (CalibrationTable, GridCalibrationTable,
+                            grid_axes, is_grid_table)
+from .calibstore import CalibrationStore
+from .plans.calibration import (calibrate_motor, recompute_calibration,
+                                calibration_grid_scan, calibration_quality)
 from .plans.preprocessors import return_to_start as _return_to_start
 from .exceptions import InputError
 from .utils import as_list
@@ -71,24 +77,58 @@ class SamMotor(SndMotor):
 
 
 # TODO: Add a centroid scanning method
-# TODO: Add ability to save caibrations to disk
-# TODO: Add ability to load calibrations from disk
 # TODO: Add ability to display calibrations
-# TODO: Add ability to change post-processing done to scan. 
-# TODO: Add ability to redo scaling on scan
 class CalibMotor(SndDevice):
     """
     Provides the calibration macro methods.
+
+    Parameters
+    ----------
+    calib_method : str, optional
+        Method used to interpolate the correction table, "linear", "cubic" or
+        "pchip". See :class:`.CalibrationTable` for more details.
+
+    calib_store : :class:`.CalibrationStore`, optional
+        Store used to save and load calibrations. If no calibration is
+        configured, the saved calibration closest to the current energies is
+        loaded on the first corrected move.
+
+    calib_grid_motors : list, optional
+        Additional axes of grid correction tables, such as the delay energy
+        motor. Set by :meth:`calibrate_grid` and used to resolve the motors
+        of saved grid calibrations.
+
+    Notes
+    -----
+    The validity and content hash of the calibration are computed once when it
+    changes and cached. ``read_configuration`` only returns a lightweight
+    summary of the calibration for the run documents, use
+    ``read_configuration(full=True)`` to get the full tables.
+
+    Subclasses that share calibration motors with another calibrated motor
+    can set ``calib_relative`` to apply their corrections as offsets, the
+    change of the table between the current and the target positions, so
+    they add to the corrections of the other motor instead of replacing them.
     """
+    calib_relative = False
+
     def __init__(self, prefix, name=None, calib_detector=None, 
                  calib_motors=None, calib_fields=None, motor_fields=None, 
-                 *args, **kwargs):
+                 calib_method="linear", calib_store=None, 
+                 calib_grid_motors=None, *args, **kwargs):
         super().__init__(prefix, name=name, *args, **kwargs)
+        self.calib_detector = calib_detector
         self.calib_motors = calib_motors
+        self.calib_grid_motors = calib_grid_motors
         self.calib_fields = calib_fields
         self.motor_fields = motor_fields
-        self.use_calib = False
+        self.calib_method = calib_method
+        self.calib_store = calib_store or CalibrationStore()
+        self._calib_load_attempted = False
         self._calib = OrderedDict()
+        self._calib_state_cache = (None, False, None)
+        self.use_calib = False
+        self._calib_table_cache = (None, None, None)
         self.configure()
 
     def calibrate(self, start, stop, steps, average=100, confirm_overwrite=True,
@@ -156,6 +196,142 @@ class CalibMotor(SndDevice):
         # Run the inner plan
         RE(run_wrapper(inner()))
 
+    def calibrate_grid(self, grid_motor, grid_positions, start, stop, steps,
+                       average=100, detector=None, detector_fields=None, 
+                       RE=None, return_to_start=True, *args, **kwargs):
+        """Performs calibration scans at several positions of a second motor,
+        such as the delay energy, and configures the motor with the resulting
+        grid correction table. See :func:`.calibration_grid_scan`.
+
+        Warning: This has not been commissioned.
+
+        Parameters
+        ----------
+        grid_motor : :class:`.Motor`
+            Second axis of the correction table
+
+        grid_positions : iterable
+            Positions of the grid motor to calibrate at
+
+        start : float
+            Starting position of motor
+
+        stop : float
+            Ending position of motor
+
+        steps : int
+            Number of steps to take at each grid position
+
+        average : int, optional
+            Number of averages to take for each measurement
+
+        detector : :class:`.BeamDetector`, optional
+            Detector from which to take the value measurements
+
+        detector_fields : iterable, optional
+            Fields of the detector to measure
+
+        RE : RunEngine, optional
+            Bluesky runengine instance to run the calibration plan.
+
+        return_to_start : bool, optional
+            Move all the motors to their original positions after the scan has 
+            been completed        
+        """
+        logger.warning('Calibration functionality has not been commissioned.')
+        RE = RE or self.parent.RE
+        detector = detector or self.calib_detector
+        detector_fields = detector_fields or self.detector_fields
+        calib_motors = as_list(self.calib_motors)
+
+        def inner():
+            df_calib, df_scan, scaling, start_pos = \
+              yield from calibration_grid_scan(
+                  detector, detector_fields, self, self.motor_fields,
+                  calib_motors, self.calib_fields, grid_motor, grid_positions,
+                  start, stop, steps, average=average, 
+                  return_to_start=return_to_start, *args, **kwargs)
+            self.calib_grid_motors = [grid_motor]
+            self.configure(calib=df_calib, scan=df_scan, 
+                           motors=[grid_motor, self]+calib_motors,
+                           scale=scaling, start=start_pos)
+
+        RE(run_wrapper(inner()))
+
+    def recalibrate(self, scaling=None, start=None, post_process=None,
+                    detector=None):
+        """Rebuilds the correction table from the configured centroid scan 
+        using new scaling values, start positions or post-processing, and 
+        updates the configuration. No scans are performed.
+
+        Parameters
+        ----------
+        scaling : list, optional
+            List of scales in the units of motor egu / detector value. Defaults
+            to the configured scaling.
+
+        start : list, optional
+            List of the initial positions of the calibration motors. Defaults 
+            to the configured start positions.
+
+        post_process : callable, optional
+            Function applied to the detector values of the scan before building
+            the table. See :func:`.recompute_calibration`.
+
+        detector : :class:`.BeamDetector`, optional
+            Detector used in the scan. Defaults to the calibration detector.
+
+        Returns
+        -------
+        configs : tuple of dict
+            old_config, new_config
+        """
+        scan = self._calib['scan']['value']
+        scaling = scaling or self._calib['scale']['value']
+        start = start or self._calib['start']['value']
+        if scan is None or not scaling or not start:
+            raise InputError("Recalibrating requires a configured scan as well "
+                             "as scaling values and start positions.")
+        # Grid tables are rebuilt over the same axes
+        calib = self._calib['calib']['value']
+        axes = grid_axes(calib) if is_grid_table(calib) else None
+        calib = recompute_calibration(scan, detector or self.calib_detector,
+                                      scaling, start, post_process=post_process,
+                                      axis_fields=axes)
+        return self.configure(calib=calib, scale=scaling, start=start)
+
+    def evaluate_calibration(self, detector=None):
+        """
+        Evaluates the quality of the current correction table using the stored
+        centroid scan. See :func:`.calibration_quality` for the metrics.
+
+        Parameters
+        ----------
+        detector : :class:`.Detector` or str, optional
+            Detector used in the scan. Defaults to ``calib_detector``.
+
+        Returns
+        -------
+        df_quality : pd.DataFrame
+            Quality metrics of every calibration motor.
+
+        Raises
+        ------
+        InputError
+            If there is no valid calibration, or if it is a grid table.
+        """
+        if not self.has_calib:
+            raise InputError("There is no valid calibration to evaluate.")
+        calib = self._calib['calib']['value']
+        if is_grid_table(calib):
+            raise InputError("Quality evaluation is only supported for one "
+                             "dimensional correction tables.")
+        return calibration_quality(calib, df_scan=self._calib['scan']['value'],
+                                   scaling=self._calib['scale']['value'],
+                                   start_positions=self._calib['start']['value'],
+                                   detector=detector or self.calib_detector,
+                                   method=self.calib_method)
+
     @property
     def calibration(self):
         """
@@ -168,7 +344,7 @@ class CalibMotor(SndDevice):
             calibration parameters.
         """
         if self.has_calib:
-            config = self.read_configuration()
+            config = self.read_configuration(full=True)
             # Grab the values of each of the calibration parameters
             calib = {fld : config[fld]['value'] 
                      for fld in ['calib', 'scan', 'scale', 'start']}
@@ -212,7 +388,7 @@ class CalibMotor(SndDevice):
             old_config, new_config
         """
         # Save prev for return statement
-        prev_config = self.read_configuration()
+        prev_config = self.read_configuration(full=True)
         self._config_calib(calib, motors, scan, scale, start)
 
         # If we get a good calibration, change use_calib so we can use it
@@ -220,7 +396,7 @@ class CalibMotor(SndDevice):
             self.use_calib = True
 
         # Return the previous and new configs
-        return prev_config, self.read_configuration()
+        return prev_config, self.read_configuration(full=True)
 
     def _config_calib(self, calib, motors, scan, scale, start):
         """
@@ -261,6 +437,10 @@ class CalibMotor(SndDevice):
         self._check_calib(save_calib)
         # We made it through the check, therefore it is safe to use
         self._calib = save_calib
+        self._calib_table_cache = (None, None, None)
+        self._calib_state_cache = (self._calib_state_key(), 
+                                   save_calib['calib']['value'] is not None,
+                                   None)
 
     def _check_calib(self, save_calib):
         """
@@ -313,10 +493,126 @@ class CalibMotor(SndDevice):
                            "but not all configuration data. Some calibration "
                            "updating methods may not be functional!")
 
+    def _calib_energies(self):
+        """
+        Returns the energy configuration of the system the calibration is
+        valid for, used to key the saved calibrations.
+
+        Returns
+        -------
+        energies : OrderedDict
+            Positions of the energy macromotors of the parent system, empty if
+            there is no parent or they cannot be read.
+        """
+        energies = OrderedDict()
+        for attr in ("E1", "E2"):
+            motor = getattr(self.parent, attr, None)
+            if motor is None:
+                continue
+            try:
+                energies[attr] = motor.position
+            except Exception as e:
+                logger.debug("Could not read '{0}' for the calibration energy "
+                             "configuration: {1}".format(attr, e))
+        return energies
+
+    def save_calibration(self, store=None):
+        """
+        Saves the current calibration as a new version in the calibration 
+        store, keyed by the current energy configuration.
+
+        Parameters
+        ----------
+        store : :class:`.CalibrationStore`, optional
+            Store to save to instead of ``calib_store``.
+
+        Returns
+        -------
+        path : Path
+            Path of the saved version.
+        """
+        if not self.has_calib:
+            raise InputError("There is no valid calibration to save.")
+        store = store or self.calib_store
+        calibration = self.calibration
+        # Attach the quality metrics when the calibration can be evaluated
+        try:
+            calibration['quality'] = self.evaluate_calibration()
+        except InputError as e:
+            logger.debug("Saving '{0}' without quality metrics: {1}".format(
+                self.name, e))
+        return store.save(self.name, calibration, self._calib_energies())
+
+    def load_calibration(self, version=None, energies=None, store=None):
+        """
+        Loads a saved calibration and configures the motor with it.
+
+        Parameters
+        ----------
+        version : int, optional
+            Index of the version to load. Defaults to the version closest to
+            the inputted energies, or to the current ones, the latest if there
+            are several.
+
+        energies : dict, optional
+            Energy configuration to match when picking the version.
+
+        store : :class:`.CalibrationStore`, optional
+            Store to load from instead of ``calib_store``.
+
+        Returns
+        -------
+        configs : tuple of dict
+            old_config, new_config
+
+        Raises
+        ------
+        InputError
+            If there is no saved calibration or its motors are not the motor,
+            its calibration motors or its grid motors.
+        """
+        store = store or self.calib_store
+        if version is None and energies is None:
+            energies = self._calib_energies()
+        calibration = store.load(self.name, version=version, energies=energies)
+
+        # Resolve the saved motor names into the motor objects
+        available = {mot.name : mot for mot in [self] + as_list(
+            self.calib_motors) + as_list(self.calib_grid_motors)}
+        try:
+            motors = [available[name] for name in calibration['motors'] or []]
+        except KeyError as e:
+            raise InputError("Saved calibration uses motor {0} which is not "
+                             "one of the calibration motors of '{1}'.".format(
+                                 e, self.name))
+        return self.configure(calib=calibration['calib'], motors=motors,
+                              scan=calibration['scan'],
+                              scale=calibration['scale'],
+                              start=calibration['start'])
+
+    def _load_calib_lazily(self):
+        """
+        Loads the saved calibration the first time a corrected move is
+        requested without a configured calibration.
+        """
+        calib = self._calib['calib']['value']
+        if self._calib_load_attempted or calib is not None:
+            return
+        self._calib_load_attempted = True
+        try:
+            self.load_calibration()
+            logger.info("Loaded the saved calibration of '{0}'.".format(
+                self.desc))
+        except InputError as e:
+            logger.debug("No saved calibration loaded for '{0}': {1}".format(
+                self.name, e))
+
     def _calib_compensate(self, position, *args, **kwargs):
         """
         Perform the additional corrected motions if there is a valid calibration
-        and the user has indicated that they want to perform them.
+        and the user has indicated that they want to perform them. Relative
+        corrections use the current position, so they must be started before
+        the main motors.
 
         Parameters
         ---------- 
@@ -328,8 +624,10 @@ class CalibMotor(SndDevice):
         status : AndStatus
             Status objects of all the extra motions performed.
         """
-        # Grab the current calibration
-        calib = self._calib['calib']['value']
+        # Load the saved calibration if this is the first corrected move
+        self._load_calib_lazily()
+
+        # Grab the current calibration motors
         motors = self._calib['motors']['value']
         status_list = []
 
@@ -338,27 +636,109 @@ class CalibMotor(SndDevice):
         if not self.has_calib or not self.use_calib:
             return 
 
-        # Grab the two rows where the main motor position (column 0) is
-        # closest to the inputted position
-        top = calib.iloc[(calib.iloc[:,0] - position).abs().argsort().iloc[:2]]
-        first, second = top.iloc[0], top.iloc[1]
-
-        # Get the slope between the lines between each of the motor values using
-        # the first column as the x positions
-        slopes = (second - first) / (second.iloc[0] - first.iloc[1])
-
-        # Use the slope and the closest point to interpolate the motor positions
-        # at the inputted position
-        interpolated_row = slopes * (position-first[0]) + first
+        # Interpolate the calibration motor positions at the inputted position
+        interpolated_row = self.calib_table(position)
+        calib_motors = motors[len(motors)-len(interpolated_row):]
+        if self.calib_relative:
+            # Offset the calibration motors by the change of the table
+            offsets = interpolated_row - self.calib_table(self.position)
+            interpolated_row = [motor.position + offset for motor, offset in
+                                zip(calib_motors, offsets)]
 
         # Move each calibration motor to the interpolated position
-        for i, motor in enumerate(motors[1:]):
-            status = motor.move(interpolated_row[i+1], *args, **kwargs)
+        for motor, motor_position in zip(calib_motors, interpolated_row):
+            status = motor.move(motor_position, *args, **kwargs)
             status_list.append(status)
 
         # Reduce all the status objects into one AndStatus object and return it
         return reduce(lambda x, y: x & y, status_list)
 
+    def _compiled_calib_table(self):
+        """
+        Returns the correction table compiled for interpolation.
+
+        Tables with a single axis column are compiled into a
+        :class:`.CalibrationTable` and tables with several axis columns, such
+        as (E1, delay), into a :class:`.GridCalibrationTable`. The compiled
+        table is reused until the table is replaced, :meth:`configure` is
+        called or ``calib_method`` changes. Edits made to the table in place
+        are not picked up, so re-run :meth:`configure` after making them.
+        """
+        calib = self._calib['calib']['value']
+        cached_calib, method, table = self._calib_table_cache
+        # Keep a reference to the table so its id cannot be reused
+        if (table is None or cached_calib is not calib or
+                method != self.calib_method):
+            if is_grid_table(calib):
+                grid_method = (self.calib_method if self.calib_method in 
+                               GridCalibrationTable.methods else "linear")
+                table = GridCalibrationTable(calib, method=grid_method)
+            else:
+                table = CalibrationTable(calib, method=self.calib_method)
+            self._calib_table_cache = (calib, self.calib_method, table)
+        return table
+
+    def _calib_points(self, positions):
+        """
+        Returns the points to look up in the correction table for the inputted
+        main motor positions. For grid tables the other axes are filled with
+        the current positions of their motors.
+        """
+        positions = np.asarray(positions, dtype=float)
+        table = self._compiled_calib_table()
+        if not isinstance(table, GridCalibrationTable):
+            return positions
+        motors = self._calib['motors']['value'][:len(table.axes)]
+        single = positions.ndim == 0
+        positions = np.atleast_1d(positions)
+        points = np.empty((len(positions), len(motors)))
+        for i, motor in enumerate(motors):
+            points[:, i] = positions if motor is self else motor.position
+        return points[0] if single else points
+
+    def calib_table(self, positions):
+        """
+        Returns the calibration motor positions at the inputted main motor
+        positions.
+
+        Parameters
+        ----------
+        positions : float or array-like
+            Main motor positions.
+
+        Returns
+        -------
+        calib_positions : np.ndarray
+            Positions of the calibration motors, of shape (n_motors,) for a
+            single position and (n_positions, n_motors) otherwise.
+        """
+        return self._compiled_calib_table()(self._calib_points(positions))
+
+    def calib_positions(self, positions):
+        """
+        Returns the corrected positions of the calibration motors for a whole
+        array of main motor positions, for example to precompute all the 
+        targets of a scan.
+
+        Parameters
+        ----------
+        positions : array-like
+            Main motor positions.
+
+        Returns
+        -------
+        df_positions : pd.DataFrame
+            Dataframe indexed by the main motor positions with one column per
+            calibration motor.
+        """
+        self._load_calib_lazily()
+        if not self.has_calib:
+            raise InputError("Cannot compute corrected positions without a "
+                             "valid calibration.")
+        positions = np.atleast_1d(np.asarray(positions, dtype=float))
+        return pd.DataFrame(self.calib_table(positions), index=positions,
+                            columns=self._compiled_calib_table().columns)
+
     @property
     def has_calib(self):
         """
@@ -376,20 +756,71 @@ class CalibMotor(SndDevice):
             True if there is a calibration that can be used for correction 
             motion, False otherwise.
         """
-        # Grab the current correction table and calibration motors
-        calib = self._calib['calib']['value']
-        motors = self._calib['motors']['value']
+        return self._calib_state()[1]
 
-        # Return False if we dont have a correction table
-        if calib is None:
-            return False
-        try:
-            # If we make it through the check, we have a valid calibration
-            self._check_calib(self._calib)
-            return True
-        except:
-            # An exception was raised, the config is somehow invalid
-            return False
+    @property
+    def calib_hash(self):
+        """
+        Returns a hash of the contents of the calibration, computed once per
+        calibration.
+
+        Returns
+        -------
+        calib_hash : str or None
+            SHA1 hex digest of the correction table, calibration motors, scan,
+            scales and start positions. None if there is no valid calibration.
+        """
+        key, valid, calib_hash = self._calib_state()
+        if valid and calib_hash is None:
+            calib_hash = self._hash_calib()
+            self._calib_state_cache = (key, valid, calib_hash)
+        return calib_hash
+
+    def _calib_state_key(self):
+        """
+        Returns the key identifying the current calibration parameters, the
+        parameters themselves. Holding references to them means a replaced
+        parameter can never be mistaken for a new one allocated at the same
+        address. Replacing any of the parameters invalidates the cached state.
+        """
+        return tuple(entry['value'] for entry in self._calib.values())
+
+    def _calib_state(self):
+        """
+        Returns the cached key, validity and hash of the calibration,
+        rechecking the calibration only if its parameters were replaced.
+        """
+        key = self._calib_state_key()
+        cached_key = self._calib_state_cache[0]
+        if (cached_key is None or len(key) != len(cached_key) or
+                any(new is not old for new, old in zip(key, cached_key))):
+            # Return False if we dont have a correction table
+            valid = self._calib['calib']['value'] is not None
+            if valid:
+                try:
+                    # If we make it through the check, the calibration is valid
+                    self._check_calib(self._calib)
+                except Exception:
+                    # An exception was raised, the config is somehow invalid
+                    valid = False
+            self._calib_state_cache = (key, valid, None)
+        return self._calib_state_cache
+
+    def _hash_calib(self):
+        """
+        Computes the hash of the contents of the calibration.
+        """
+        sha = hashlib.sha1()
+        for key in ('calib', 'scan'):
+            df = self._calib[key]['value']
+            if isinstance(df, pd.DataFrame):
+                sha.update(str(list(df.columns)).encode())
+                sha.update(pd.util.hash_pandas_object(df).values.tobytes())
+        motors = self._calib['motors']['value'] or []
+        sha.update(str([getattr(mot, 'name', mot) for mot in motors]).encode())
+        for key in ('scale', 'start'):
+            sha.update(str(self._calib[key]['value']).encode())
+        return sha.hexdigest()
 
     @property
     def use_calib(self):
@@ -420,10 +851,66 @@ class CalibMotor(SndDevice):
             logger.warning("use_calib is currently set to True but there is "
                            "no valid calibration to use")
     
-    def read_configuration(self):
-        return self._calib
+    def _calib_summary(self):
+        """
+        Returns the lightweight summary of the calibration used in the run
+        documents.
+        """
+        timestamp = max([entry['timestamp'] for entry in self._calib.values()]
+                        or [time.time()])
+        calib = self._calib['calib']['value']
+        motors = self._calib['motors']['value'] or []
+        summary = OrderedDict([
+            ('calib_valid', self.has_calib),
+            ('calib_hash', self.calib_hash or ''),
+            ('calib_shape', list(calib.shape) if isinstance(
+                calib, pd.DataFrame) else [0, 0]),
+            ('calib_motors', [getattr(mot, 'name', str(mot)) 
+                              for mot in motors]),
+            ('use_calib', self.use_calib)])
+        return OrderedDict((key, {'value': value, 'timestamp': timestamp})
+                           for key, value in summary.items())
+
+    def read_configuration(self, full=False):
+        """
+        Returns the configuration of the calibration.
 
-    def describe_configuration(self):
+        Parameters
+        ----------
+        full : bool, optional
+            Return the full calibration, including the correction table and
+            the scan, instead of the lightweight summary.
+
+        Returns
+        -------
+        config : OrderedDict
+            Summary containing the validity, hash, shape, motors and use of the
+            calibration, or the full calibration if requested.
+        """
+        if full:
+            return self._calib
+        return self._calib_summary()
+
+    def describe_configuration(self, full=False):
+        """
+        Returns the description of the configuration returned by
+        ``read_configuration``.
+
+        Parameters
+        ----------
+        full : bool, optional
+            Describe the full calibration instead of the summary.
+        """
+        if not full:
+            summary = self._calib_summary()
+            dtypes = {'calib_valid': 'boolean', 'calib_hash': 'string',
+                      'calib_shape': 'array', 'calib_motors': 'array', 
+                      'use_calib': 'boolean'}
+            return OrderedDict(
+                (key, dict(source='calibrate', dtype=dtypes[key], 
+                           shape=[len(entry['value'])] if 
+                           dtypes[key] == 'array' else []))
+                for key, entry in summary.items())
         if not self._calib:
             return super().describe_configuration()
         if isinstance(self._calib['calib']['value'], pd.DataFrame):
@@ -10,6 +10,7 @@ from ophyd import Component as Cmp
 
 from .snddevice import SndDevice
 from .pneumatic import SndPneumatics
+from .homing import HomingSequencer
 from .utils import absolute_submodule_path
 from .tower import DelayTower, ChannelCutTower
 from .diode import HamamatsuXMotionDiode, HamamatsuXYMotionCamDiode
@@ -154,6 +155,34 @@ class SplitAndDelay(SndDevice):
         """
         return self.t2.theta    
 
+    def home(self, axes=None, direction="forward", print_report=True, 
+             **kwargs):
+        """
+        Homes the aerotech axes of the towers in parallel, pressurizing the 
+        air bearings of the interlocked axes first. See 
+        :class:`.HomingSequencer` for all the available keyword arguments.
+
+        Parameters
+        ----------
+        axes : list, optional
+            Aerotech axes to home. Defaults to all the tower aerotech axes.
+
+        direction : str or dict, optional
+            Homing direction, "forward" or "reverse", or a dictionary of axis
+            names to directions.
+
+        print_report : bool, optional
+            Log the timeline report instead of returning it.
+
+        Returns
+        -------
+        report : pd.DataFrame
+            Timeline of the homing sequence.
+        """
+        sequencer = HomingSequencer(self, axes=axes, direction=direction, 
+                                    **kwargs)
+        return sequencer.run(print_report=print_report)
+
     def main_screen(self, print_msg=True):
         """
         Launches the main SnD screen.
@@ -0,0 +1,26 @@
+import logging
+
+import pytest
+import numpy as np
+
+from ..bragg import (bragg_angle, darwin_width, rocking_width,
+                     structure_factor)
+
+logger = logging.getLogger(__name__)
+
+
+@pytest.mark.parametrize("E, hkl, arcsec", [(8000, (2,2,0), 5.2),
+                                            (8, (2,2,0), 5.2),
+                                            (8000, (1,1,1), 6.9),
+                                            (10000, (2,2,0), 4.1)])
+def test_darwin_width(E, hkl, arcsec):
+    assert np.isclose(darwin_width(E, hkl=hkl)*3600, arcsec, atol=0.1)
+
+def test_forbidden_reflection_has_no_width():
+    assert np.isclose(abs(structure_factor(hkl=(2,0,0))), 0)
+    assert np.isclose(darwin_width(8000, hkl=(2,0,0)), 0)
+
+def test_rocking_width_returns_bragg_angle():
+    theta, width = rocking_width(8000)
+    assert theta == bragg_angle(8000)
+    assert 0 < width < 0.01
@@ -0,0 +1,63 @@
+import time
+import logging
+
+import pytest
+import numpy as np
+import pandas as pd
+
+from ..calibstore import CalibrationStore
+from ..exceptions import InputError
+
+logger = logging.getLogger(__name__)
+
+calibration = {
+    'calib' : pd.DataFrame([[0, 1, 2], [1, 2, 3]],
+                           columns=["delay", "m1_post", "m2_post"]),
+    'scan' : pd.DataFrame([[0.5, 0.25], [1, 0.5]], index=[0., 1.],
+                          columns=["camera_centroid_x", "camera_centroid_y"]),
+    'motors' : ["delay", "m1", "m2"],
+    'scale' : [0.1, 0.2],
+    'start' : [1., 2.],
+    }
+
+def test_CalibrationStore_round_trips_calibrations(tmpdir):
+    store = CalibrationStore(str(tmpdir))
+    store.save("delay", calibration, energies={'E1': 8, 'E2': 9})
+    loaded = store.load("delay")
+    assert loaded['calib'].equals(calibration['calib'].astype(float))
+    assert loaded['scan'].equals(calibration['scan'])
+    for key in ('motors', 'scale', 'start'):
+        assert loaded[key] == calibration[key]
+    assert loaded['energies'] == {'E1': 8, 'E2': 9}
+
+def test_CalibrationStore_round_trips_quality(tmpdir):
+    store = CalibrationStore(str(tmpdir))
+    quality = pd.DataFrame([[2, 0.1], [2, 0.2]], index=["m1_post", "m2_post"],
+                           columns=["points", "loo_max"])
+    store.save("delay", dict(calibration, quality=quality))
+    assert store.load("delay")['quality'].equals(quality.astype(float))
+    # Calibrations without quality metrics load as None
+    store.save("delay", calibration)
+    assert store.load("delay")['quality'] is None
+
+def test_CalibrationStore_picks_version_by_energy(tmpdir):
+    store = CalibrationStore(str(tmpdir))
+    for energy in (8, 10, 8):
+        store.save("delay", calibration, energies={'E1': energy})
+        time.sleep(0.01)
+    versions = store.versions("delay")
+    assert len(versions) == 3
+    assert versions['timestamp'].is_monotonic_increasing
+    # Latest by default, latest of the closest ones when matching energies
+    assert store.load("delay")['timestamp'] == versions['timestamp'].iloc[2]
+    assert store.load("delay", energies={'E1': 9.5})['energies']['E1'] == 10
+    assert (store.load("delay", energies={'E1': 8.2})['timestamp'] == 
+            versions['timestamp'].iloc[2])
+    assert store.load("delay", version=0)['timestamp'] == \
+        versions['timestamp'].iloc[0]
+
+def test_CalibrationStore_raises_InputError_without_versions(tmpdir):
+    store = CalibrationStore(str(tmpdir))
+    assert store.versions("delay").empty
+    with pytest.raises(InputError):
+        store.load("delay")
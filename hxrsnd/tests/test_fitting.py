@@ -0,0 +1,65 @@
+import logging
+
+import pytest
+import numpy as np
+
+from ..fitting import (PeakFitter, LivePeakFit, lorentzian, pseudo_voigt,
+                       _lorentzian_jacobian, _pseudo_voigt_jacobian)
+
+logger = logging.getLogger(__name__)
+
+x = np.linspace(5, 15, 51)
+
+
+@pytest.mark.parametrize("func, jac, params", [
+    (lorentzian, _lorentzian_jacobian, [2., 10.3, 1.2]),
+    (pseudo_voigt, _pseudo_voigt_jacobian, [2., 10.3, 1.2, 0.4])])
+def test_jacobian_matches_finite_differences(func, jac, params):
+    params = np.array(params)
+    eps = 1e-6
+    numerical = np.column_stack([
+        (func(x, *(params + eps*step)) - func(x, *(params - eps*step)))
+        / (2*eps) for step in np.eye(len(params))])
+    assert np.allclose(jac(x, *params), numerical, atol=1e-7)
+
+@pytest.mark.parametrize("model, truth", [
+    ("lorentzian", {'amplitude': 3., 'center': 10.3, 'sigma': 0.8}),
+    ("pseudo_voigt", {'amplitude': 3., 'center': 10.3, 'sigma': 0.8,
+                      'fraction': 0.3})])
+@pytest.mark.parametrize("background", [False, True])
+def test_PeakFitter_recovers_parameters(model, truth, background):
+    fitter = PeakFitter(model=model, background=background)
+    truth = dict(truth, **({'c': 0.5} if background else {}))
+    result = fitter.fit(x, fitter.eval(x, **truth))
+    assert result.success
+    for name, value in truth.items():
+        assert np.isclose(result.values[name], value, rtol=1e-4)
+
+def test_PeakFitter_warm_starts_refits():
+    np.random.seed(0)
+    y = lorentzian(x, 3, 10.3, 0.8) + np.random.normal(0, 0.01, len(x))
+    fitter = PeakFitter()
+    cold = fitter.fit(x, y)
+    warm = fitter.fit(x, y)
+    assert warm.nfev < cold.nfev
+    assert np.isclose(warm.values['center'], 10.3, atol=3*warm.params[
+        'center'].stderr)
+
+def test_PeakFitter_raises_ValueError_on_bad_model():
+    with pytest.raises(ValueError):
+        PeakFitter(model="gaussian")
+
+@pytest.mark.parametrize("refit_every", [1, 4])
+def test_LivePeakFit_refit_cadence(refit_every):
+    fitter = PeakFitter()
+    fits = []
+    fit = fitter.fit
+    fitter.fit = lambda *args: fits.append(len(args[0])) or fit(*args)
+    live = LivePeakFit(fitter, 'y', 'x', refit_every=refit_every)
+    for pos in np.linspace(8, 12, 10):
+        live.event({'data': {'x': pos, 'y': lorentzian(pos, 3, 10, 1)}})
+    assert fits == list(range(3, 11, refit_every))
+    # The last points are always included when the run stops
+    live.stop({})
+    assert fits[-1] == 10
+    assert np.isclose(live.result.values['center'], 10)
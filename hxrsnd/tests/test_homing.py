@@ -0,0 +1,72 @@
+import time
+import logging
+import threading
+
+import pytest
+import numpy as np
+from ophyd.signal import Signal
+
+from ..homing import HomingSequencer, _HomingNode
+
+logger = logging.getLogger(__name__)
+
+
+class FakeHomingAxis(object):
+    """
+    Axis that finishes homing after a fixed duration.
+    """
+    def __init__(self, name, duration, dial=0):
+        self.name = name
+        self.desc = name
+        self.duration = duration
+        self.motor_done_move = Signal(name=name+"_dmov", value=1)
+        self.dial = Signal(name=name+"_dial", value=10)
+        self._home_dial = dial
+        self.stopped = False
+
+    def _home(self, *args, **kwargs):
+        self.motor_done_move.put(0)
+        def finish():
+            time.sleep(self.duration)
+            self.dial.put(self._home_dial)
+            self.motor_done_move.put(1)
+        threading.Thread(target=finish, daemon=True).start()
+
+    homf = homr = _home
+
+    def stop(self):
+        self.stopped = True
+
+
+def test_HomingSequencer_homes_axes_in_parallel():
+    axes = [FakeHomingAxis("ax{0}".format(i), 0.5) for i in range(4)]
+    sequencer = HomingSequencer(None, axes=axes, poll=0.01)
+    t0 = time.time()
+    report = sequencer.run(print_report=False)
+    # Parallel homing takes as long as a single axis
+    assert time.time() - t0 < 1.5
+    assert (report['state'] == "done").all()
+    assert report['verified'].all()
+
+def test_HomingSequencer_flags_unverified_dial():
+    axes = [FakeHomingAxis("good", 0.1), FakeHomingAxis("bad", 0.1, dial=1)]
+    report = HomingSequencer(None, axes=axes, poll=0.01).run(
+        print_report=False)
+    assert report.loc["good", "verified"]
+    assert not report.loc["bad", "verified"]
+
+def test_HomingSequencer_stops_axes_that_time_out():
+    axis = FakeHomingAxis("slow", 5)
+    report = HomingSequencer(None, axes=[axis], home_timeout=0.2,
+                             poll=0.01).run(print_report=False)
+    assert report.loc["slow", "state"] == "failed"
+    assert axis.stopped
+
+def test_HomingSequencer_raises_ValueError_on_bad_direction():
+    with pytest.raises(ValueError):
+        HomingSequencer(None, axes=[FakeHomingAxis("ax", 0)],
+                        direction="up")
+
+def test_HomingNode_requires_done():
+    with pytest.raises(TypeError):
+        _HomingNode("node")
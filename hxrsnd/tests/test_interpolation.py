@@ -0,0 +1,71 @@
+import logging
+
+import pytest
+import numpy as np
+import pandas as pd
+
+from ..interpolation import CalibrationTable, GridCalibrationTable
+from ..exceptions import InputError
+
+logger = logging.getLogger(__name__)
+
+df_calib = pd.DataFrame([[ 1, 2, -1],
+                         [-1, 0,  1],
+                         [ 0, 1,  0],
+                         [ 2, 6,  4]],
+                        columns=["delay", "m1_post", "m2_post"])
+
+@pytest.mark.parametrize("method", CalibrationTable.methods)
+def test_CalibrationTable_passes_through_table_points(method):
+    table = CalibrationTable(df_calib, method=method)
+    assert (table.x == [-1, 0, 1, 2]).all()
+    for _, row in df_calib.iterrows():
+        assert np.allclose(table(row["delay"]), row.values[1:])
+
+def test_CalibrationTable_linear_interpolates_and_extrapolates():
+    table = CalibrationTable(df_calib)
+    positions = np.array([-2, -0.5, 1.5, 3])
+    expected = np.array([[-1, 2], [0.5, 0.5], [4, 1.5], [10, 9]])
+    assert np.allclose(table(positions), expected)
+    assert table(0.5).shape == (2,)
+
+def test_CalibrationTable_averages_repeated_positions():
+    df = pd.DataFrame([[0, 0], [0, 2], [1, 3]], columns=["delay", "m1_post"])
+    table = CalibrationTable(df)
+    assert len(table) == 2
+    assert np.isclose(table(0), 1)
+
+def test_CalibrationTable_raises_errors_on_bad_inputs():
+    with pytest.raises(ValueError):
+        CalibrationTable(df_calib, method="quintic")
+    with pytest.raises(InputError):
+        CalibrationTable(df_calib.iloc[:1])
+
+def make_grid_calib():
+    energy, delay = np.meshgrid([8, 9, 10], [0, 50, 100], indexing='ij')
+    df = pd.DataFrame({"E1": energy.ravel(), "delay": delay.ravel()})
+    df["m1_post"] = 2*df["E1"] + 0.01*df["delay"]
+    df["m2_post"] = -df["E1"]
+    return df
+
+def test_GridCalibrationTable_interpolates_regular_grids():
+    table = GridCalibrationTable(make_grid_calib())
+    assert table.regular
+    assert table.axes == ["E1", "delay"]
+    assert np.allclose(table([9.5, 25]), [19.25, -9.5])
+    # Linear extrapolation outside of the grid
+    assert np.allclose(table([[11, 0], [8, 200]]), [[22, -11], [18, -8]])
+
+def test_GridCalibrationTable_interpolates_scattered_points():
+    table = GridCalibrationTable(make_grid_calib().iloc[:-1])
+    assert not table.regular
+    assert np.allclose(table([9.5, 25]), [19.25, -9.5])
+    # Points outside of the hull use the nearest point
+    assert np.allclose(table([12, 0]), [20, -10])
+
+def test_GridCalibrationTable_raises_InputError_on_bad_tables():
+    with pytest.raises(InputError):
+        GridCalibrationTable(make_grid_calib()[["E1", "m1_post"]])
+    with pytest.raises(InputError):
+        GridCalibrationTable(pd.DataFrame({"E1": [8, 9, 10], "delay": [0, 1, 2],
+                                           "m1_post": [0, 1, 2]}))
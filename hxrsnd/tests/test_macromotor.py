@@ -3,11 +3,14 @@
 import logging
 
 import pytest
+import pandas as pd
 from ophyd.device import Device
+from ophyd.status import Status
 from ophyd.tests.conftest import using_fake_epics_pv
 
 from .conftest import get_classes_in_module, fake_device
 from hxrsnd import macromotor
+from hxrsnd.sndmotor import CalibMotor
 
 logger = logging.getLogger(__name__)
 
@@ -20,3 +23,55 @@ def test_devices_instantiate_and_run_ophyd_functions(dev):
     assert(isinstance(device.describe(), dict))
     assert(isinstance(device.describe_configuration(), dict))
     assert(isinstance(device.read_configuration(), dict))
+
+@pytest.mark.parametrize("macro", [macromotor.DelayMacro, 
+                                   macromotor.Energy1Macro,
+                                   macromotor.Energy1CCMacro, 
+                                   macromotor.Energy2Macro])
+def test_macromotors_support_calibrations(macro):
+    assert issubclass(macro, CalibMotor)
+
+class FakeTower(object):
+    def set_energy(self, *args, **kwargs):
+        pass
+
+class FakeMotor(object):
+    def __init__(self, name, position=0):
+        self.name = name
+        self.position = position
+
+    def move(self, position, *args, **kwargs):
+        self.position = position
+        return Status(done=True, success=True)
+
+class FakeEnergy1Macro(macromotor.Energy1Macro):
+    energy = 7000
+
+    @property
+    def position(self):
+        return self.energy
+
+def test_Energy2Macro_move_applies_the_compensation():
+    macro = macromotor.Energy2Macro("TEST", name="E2")
+    macro._channelcut_towers = [FakeTower()]
+    chi2, y2 = FakeMotor("chi2"), FakeMotor("y2")
+    macro.configure(calib=pd.DataFrame([[7000, 0, 0], [8000, 1, -1]], 
+                                       columns=["E2", "chi2", "y2"]),
+                    motors=[macro, chi2, y2])
+    macro.use_calib = True
+    macro._move_towers_and_diagnostics(7500, None, use_diag=False)
+    assert chi2.position == 0.5
+    assert y2.position == -0.5
+
+def test_Energy1Macro_move_offsets_the_current_corrections():
+    macro = FakeEnergy1Macro("TEST", name="E1")
+    macro._delay_towers = [FakeTower()]
+    # Attocubes already corrected by the delay calibration
+    chi1, y1 = FakeMotor("chi1", 0.2), FakeMotor("y1")
+    macro.configure(calib=pd.DataFrame([[7000, 0, 0], [8000, 1, -1]], 
+                                       columns=["E1", "chi1", "y1"]),
+                    motors=[macro, chi1, y1])
+    macro.use_calib = True
+    macro._move_towers_and_diagnostics(7500, None, use_diag=False)
+    assert chi1.position == pytest.approx(0.7)
+    assert y1.position == pytest.approx(-0.5)
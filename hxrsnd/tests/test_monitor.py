@@ -0,0 +1,95 @@
+import time
+import logging
+
+import pytest
+import numpy as np
+from ophyd.signal import Signal
+
+from ..monitor import (RingBuffer, PositionMonitor, stability_statistics,
+                       amplitude_spectrum, trapezoidal_profile,
+                       FollowingErrorCapture)
+
+logger = logging.getLogger(__name__)
+
+
+def test_RingBuffer_wraps_around_in_order():
+    buffer = RingBuffer(5)
+    for i in range(8):
+        buffer.append(i, 10*i)
+    assert buffer.full
+    assert len(buffer) == 5
+    assert (buffer.timestamps == np.arange(3, 8)).all()
+    assert (buffer.values[:, 0] == 10*np.arange(3, 8)).all()
+    buffer.clear()
+    assert len(buffer) == 0
+
+def test_stability_statistics_separates_drift_from_jitter():
+    t = np.linspace(0, 10, 1001)
+    jitter = 0.01 * np.sin(2*np.pi*7*t)
+    stats = stability_statistics(t, 0.5*t + jitter)
+    assert np.isclose(stats['drift_rate'], 0.5, rtol=1e-3)
+    assert np.isclose(stats['rms_jitter'], 0.01/np.sqrt(2), rtol=1e-2)
+
+def test_amplitude_spectrum_finds_vibration():
+    t = np.sort(np.random.RandomState(0).uniform(0, 20, 4000))
+    freqs, amps = amplitude_spectrum(t, 0.2*np.sin(2*np.pi*13*t))
+    assert np.isclose(freqs[amps.argmax()], 13, atol=0.2)
+    # Allow for the scalloping loss of the Hann window
+    assert np.isclose(amps.max(), 0.2, rtol=0.2)
+
+def test_PositionMonitor_collects_readbacks():
+    sig = Signal(name="test_readback")
+    monitor = PositionMonitor(sig, size=10)
+    monitor.start()
+    for i in range(20):
+        sig.put(i)
+    monitor.stop()
+    sig.put(100)
+    _, values = monitor.data("test_readback")
+    assert (values == np.arange(10, 20)).all()
+    report = monitor.report(print_report=False)
+    assert report.loc["test_readback", "samples"] == 10
+
+def test_PositionMonitor_raises_TypeError_on_bad_devices():
+    with pytest.raises(TypeError):
+        PositionMonitor(object())
+
+@pytest.mark.parametrize("distance", [10, 1])
+def test_trapezoidal_profile_reaches_target(distance):
+    t = np.linspace(0, 5, 501)
+    positions, duration = trapezoidal_profile(t, 0, distance, 5, 0.5)
+    assert positions[0] == 0
+    assert np.isclose(positions[-1], distance)
+    assert (np.diff(positions) >= 0).all()
+    # Full speed moves take the accelerations plus the constant velocity
+    if distance == 10:
+        assert np.isclose(duration, 2.5)
+    else:
+        assert duration < 1
+
+class FakeCaptureMotor(object):
+    def __init__(self, position=0):
+        self.user_readback = Signal(name="rbv", value=position)
+        self.dial = Signal(name="drbv", value=position)
+        self.velocity = Signal(name="velo", value=1)
+        self.acceleration = Signal(name="accl", value=0.1)
+        self.retries_deadband = Signal(name="rdbd", value=0.01)
+
+def test_FollowingErrorCapture_computes_overshoot_and_settle_time():
+    motor = FakeCaptureMotor()
+    capture = FollowingErrorCapture(motor)
+    capture.start(1)
+    for value in (0.5, 1.05, 0.98, 1.002, 1.0):
+        time.sleep(0.01)
+        motor.user_readback.put(value)
+        motor.dial.put(value - 2)
+    capture.stop()
+    motor.user_readback.put(5)
+    results = capture.results()
+    assert results['samples'] == 6
+    assert np.isclose(results['overshoot'], 0.05)
+    assert results['settle_time'] == capture.data().index[4]
+    assert results['final_error'] == 0
+    assert results['peak_following_error'] > 0
+    assert np.isclose(results['offset'], 2)
+    assert capture.data()['dial'].values[0] == 0
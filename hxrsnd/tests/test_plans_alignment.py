@@ -1,24 +1,34 @@
 import logging
 
+import pytest
 import numpy as np
 from bluesky.preprocessors  import run_wrapper
-from ophyd.sim              import SynAxis
+from ophyd.sim              import SynAxis, SynSignal
 
 from .conftest import Diode
-from ..plans.alignment import maximize_lorentz, rocking_curve
+from ..bragg import rocking_width
+from ..plans.alignment import (maximize_lorentz, rocking_curve,
+                               next_lorentz_position, rocking_parameters,
+                               multi_rocking_curve, optimize_alignment)
 
 logger = logging.getLogger(__name__)
 
 crystal = SynAxis(name='angle')
 
-def test_lorentz_maximize(fresh_RE):
+@pytest.mark.parametrize("fit_kwargs", [
+    {'fit_backend': 'lmfit'},
+    {'fit_backend': 'hxrsnd'},
+    {'fit_backend': 'hxrsnd', 'fit_model': 'pseudo_voigt', 'background': True,
+     'refit_every': 3}])
+def test_lorentz_maximize(fresh_RE, fit_kwargs):
     # Simulated diode readout
     diode = Diode('intensity', crystal, 'angle', 10.0, noise_multiplier=None)
     # Create plan to maximize the signal
     plan  = run_wrapper(maximize_lorentz(diode, crystal, 'intensity',
                                          step_size=0.2, bounds=(9., 11.),
                                          position_field='angle',
-                                         initial_guess = {'center' : 8.}))
+                                         initial_guess = {'center' : 8.},
+                                         **fit_kwargs))
     # Run the plan
     fresh_RE(plan)
 
@@ -43,3 +53,125 @@ def test_rocking_curve(fresh_RE):
     diode.trigger()
     # Check that we were within 10%
     assert np.isclose(diode.read()['intensity']['value'], 1.0, 0.1)
+
+def test_rocking_curve_derives_scan_from_energy(fresh_RE):
+    theta, width = rocking_width(8000)
+    # Intrinsic rocking curve slightly off the expected angle
+    diode = Diode('intensity', crystal, 'angle', theta + 2*width,
+                  sigma=width/2, amplitude=np.pi*width/2)
+    plan  = run_wrapper(rocking_curve(diode, crystal, 'intensity',
+                                      position_field='angle', energy=8000))
+    fresh_RE(plan)
+    assert np.isclose(crystal.position, theta + 2*width, atol=width/10)
+
+def test_rocking_parameters():
+    assert rocking_parameters(crystal) is None
+    params = rocking_parameters(crystal, energy=8000, search_widths=5)
+    assert np.isclose(params['bounds'][1] - params['bounds'][0],
+                      10*params['width'])
+    assert params['fine_step'] < params['coarse_step']
+
+def test_rocking_curve_raises_ValueError_without_steps_or_energy():
+    with pytest.raises(ValueError):
+        next(rocking_curve(None, crystal, 'intensity', bounds=(5, 15)))
+
+@pytest.mark.parametrize("noise", [None, 0.05])
+def test_lorentz_maximize_adaptive(fresh_RE, noise):
+    np.random.seed(0)
+    diode = Diode('intensity', crystal, 'angle', 10.0, noise_multiplier=noise)
+    measured = []
+    diode.subscribe(lambda *args, **kwargs: measured.append(crystal.position))
+    plan  = run_wrapper(maximize_lorentz(diode, crystal, 'intensity',
+                                         bounds=(5., 15.), 
+                                         position_field='angle',
+                                         tolerance=0.05, max_points=20))
+    fresh_RE(plan)
+    # A fraction of the 101 points of a scan with the same resolution
+    assert 5 <= len(set(measured)) <= 20
+    assert np.isclose(crystal.position, 10.0, atol=0.2)
+
+def test_lorentz_maximize_raises_ValueError_on_unsupported_lmfit_model():
+    with pytest.raises(ValueError):
+        next(maximize_lorentz(None, crystal, 'intensity', bounds=(9., 11.),
+                              fit_backend='lmfit', background=True))
+
+def test_next_lorentz_position_samples_around_the_center():
+    class Result:
+        values = {'center': 10.0, 'sigma': np.sqrt(3)}
+    # The most sensitive positions are preferred to measured ones
+    assert next_lorentz_position(Result, [9., 10.], [0.5, 1.], (5, 15)) == 11.
+    assert next_lorentz_position(Result, [9., 11.], [0.5, 0.5], (5, 15)) == 10.
+    # Without a fit the widest interval next to the maximum is bisected
+    assert next_lorentz_position(None, [5, 7, 11], [0, 1, 0], (5, 15)) == 9.
+
+def test_multi_rocking_curve_runs_crystals_concurrently(fresh_RE):
+    th1, th2 = SynAxis(name='th1'), SynAxis(name='th2')
+    di = Diode('di', th1, 'th1', 10.0)
+    dd = Diode('dd', th2, 'th2', 2.5, sigma=0.5, amplitude=np.pi/2)
+    reads = []
+    di.subscribe(lambda *args, **kwargs: reads.append(th1.position))
+    plan = run_wrapper(multi_rocking_curve([di, dd], [th1, th2], ['di', 'dd'],
+                                           coarse_step=0.5, fine_step=0.1,
+                                           bounds=[(5., 15.), (0., 4.)],
+                                           fine_space=1))
+    fresh_RE(plan)
+    assert np.isclose(th1.position, 10.0, atol=0.01)
+    assert np.isclose(th2.position, 2.5, atol=0.01)
+    # The 9 coarse steps of th2 happen during the 21 of th1
+    assert len(reads) == 21 + 21
+
+def test_multi_rocking_curve_does_not_modify_its_arguments(fresh_RE):
+    th1, th2 = SynAxis(name='th1'), SynAxis(name='th2')
+    di = Diode('di', th1, 'th1', 10.0)
+    dd = Diode('dd', th2, 'th2', 2.5, sigma=0.5, amplitude=np.pi/2)
+    bounds, fine_space = [(5., 15.), None], [None, 1]
+    th2.limits = (0., 4.)
+    fresh_RE(run_wrapper(multi_rocking_curve([di, dd], [th1, th2], 
+                                             ['di', 'dd'], coarse_step=1,
+                                             fine_step=0.5, bounds=bounds,
+                                             fine_space=fine_space)))
+    assert bounds == [(5., 15.), None]
+    assert fine_space == [None, 1]
+
+def test_multi_rocking_curve_raises_ValueError_on_mismatched_pairs():
+    with pytest.raises(ValueError):
+        next(multi_rocking_curve([None], [crystal, crystal], ['a', 'b'],
+                                 coarse_step=1, fine_step=0.1, bounds=(5, 15)))
+
+def coupled_diode(chi, y):
+    # The best y depends on chi, so separate scans of each axis fall short
+    return SynSignal(name='coupled', func=lambda: 1 / (
+        1 + (chi.position - 1)**2 + 4*(y.position - chi.position - 1)**2))
+
+def run_optimizer(RE, *args, **kwargs):
+    results = []
+    def test_plan():
+        df = yield from optimize_alignment(*args, **kwargs)
+        results.append(df)
+    RE(run_wrapper(test_plan()))
+    return results[0]
+
+def test_optimize_alignment_follows_coupled_axes(fresh_RE):
+    chi, y = SynAxis(name='chi'), SynAxis(name='y')
+    diode = coupled_diode(chi, y)
+    df = run_optimizer(fresh_RE, diode, [chi, y], 'coupled', steps=[0.5, 0.5],
+                       bounds=[(-5, 5), (-5, 5)], max_step=1)
+    assert np.isclose(chi.position, 1, atol=0.05)
+    assert np.isclose(y.position, 2, atol=0.05)
+    assert len(df) < 100
+    # Moves between measurements never exceed the maximum step
+    assert (df[['chi', 'y']].diff().abs().max() <= 1 + 1e-9).all()
+
+def test_optimize_alignment_warm_starts_and_respects_bounds(fresh_RE):
+    chi, y = SynAxis(name='chi'), SynAxis(name='y')
+    diode = coupled_diode(chi, y)
+    kwargs = dict(steps=0.5, bounds=[(-5, 5), (-5, 1.5)])
+    cold = run_optimizer(fresh_RE, diode, [chi, y], 'coupled', **kwargs)
+    assert (cold['y'] <= 1.5).all()
+    assert np.isclose(y.position, 1.5, atol=0.05)
+    best = cold.loc[cold['coupled'].idxmax(), ['chi', 'y']]
+    chi.set(0), y.set(0)
+    warm = run_optimizer(fresh_RE, diode, [chi, y], 'coupled',
+                         initial=list(best), **kwargs)
+    assert len(warm) < len(cold)
+    assert warm['coupled'].max() >= cold['coupled'].max() - 1e-3
@@ -5,9 +5,12 @@ import pytest
 import pandas as pd
 from bluesky.preprocessors  import run_wrapper
 from ophyd.sim import SynAxis
+from ophyd.device import Device, Component as Cmp
+from ophyd.signal import Signal
 
 from .conftest import SynCamera, test_df_scan
 from ..plans import calibration as calib
+from ..exceptions import InputError
 
 logger = logging.getLogger(__name__)
 
@@ -220,7 +223,7 @@ def test_calibrate_motor(fresh_RE, get_calib_motor):
             tolerance=0)
 
         # Get the configuration from the motor as it sees it
-        config = motor.read_configuration()
+        config = motor.read_configuration(full=True)
 
         # Ensure the resulting config is what we got in the initial scan
         assert config['calib']['value'].equals(df_calib)
@@ -231,3 +234,226 @@ def test_calibrate_motor(fresh_RE, get_calib_motor):
         
     # Run the plan
     fresh_RE(run_wrapper(test_plan()))
+
+def test_build_calibration_df_computes_absolute_corrections():
+    df_calib = calib.build_calibration_df(test_df_scan, [2, -1], [0.25, -0.25],
+                                          "camera")
+    centroids = test_df_scan[["camera_centroid_x", "camera_centroid_y"]]
+    expected = [0.25, -0.25] - (centroids - centroids.iloc[0]) * [2, -1]
+    assert np.allclose(df_calib[["m1_post", "m2_post"]].values, expected.values)
+    assert (df_calib["delay"] == test_df_scan["delay"]).all()
+
+def test_recompute_calibration_applies_post_processing():
+    scale, start = [1, 1], [0.25, -0.25]
+    # Without post-processing it matches the original table
+    df_calib = calib.recompute_calibration(test_df_scan, "camera", scale, start)
+    assert df_calib.equals(calib.build_calibration_df(test_df_scan, scale, 
+                                                      start, "camera"))
+    # Flattened detector values mean no corrections
+    df_calib = calib.recompute_calibration(test_df_scan, "camera", scale, start,
+                                           post_process=lambda df: df*0)
+    assert np.allclose(df_calib[["m1_post", "m2_post"]].values, start)
+    # The stored scan is not modified
+    assert test_df_scan["camera_centroid_x"].abs().sum() > 0
+    with pytest.raises(ValueError):
+        calib.recompute_calibration(test_df_scan, "camera", scale, start,
+                                    post_process=lambda df: df.iloc[1:])
+
+def test_calibration_quality_evaluates_tables():
+    scale, start = [2, -1], [0.25, -0.25]
+    df_calib = calib.build_calibration_df(test_df_scan, scale, start, "camera")
+    df_quality = calib.calibration_quality(df_calib, test_df_scan, scale, 
+                                           start, "camera")
+    assert list(df_quality.index) == ["m1_post", "m2_post"]
+    assert (df_quality["points"] == len(df_calib)).all()
+    # The table was built from the scan so there are no residuals
+    assert np.allclose(df_quality["residual_max"], 0)
+    assert (df_quality["loo_max"] >= df_quality["loo_rms"]).all()
+
+def test_calibration_quality_leave_one_out_errors():
+    x = np.linspace(0, 4, 5)
+    df_calib = pd.DataFrame({"delay": x, "m1_post": 2*x, "m2_post": x**2})
+    df_quality = calib.calibration_quality(df_calib, scaling=[1, 0.5])
+    assert np.isnan(df_quality["residual_rms"]).all()
+    # Linear corrections are predicted exactly, curved ones are not
+    assert np.isclose(df_quality.loc["m1_post", "loo_max"], 0)
+    assert np.isclose(df_quality.loc["m2_post", "loo_max"], 2)
+    assert df_quality.loc["m2_post", "spread"] > 0
+    # Cubic splines predict the quadratic better than linear interpolation
+    df_cubic = calib.calibration_quality(df_calib, method="cubic")
+    assert (df_cubic.loc["m2_post", "loo_rms"] < 
+            df_quality.loc["m2_post", "loo_rms"])
+
+def test_smooth_centroids_preserves_linear_scans():
+    smoothed = calib.smooth_centroids(window_length=5, polyorder=1)(
+        test_df_scan[["camera_centroid_x", "camera_centroid_y"]])
+    assert np.allclose(smoothed.values, 
+                       test_df_scan[["camera_centroid_x", 
+                                     "camera_centroid_y"]].values)
+
+def test_calibration_grid_scan_builds_grid_table(fresh_RE):
+    camera = SynCamera(m1, m2, delay, name="camera")
+    energy = SynAxis(name="energy")
+    centroids = [camera.centroid_x, camera.centroid_y]
+
+    def test_plan():
+        df_calib, df_scan, _, _ = yield from calib.calibration_grid_scan(
+            camera, ['camera_centroid_x','camera_centroid_y'], delay, None,
+            [m1,m2], None, energy, [8, 9], -1, 1, 3, tolerance=0)
+        assert list(df_calib.columns) == ["energy", "delay", "m1_post", 
+                                          "m2_post"]
+        # Snake ordering of the main motor
+        assert list(df_scan["delay"]) == [-1, 0, 1, 1, 0, -1]
+        expected_centroids = df_scan[[c.name for c in centroids]].iloc[0]
+        for i in range(len(df_calib)):
+            delay.set(df_calib["delay"].iloc[i])
+            for cmotor, exp_cent, cent in zip([m1, m2], expected_centroids, 
+                                              centroids):
+                cmotor.set(df_calib[cmotor.name+"_post"].iloc[i])
+                assert np.isclose(cent.get(), exp_cent, rtol=rtol)
+
+    fresh_RE(run_wrapper(test_plan()))
+
+def test_build_grid_calibration_df_uses_pre_positions():
+    df_scan = pd.DataFrame([[8, -1, 1, 0.5], [8, 1, 1, 1.0], [9, 1, 2, 0.5]],
+                           columns=["energy", "delay", "m1_pre", 
+                                    "camera_centroid_x"])
+    df_calib = calib.build_grid_calibration_df(df_scan, [2], "camera",
+                                               ["energy", "delay"])
+    assert list(df_calib.columns) == ["energy", "delay", "m1_post"]
+    assert np.allclose(df_calib["m1_post"], [1, 0, 2])
+
+class KinkedCamera(Device):
+    """
+    Camera whose centroid is a function of the delay position.
+    """
+    stats2_centroid_x = Cmp(Signal)
+
+    def __init__(self, func, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.func = func
+
+    def trigger(self):
+        self.stats2_centroid_x.put(self.func(delay.position))
+        return super().trigger()
+
+def test_refinement_positions_refines_curved_intervals():
+    x = np.linspace(0, 10, 11)
+    assert not len(calib.refinement_positions(x, 2*x, 0.01))
+    new_positions = calib.refinement_positions(x, np.abs(x - 5.5)*10, 0.1)
+    assert len(new_positions)
+    assert 5.5 in new_positions
+    assert (np.abs(new_positions - 5.5) < 2).all()
+    # Intervals at the minimum step are not refined
+    assert not len(calib.refinement_positions(x, np.abs(x - 5.5), 0.1,
+                                              min_step=0.6))
+    with pytest.raises(InputError):
+        calib.refinement_positions([0, 1], [0, 1], 0.1)
+
+@pytest.mark.parametrize("func, points", [(lambda x: 2*x, 5), 
+                                          (lambda x: np.abs(x - 3.2)*10, 12)])
+def test_adaptive_calibration_centroid_scan(fresh_RE, func, points):
+    camera = KinkedCamera(func, name="camera")
+    def test_plan():
+        df = yield from calib.adaptive_calibration_centroid_scan(
+            camera, delay, [m1], 0, 10, 5, 0.1, max_points=12,
+            detector_fields=['stats2_centroid_x'])
+        assert len(df) == points
+        assert list(df.columns) == ["delay", "m1_pre", 
+                                    "camera_stats2_centroid_x"]
+        assert df.index.is_monotonic_increasing
+        # The new points are around the kink
+        assert (np.abs(df.index[~np.isin(df.index, np.linspace(0, 10, 5))] 
+                       - 3.2) < 3.5).all()
+    fresh_RE(run_wrapper(test_plan()))
+
+class LinearCamera(Device):
+    """
+    Camera whose x centroid only depends on m1 and y centroid on m2.
+    """
+    stats2_centroid_x = Cmp(Signal)
+    stats2_centroid_y = Cmp(Signal)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.triggers = 0
+
+    def trigger(self):
+        self.triggers += 1
+        self.stats2_centroid_x.put(10*m1.position)
+        self.stats2_centroid_y.put(-5*m2.position)
+        return super().trigger()
+
+def scaling_walk_triggers(RE, concurrent, coupled):
+    """
+    Runs the scaling walk, checks the scaling and returns the number of
+    camera measurements.
+    """
+    camera = LinearCamera(name="camera")
+    df_scan = pd.DataFrame([[0, 0, 0, 0, 0], [1, 0, 0, 20, -10]],
+                           columns=["delay", "m1_pre", "m2_pre", 
+                                    "camera_stats2_centroid_x",
+                                    "camera_stats2_centroid_y"])
+    results = {}
+    def test_plan():
+        m1.set(0)
+        m2.set(0)
+        results['scaling'], results['start'] = \
+            yield from calib.detector_scaling_walk(
+                df_scan, camera, [m1, m2], first_step=0.5, tolerance=0.1,
+                concurrent=concurrent, coupled=coupled)
+    RE(run_wrapper(test_plan()))
+    assert np.allclose(results['scaling'], [0.1, -0.2])
+    assert np.allclose(results['start'], [0, 0])
+    assert np.isclose(m1.position, 2) and np.isclose(m2.position, 2)
+    return camera.triggers
+
+@pytest.mark.parametrize("concurrent, coupled", [(False, None), (True, None), 
+                                                 (True, [m2])])
+def test_detector_scaling_walk_concurrent(fresh_RE, concurrent, coupled):
+    scaling_walk_triggers(fresh_RE, concurrent, coupled)
+
+def test_detector_scaling_walk_concurrent_takes_fewer_measurements(fresh_RE):
+    assert (scaling_walk_triggers(fresh_RE, True, None) < 
+            scaling_walk_triggers(fresh_RE, False, None))
+
+class DelayCamera(LinearCamera):
+    """
+    Camera whose centroids also drift with the delay.
+    """
+    def trigger(self):
+        status = super().trigger()
+        self.stats2_centroid_x.put(self.stats2_centroid_x.get() + 
+                                   delay.position)
+        self.stats2_centroid_y.put(self.stats2_centroid_y.get() + 
+                                   2*delay.position)
+        return status
+
+def test_multi_calibration_scan_returns_table_per_detector(fresh_RE):
+    # One name is a prefix of the other, their columns must not be mixed
+    cameras = [DelayCamera(name="dcc"), DelayCamera(name="dcc_cam")]
+    results = {}
+    def test_plan():
+        for mot in (m1, m2, delay):
+            mot.set(0)
+        results['calibrations'] = yield from calib.multi_calibration_scan(
+            cameras, [['stats2_centroid_x'], ['stats2_centroid_y']], delay, 
+            ['delay'], [[m1], [m2]], None, 0, 2, 3, first_step=0.5, 
+            tolerance=0.01)
+    fresh_RE(run_wrapper(test_plan()))
+    calibrations = results['calibrations']
+    assert list(calibrations.keys()) == ["dcc", "dcc_cam"]
+    # Both cameras were measured during the same scan
+    assert cameras[0].triggers == cameras[1].triggers
+    for (name, cfld, scale, drift), (df_calib, df_scan, scaling, start) in \
+            zip([("dcc", "m1", 0.1, 1), ("dcc_cam", "m2", -0.2, 2)], 
+                calibrations.values()):
+        assert list(df_scan.columns) == ["delay", cfld+"_pre", 
+                                         name+"_stats2_centroid_"+
+                                         ("x" if cfld == "m1" else "y")]
+        assert np.allclose(scaling, [scale])
+        assert np.allclose(start, [0])
+        # The corrections cancel the drift
+        assert np.allclose(df_calib[cfld+"_post"].values, 
+                           -scale*drift*df_calib["delay"].values.astype(float))
+    assert np.isclose(m1.position, 0) and np.isclose(delay.position, 0)
@@ -0,0 +1,58 @@
+import logging
+
+import pytest
+import numpy as np
+import pandas as pd
+from ophyd.signal import Signal
+from ophyd.sim import SynAxis
+from ophyd.device import Component as Cmp
+from bluesky.preprocessors import run_wrapper
+
+from ..plans.characterization import (retry_characterization,
+                                      recommend_retry_settings)
+
+logger = logging.getLogger(__name__)
+
+class RetryAxis(SynAxis):
+    """
+    Simulated axis with the retry signals of an aerotech.
+    """
+    retries = Cmp(Signal, value=0)
+    retries_max = Cmp(Signal, value=5)
+    retries_deadband = Cmp(Signal, value=0.001)
+
+    @property
+    def desc(self):
+        return self.name
+
+def test_retry_characterization_restores_settings(fresh_RE):
+    motor = RetryAxis(name="motor")
+    motor.set(1)
+    results = []
+    def test_plan():
+        df = yield from retry_characterization(motor, [0.1, 1],
+                                               retries_max=[0, 2],
+                                               retries_deadband=[0.01, 0.1],
+                                               repeats=2)
+        results.append(df)
+    fresh_RE(run_wrapper(test_plan()))
+    df = results[0]
+    # 2 settings x 2 deadbands x 2 sizes x 2 repeats x 2 directions
+    assert len(df) == 32
+    assert (df["error"] == 0).all()
+    assert motor.retries_max.get() == 5
+    assert motor.retries_deadband.get() == 0.001
+    assert motor.position == 1
+
+def test_recommend_retry_settings_picks_fastest_within_tolerance():
+    df = pd.DataFrame([[0, 0.01, 1, 1, 0.5, 0.02, 0],
+                       [1, 0.01, 1, 1, 1.0, 0.005, 1],
+                       [3, 0.01, 1, 1, 2.0, 0.001, 3]],
+                      columns=["retries_max", "retries_deadband", "move_size",
+                               "direction", "move_time", "error", "retries"])
+    summary = recommend_retry_settings(df, 0.01)
+    assert summary["recommended"].sum() == 1
+    assert summary.loc[(1, 0.01), "recommended"]
+    # Nothing within tolerance falls back to the most accurate setting
+    summary = recommend_retry_settings(df, 0.0001)
+    assert summary.loc[(3, 0.01), "recommended"]
@@ -7,9 +7,11 @@ import logging
 ###############
 # Third Party #
 ###############
+import pytest
 import numpy as np
 from bluesky.preprocessors  import run_wrapper
-from ophyd.sim import SynAxis
+from ophyd.sim import SynAxis, SynSignal
+from pswalker.utils.exceptions import FilterCountError
 
 ########
 # SLAC #
@@ -19,7 +21,8 @@ from ophyd.sim import SynAxis
 # Module #
 ##########
 from .conftest import SynCamera
-from ..plans.plan_stubs import euclidean_distance
+from ..plans.plan_stubs import (euclidean_distance, adaptive_average,
+                                _filter_mask)
 
 logger = logging.getLogger(__name__)
 
@@ -40,3 +43,51 @@ def test_euclidean_distance(fresh_RE):
     # And now run it
     fresh_RE(plan)
 
+
+
+def run_average(RE, *args, **kwargs):
+    results = []
+    def test_plan():
+        results.append((yield from adaptive_average(*args, **kwargs)))
+    RE(run_wrapper(test_plan()))
+    return results[0]
+
+@pytest.mark.parametrize("noise, min_shots, max_shots", [(0, 3, 3),
+                                                          (1, 50, 200)])
+def test_adaptive_average_stops_at_target_error(fresh_RE, noise, min_shots,
+                                                max_shots):
+    np.random.seed(0)
+    signal = SynSignal(name="signal",
+                       func=lambda: 5 + noise*np.random.normal())
+    shots = []
+    signal.subscribe(lambda *args, **kwargs: shots.append(1))
+    average, error = run_average(fresh_RE, [signal], "signal", 0.1,
+                                 max_shots=1000)
+    # Clean signals only take the minimum number of shots
+    assert min_shots <= len(shots) <= max_shots
+    assert error["signal"] <= 0.1
+    assert np.isclose(average["signal"], 5, atol=3*0.1)
+
+def test_adaptive_average_filters_and_caps_shots(fresh_RE):
+    values = iter(range(1000))
+    signal = SynSignal(name="signal", func=lambda: float(next(values)))
+    # Filters that only take single values are applied shot by shot
+    average, error = run_average(
+        fresh_RE, [signal], "signal", 1e-3, max_shots=10,
+        filters={"signal": lambda x: math.isfinite(x) and x % 2 == 0})
+    # Ten even values out of the first twenty shots, the signal evaluates the
+    # first value when it is created
+    assert average["signal"] == 11.
+    assert error["signal"] > 1e-3
+
+def test_adaptive_average_raises_FilterCountError(fresh_RE):
+    signal = SynSignal(name="signal", func=lambda: -1.)
+    with pytest.raises(FilterCountError):
+        run_average(fresh_RE, [signal], "signal", 0.1,
+                    filters={"signal": lambda x: x > 0})
+
+@pytest.mark.parametrize("func", [lambda x: x < 5, lambda x: np.all(x < 5)])
+def test_filter_mask_filters_shot_by_shot(func):
+    shots = [{"signal": value} for value in (1., 7., 3.)]
+    # Filters reducing the batch to a single result are applied per shot
+    assert list(_filter_mask(shots, {"signal": func})) == [True, False, True]
@@ -4,8 +4,10 @@ import pytest
 from bluesky.plan_stubs import rel_set
 from bluesky.preprocessors  import run_wrapper
 from ophyd.sim import SynAxis
+from ophyd.device import Device, Component as Cmp
+from ophyd.signal import Signal
 
-from ..plans.preprocessors import return_to_start
+from ..plans.preprocessors import return_to_start, average_frames
 
 logger = logging.getLogger(__name__)
 
@@ -37,3 +39,46 @@ def test_return_to_start_returns_motors_correctly(fresh_RE, return_devices):
 
     # Assert they are the same
     assert current_positions == expected_positions
+
+class FakeProc(Device):
+    enable = Cmp(Signal, value=0)
+    filter_type = Cmp(Signal, value='Recursive Ave')
+    num_filter = Cmp(Signal, value=1)
+    auto_reset_filter = Cmp(Signal, value=0)
+    filter_callbacks = Cmp(Signal, value=0)
+    enable_filter = Cmp(Signal, value=0)
+    reset_filter = Cmp(Signal, value=0)
+    port_name = Cmp(Signal, value='PROC1')
+
+class FakeStats(Device):
+    nd_array_port = Cmp(Signal, value='CAM')
+
+class FakeCam(Device):
+    image_mode = Cmp(Signal, value='Continuous')
+    num_images = Cmp(Signal, value=1)
+
+class FakeAreaDetector(Device):
+    cam = Cmp(FakeCam, '')
+    proc1 = Cmp(FakeProc, '')
+    stats2 = Cmp(FakeStats, '')
+
+def test_average_frames_configures_and_restores_detector(fresh_RE):
+    det = FakeAreaDetector(name="det")
+    during = []
+    @average_frames(det, num=10)
+    def test_plan():
+        during.append((det.proc1.num_filter.get(),
+                       det.proc1.enable_filter.get(),
+                       det.proc1.filter_type.get(),
+                       det.stats2.nd_array_port.get(),
+                       det.cam.image_mode.get(),
+                       det.cam.num_images.get()))
+        yield from rel_set(m1, 1)
+    fresh_RE(run_wrapper(test_plan()))
+    assert during == [(10, 1, 'Average', 'PROC1', 'Multiple', 10)]
+    # Everything is restored afterwards
+    assert det.proc1.num_filter.get() == 1
+    assert det.proc1.enable_filter.get() == 0
+    assert det.stats2.nd_array_port.get() == 'CAM'
+    assert det.cam.image_mode.get() == 'Continuous'
+    assert det.cam.num_images.get() == 1
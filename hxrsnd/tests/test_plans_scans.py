@@ -1,13 +1,24 @@
+import time
+import types
 import logging
+import threading
 
 import pytest
+import numpy as np
 from numpy import linspace
 import pandas as pd
 from bluesky.preprocessors  import run_wrapper
-from ophyd.sim import SynAxis
+from ophyd.sim import SynAxis, SynSignal
+from ophyd.status import DeviceStatus
+from ophyd.utils import LimitError
+from ophyd.device import Device, Component as Cmp
+from ophyd.signal import Signal
 
 from .conftest import SynCamera
-from ..plans.scans import centroid_scan
+from ..plans.scans import (centroid_scan, centroid_list_scan, 
+                           detector_field_lists, delay_fly_scan,
+                           iso_delay_trajectory, iso_delay_energy_scan)
+from ..bragg import bragg_angle, cosd, sind
 from ..utils import as_list
 
 logger = logging.getLogger(__name__)
@@ -87,3 +98,208 @@ def test_centroid_scan_returns_correct_columns(fresh_RE, mot_fields, det_fields,
         assert (delay_scan.columns == expected_columns).all()
     # Run the plan
     fresh_RE(run_wrapper(test_plan()))
+
+def test_detector_field_lists_handles_shared_and_per_detector_fields():
+    dets = [SynAxis(name="dd"), SynAxis(name="dcc")]
+    assert detector_field_lists(dets, "x") == [["x"], ["x"]]
+    assert detector_field_lists(dets, [["x"], ["x", "y"]]) == [["x"], 
+                                                               ["x", "y"]]
+    with pytest.raises(ValueError):
+        detector_field_lists(dets, [["x"]])
+
+class SquareCamera(Device):
+    """
+    Camera whose centroid is the square of the delay position.
+    """
+    stats2_centroid_x = Cmp(Signal)
+
+    def trigger(self):
+        self.stats2_centroid_x.put(delay.position**2)
+        return super().trigger()
+
+def test_centroid_list_scan_returns_float_df_and_streams(fresh_RE):
+    camera = SquareCamera(name="camera")
+    partial = []
+    def test_plan():
+        df = yield from centroid_list_scan(
+            camera, delay, [0, 2, 1], detector_fields='stats2_centroid_x',
+            callback=partial.append)
+        assert (df.dtypes == float).all()
+        assert list(df.index) == [0, 2, 1]
+        assert list(df["camera_stats2_centroid_x"]) == [0, 4, 1]
+    fresh_RE(run_wrapper(test_plan()))
+    # The callback sees the steps measured so far
+    assert [len(df) for df in partial] == [1, 2, 3]
+    assert list(partial[1]["camera_stats2_centroid_x"]) == [0, 4]
+
+class NoisyCamera(Device):
+    """
+    Camera whose centroid noise grows with the delay position.
+    """
+    stats2_centroid_x = Cmp(Signal)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.triggers = []
+
+    def trigger(self):
+        self.triggers.append(delay.position)
+        self.stats2_centroid_x.put(delay.position*np.random.normal())
+        return super().trigger()
+
+def test_centroid_list_scan_averages_to_target_error(fresh_RE):
+    np.random.seed(0)
+    camera = NoisyCamera(name="camera")
+    def test_plan():
+        df = yield from centroid_list_scan(
+            camera, delay, [0, 1], detector_fields='stats2_centroid_x',
+            target_error=0.2, average=500)
+        assert np.allclose(df["camera_stats2_centroid_x"], 0, atol=3*0.2)
+    fresh_RE(run_wrapper(test_plan()))
+    # Clean steps take the fewest shots, noisy steps as many as needed
+    assert camera.triggers.count(0) == 3
+    assert 15 < camera.triggers.count(1) < 500
+
+def test_centroid_list_scan_rejects_measure_average_keywords_with_target_error():
+    with pytest.raises(ValueError):
+        next(centroid_list_scan(NoisyCamera(name="camera"), delay, [0, 1],
+                                target_error=0.2, delay=0.1))
+
+class FlyingStage(Device):
+    """
+    Linear stage that moves continuously at its velocity.
+    """
+    user_readback = Cmp(Signal, value=0.)
+    velocity = Cmp(Signal, value=100.)
+
+    @property
+    def position(self):
+        return self.user_readback.get()
+
+    def set(self, position):
+        status = DeviceStatus(self)
+        start, t0 = self.position, time.time()
+        def move():
+            duration = abs(position - start) / self.velocity.get()
+            while time.time() - t0 < duration:
+                fraction = (time.time() - t0) / duration
+                self.user_readback.put(start + fraction*(position - start))
+                time.sleep(0.005)
+            self.user_readback.put(position)
+            status.set_finished()
+        threading.Thread(target=move, daemon=True).start()
+        return status
+
+class FakeDelay(object):
+    """
+    Delay macromotor where the delay is twice the length of the stages.
+    """
+    def __init__(self):
+        self._delay_towers = [types.SimpleNamespace(L=FlyingStage(name=name))
+                              for name in ("t1_L", "t4_L")]
+
+    def _delay_to_length(self, delay):
+        return delay / 2
+
+    def _length_to_delay(self, L):
+        return 2*np.asarray(L)
+
+def test_delay_fly_scan_bins_readings_by_delay(fresh_RE):
+    delay = FakeDelay()
+    stage = delay._delay_towers[0].L
+    diode = SynSignal(name="diode", func=lambda: stage.position)
+    results = []
+    def test_plan():
+        results.append((yield from delay_fly_scan(
+            delay, 0, 2, duration=0.5, detectors=[diode], bins=5)))
+    t0 = time.time()
+    fresh_RE(run_wrapper(test_plan()))
+    assert time.time() - t0 < 2
+    df_fly, df_binned = results[0]
+    assert len(df_fly) > 20
+    # The diode reads the length, so half the delay
+    assert np.allclose(df_fly["diode"], df_fly["delay"] / 2, atol=0.05)
+    assert df_binned["count"].sum() == len(df_fly)
+    assert np.allclose(df_binned["diode"], df_binned.index / 2, atol=0.1)
+    # The velocity and the stage positions are restored
+    assert stage.velocity.get() == 100
+    assert stage.position == 0
+
+
+class LimitedAxis(SynAxis):
+    limits = (-500, 500)
+
+class FakeDelayTower(object):
+    """
+    Delay tower with the energy motor positions of the system.
+    """
+    def __init__(self, name):
+        for axis in ("tth", "th1", "th2", "L"):
+            setattr(self, axis, LimitedAxis(name=name+"_"+axis))
+        self._energy_motors = [self.tth, self.th1, self.th2]
+
+    def _get_move_positions(self, E):
+        theta = bragg_angle(E=E)
+        return [2*theta if motor is self.tth else theta
+                for motor in self._energy_motors]
+
+class FakeDelayMacro(object):
+    """
+    Delay macromotor with the length and diagnostic calculations of the
+    system.
+    """
+    c, gap = 0.3, 55
+
+    def __init__(self, towers, theta2):
+        self._delay_towers = towers
+        self.theta2 = theta2
+        self.position = 10
+
+    def _delay_to_length(self, delay, theta1=None, theta2=None):
+        return ((delay*self.c/2 + self.gap*(1 - cosd(2*theta2)) /
+                 sind(theta2)) / (1 - cosd(2*theta1)))
+
+    def _get_delay_diagnostic_position(self, E1=None, delay=None):
+        theta1 = bragg_angle(E=E1)
+        length = self._delay_to_length(delay, theta1=theta1,
+                                       theta2=self.theta2)
+        return -length*sind(2*theta1)
+
+def fake_snd():
+    towers = [FakeDelayTower(name) for name in ("t1", "t4")]
+    return types.SimpleNamespace(
+        delay=FakeDelayMacro(towers, bragg_angle(8000)), 
+        theta2=bragg_angle(8000),
+        dd=types.SimpleNamespace(x=LimitedAxis(name="dd_x")))
+
+def test_iso_delay_trajectory_matches_single_energies():
+    snd = fake_snd()
+    energies = [8000, 8500, 9000]
+    trajectory = iso_delay_trajectory(snd, energies)
+    for energy in energies:
+        theta = bragg_angle(energy)
+        length = snd.delay._delay_to_length(10, theta, snd.theta2)
+        assert np.isclose(trajectory.loc[energy, "t1_tth"], 2*theta)
+        assert np.isclose(trajectory.loc[energy, "t4_L"], length)
+        assert np.isclose(trajectory.loc[energy, "dd_x"],
+                          -length*sind(2*theta))
+
+def test_iso_delay_energy_scan_moves_every_axis(fresh_RE):
+    snd = fake_snd()
+    diode = SynSignal(name="diode", func=lambda: snd.delay._delay_towers[
+        1].L.position)
+    results = []
+    def test_plan():
+        results.append((yield from iso_delay_energy_scan(
+            snd, [8000, 9000], detectors=[diode], return_to_start=False)))
+    fresh_RE(run_wrapper(test_plan()))
+    df = results[0]
+    assert np.allclose(df["diode"], df["t4_L"])
+    assert snd.delay._delay_towers[0].th2.position == bragg_angle(9000)
+
+def test_iso_delay_energy_scan_checks_limits_before_moving(fresh_RE):
+    snd = fake_snd()
+    with pytest.raises(LimitError):
+        # The stages go past their limits at low angles
+        fresh_RE(run_wrapper(iso_delay_energy_scan(snd, [8000, 20000])))
+    assert snd.delay._delay_towers[0].L.position == 0
@@ -7,10 +7,14 @@ from collections import OrderedDict
 
 import numpy as np
 from ophyd.device import Device
+from ophyd.signal import Signal
 from ophyd.tests.conftest import using_fake_epics_pv
 
 from hxrsnd import pneumatic
-from hxrsnd.pneumatic import ProportionalValve, PressureSwitch, SndPneumatics
+from hxrsnd.pneumatic import (ProportionalValve, PressureSwitch, SndPneumatics,
+                              PressureInterlock)
+from hxrsnd.aerotech import InterlockedAero
+from hxrsnd.exceptions import BadN2Pressure
 from .conftest import get_classes_in_module, fake_device
 
 logger = logging.getLogger(__name__)
@@ -64,3 +68,94 @@ def test_SndPneumatics_open_and_close_methods():
     time.sleep(.1)
     for valve in vac._valves:
         assert valve.closed
+
+class FakePressure(Signal):
+    """
+    Soft signal whose connection state can be changed.
+    """
+    _connected = True
+
+    @property
+    def connected(self):
+        return self._connected
+
+class FakeSwitch(object):
+    """
+    Pressure switch backed by a soft signal that counts the reads.
+    """
+    def __init__(self, prefix, value=0):
+        self.prefix = prefix
+        self.desc = prefix
+        self.pressure = FakePressure(name=prefix+"_pressure", value=value)
+        self.reads = 0
+        get = self.pressure.get
+        def counted_get(*args, **kwargs):
+            self.reads += 1
+            return get(*args, **kwargs)
+        self.pressure.get = counted_get
+
+class FakeAxis(object):
+    def __init__(self, moving):
+        self.desc = "axis"
+        self.moving = moving
+        self.stopped = False
+
+    def stop(self):
+        self.stopped = True
+
+def test_PressureInterlock_caches_the_pressure_state():
+    switch = FakeSwitch("TEST:INTERLOCK:CACHE")
+    interlock = PressureInterlock(switch)
+    assert interlock.good
+    assert switch.reads == 1
+    for _ in range(10):
+        assert not interlock.bad
+    assert switch.reads == 1
+    # Monitor updates refresh the cache without reads
+    switch.pressure.put(1)
+    assert interlock.bad
+    assert switch.reads == 1
+
+def test_PressureInterlock_trusts_a_steady_connected_state():
+    switch = FakeSwitch("TEST:INTERLOCK:STEADY")
+    interlock = PressureInterlock(switch)
+    assert interlock.good
+    time.sleep(0.1)
+    assert interlock.good
+    assert switch.reads == 1
+
+def test_PressureInterlock_rereads_after_disconnection():
+    switch = FakeSwitch("TEST:INTERLOCK:DISCONNECTED")
+    interlock = PressureInterlock(switch)
+    assert interlock.good
+    switch.pressure._connected = False
+    interlock.good
+    assert switch.reads == 2
+
+def test_PressureInterlock_stops_moving_axes_on_pressure_loss():
+    switch = FakeSwitch("TEST:INTERLOCK:ABORT")
+    interlock = PressureInterlock(switch)
+    moving, idle = FakeAxis(True), FakeAxis(False)
+    interlock.register(moving)
+    interlock.register(idle)
+    switch.pressure.put(1)
+    time.sleep(0.1)
+    assert moving.stopped
+    assert not idle.stopped
+
+def test_InterlockedAero_refuses_moves_on_bad_pressure():
+    switch = FakeSwitch("TEST:INTERLOCK:AERO", value=1)
+    motor = InterlockedAero("TEST:SND:T1:AXIS", name="axis",
+                            interlock=PressureInterlock(switch))
+    with pytest.raises(BadN2Pressure):
+        motor.move(10)
+
+def test_InterlockedAero_switches_to_a_shared_interlock():
+    motor = InterlockedAero("TEST:SND:T1:AXIS", name="axis")
+    own = motor._interlock
+    switch = FakeSwitch("TEST:INTERLOCK:SHARED")
+    shared = PressureInterlock(switch)
+    motor.use_interlock(shared)
+    assert motor._interlock is shared
+    assert own._cid is None
+    assert motor in shared._axes
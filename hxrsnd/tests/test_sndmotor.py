@@ -16,6 +16,7 @@ from hxrsnd import sndmotor
 from .conftest import get_classes_in_module, fake_device, SynCamera
 from ..plans.scans import centroid_scan
 from ..sndmotor import CalibMotor
+from ..calibstore import CalibrationStore
 from ..exceptions import InputError
 
 logger = logging.getLogger(__name__)
@@ -82,7 +83,7 @@ def test_CalibMotor_configure_works_with_good_inputs(scale, start, scan):
                          scale=scale,
                          start=start)
 
-    config = dev.read_configuration()
+    config = dev.read_configuration(full=True)
     # Assert the extra values are in the cofiguration
     assert config['scan']['value'] is scan
     assert config['scale']['value'] == scale
@@ -185,3 +186,196 @@ def test_CalibMotor_move_compensation(fresh_RE, get_calib_motor):
                     average=1, tolerance=0, confirm_overwrite=False)
     # Run the plan
     fresh_RE(run_wrapper(test_plan()))    
+
+@pytest.mark.parametrize("method", ["linear", "cubic", "pchip"])
+def test_CalibMotor_calib_positions_interpolates_the_table(method):
+    dev = CalibMotor("TST", name="test", calib_method=method)
+    calib = pd.DataFrame([[0, 0, 0], [1, 1, -1], [2, 2, -2]],
+                         columns=["test", "a_post", "b_post"])
+    dev.configure(calib=calib, motors=[dev, SynAxis(name="a"), 
+                                       SynAxis(name="b")])
+    df_positions = dev.calib_positions([0.5, 1.5])
+    assert list(df_positions.columns) == ["a_post", "b_post"]
+    assert np.allclose(df_positions.values, [[0.5, -0.5], [1.5, -1.5]])
+    # The compiled table is reused until the calibration changes
+    table = dev._calib_table_cache[-1]
+    dev.calib_positions(1)
+    assert dev._calib_table_cache[-1] is table
+
+def test_CalibMotor_recompiles_replaced_and_reconfigured_tables():
+    dev = CalibMotor("TST", name="test")
+    motors = [dev, SynAxis(name="a")]
+    for slope in (1, 2):
+        # Replaced tables may be allocated at the address of the old one
+        dev.configure(calib=pd.DataFrame([[0, 0], [1, slope]],
+                                         columns=["test", "a_post"]),
+                      motors=motors)
+        assert np.allclose(dev.calib_positions(0.5).values, slope/2)
+    # Edits made in place are picked up once configure is re-run
+    dev._calib['calib']['value'].iloc[1, 1] = 4
+    dev.configure()
+    assert np.allclose(dev.calib_positions(0.5).values, 2)
+
+def test_CalibMotor_calib_positions_raises_InputError_without_calibration():
+    dev = CalibMotor("TST", name="test")
+    with pytest.raises(InputError):
+        dev.calib_positions([0, 1])
+
+def test_CalibMotor_saves_and_loads_calibrations(tmpdir):
+    store = CalibrationStore(str(tmpdir))
+    a = SynAxis(name="a")
+    dev = CalibMotor("TST", name="test", calib_motors=[a], calib_store=store)
+    calib = pd.DataFrame([[0, 0], [1, 1]], columns=["test", "a_post"])
+    dev.configure(calib=calib, motors=[dev, a], scan=pd.DataFrame([[0.]]),
+                  scale=[1], start=[0])
+    dev.save_calibration()
+
+    # A fresh motor lazily loads the saved calibration
+    dev = CalibMotor("TST", name="test", calib_motors=[a], calib_store=store)
+    assert not dev.has_calib
+    assert np.allclose(dev.calib_positions([0.5]).values, [[0.5]])
+    assert dev.has_calib and dev.use_calib
+    assert dev.calibration['motors'] == ["test", "a"]
+
+def test_CalibMotor_saves_and_loads_grid_calibrations(tmpdir):
+    store = CalibrationStore(str(tmpdir))
+    energy, m1 = SynAxis(name="E1"), SynAxis(name="m1")
+    dev = CalibMotor("TST", name="test", calib_motors=[m1],
+                     calib_grid_motors=[energy], calib_store=store)
+    grid_energy, grid_delay = np.meshgrid([8, 10], [0, 100], indexing='ij')
+    calib = pd.DataFrame({"E1": grid_energy.ravel(), 
+                          "test": grid_delay.ravel()})
+    calib["m1_post"] = calib["E1"] + 0.01*calib["test"]
+    dev.configure(calib=calib, motors=[energy, dev, m1],
+                  scan=pd.DataFrame([[0.]]), scale=[1], start=[0])
+    dev.save_calibration()
+
+    # A fresh motor resolves the grid axis when loading the saved table
+    dev = CalibMotor("TST", name="test", calib_motors=[m1],
+                     calib_grid_motors=[energy], calib_store=store)
+    dev.load_calibration()
+    assert dev.calibration['motors'] == ["E1", "test", "m1"]
+    energy.set(9)
+    assert np.allclose(dev.calib_positions([0, 50]).values, [[9], [9.5]])
+
+def test_CalibMotor_evaluate_calibration_is_saved(tmpdir):
+    store = CalibrationStore(str(tmpdir))
+    dev = CalibMotor("TST", name="test", calib_store=store)
+    with pytest.raises(InputError):
+        dev.evaluate_calibration()
+    x = np.linspace(0, 4, 5)
+    dev.configure(calib=pd.DataFrame({"test": x, "a_post": x**2}),
+                  motors=[dev, SynAxis(name="a")], scale=[1], start=[0])
+    df_quality = dev.evaluate_calibration()
+    assert np.isclose(df_quality.loc["a_post", "loo_max"], 2)
+    dev.save_calibration()
+    assert store.load("test")['quality'].equals(df_quality.astype(float))
+
+def test_CalibMotor_load_calibration_raises_InputError_on_unknown_motors(
+        tmpdir):
+    store = CalibrationStore(str(tmpdir))
+    store.save("test", {'calib': pd.DataFrame([[0, 0], [1, 1]]), 
+                        'motors': ["test", "b"]})
+    dev = CalibMotor("TST", name="test", calib_motors=[SynAxis(name="a")],
+                     calib_store=store)
+    with pytest.raises(InputError):
+        dev.load_calibration()
+
+def test_CalibMotor_recalibrate_uses_new_scaling():
+    dev = CalibMotor("TST", name="test")
+    m1, m2 = SynAxis(name="m1"), SynAxis(name="m2")
+    scan = pd.DataFrame([[-1, 0, 0, -0.25, 0.25], [1, 0, 0, 0.25, -0.25]],
+                        index=[-1, 1], columns=["test", "m1_pre", "m2_pre",
+                                                "camera_centroid_x",
+                                                "camera_centroid_y"])
+    dev.configure(calib=pd.DataFrame(columns=['a', 'b', 'c']), 
+                  motors=[dev, m1, m2], scan=scan, scale=[1, 1], start=[0, 0])
+    dev.recalibrate(scaling=[2, 2], detector="camera")
+    calibration = dev.calibration
+    assert calibration['scale'] == [2, 2]
+    assert np.allclose(calibration['calib']["m1_post"].values, [0, -1])
+    assert np.allclose(calibration['calib']["m2_post"].values, [0, 1])
+
+def test_CalibMotor_recalibrate_defaults_to_calib_detector():
+    dev = CalibMotor("TST", name="test", calib_detector="camera")
+    m1, m2 = SynAxis(name="m1"), SynAxis(name="m2")
+    scan = pd.DataFrame([[-1, 0, 0, -0.25, 0.25], [1, 0, 0, 0.25, -0.25]],
+                        index=[-1, 1], columns=["test", "m1_pre", "m2_pre",
+                                                "camera_centroid_x",
+                                                "camera_centroid_y"])
+    dev.configure(calib=pd.DataFrame(columns=['a', 'b', 'c']), 
+                  motors=[dev, m1, m2], scan=scan, scale=[1, 1], start=[0, 0])
+    dev.recalibrate()
+    assert np.allclose(dev.calibration['calib']["m1_post"].values, [0, -0.5])
+
+def test_CalibMotor_recalibrate_raises_InputError_without_scan():
+    dev = CalibMotor("TST", name="test")
+    with pytest.raises(InputError):
+        dev.recalibrate(scaling=[1], start=[0])
+
+def test_CalibMotor_compensates_using_grid_tables():
+    dev = CalibMotor("TST", name="test")
+    energy, m1 = SynAxis(name="E1"), SynAxis(name="m1")
+    m1.move = m1.set
+    grid_energy, grid_delay = np.meshgrid([8, 10], [0, 100], indexing='ij')
+    calib = pd.DataFrame({"E1": grid_energy.ravel(), 
+                          "test": grid_delay.ravel()})
+    calib["m1_post"] = calib["E1"] + 0.01*calib["test"]
+    dev.configure(calib=calib, motors=[energy, dev, m1])
+    energy.set(9)
+    assert np.allclose(dev.calib_positions([0, 50]).values, [[9], [9.5]])
+    dev._calib_compensate(50)
+    assert np.isclose(m1.position, 9.5)
+
+def test_CalibMotor_has_calib_only_checks_changed_calibrations(monkeypatch):
+    dev = CalibMotor("TST", name="test")
+    dev.configure(calib=pd.DataFrame([[0, 0], [1, 1]], columns=['test', 'a']),
+                  motors=[dev, SynAxis(name="a")])
+    calls = []
+    monkeypatch.setattr(dev, "_check_calib", calls.append)
+    assert all(dev.has_calib for _ in range(10))
+    assert not calls
+    # Replacing a parameter invalidates the cached state
+    dev._calib['motors']['value'] = [dev]
+    assert dev.has_calib
+    assert len(calls) == 1
+
+def test_CalibMotor_calib_hash_changes_with_the_calibration():
+    dev = CalibMotor("TST", name="test")
+    assert dev.calib_hash is None
+    motors = [dev, SynAxis(name="a")]
+    calib = pd.DataFrame([[0, 0], [1, 1]], columns=['test', 'a'])
+    dev.configure(calib=calib, motors=motors)
+    calib_hash = dev.calib_hash
+    assert calib_hash == dev.calib_hash
+    dev.configure(calib=calib.copy())
+    assert dev.calib_hash == calib_hash
+    dev.configure(calib=calib + 1)
+    assert dev.calib_hash != calib_hash
+
+def test_CalibMotor_calib_hash_follows_replaced_parameters():
+    dev = CalibMotor("TST", name="test")
+    calib = pd.DataFrame([[0, 0], [1, 1]], columns=['test', 'a'])
+    dev.configure(calib=calib, motors=[dev, SynAxis(name="a")])
+    del calib
+    for offset in range(10):
+        # Free the table first so the new one may be allocated at its address
+        dev._calib['calib']['value'] = None
+        dev._calib['calib']['value'] = pd.DataFrame(
+            [[0, offset], [1, offset]], columns=['test', 'a'])
+        assert dev.calib_hash == dev._hash_calib()
+
+def test_CalibMotor_read_configuration_summarizes_the_calibration():
+    dev = CalibMotor("TST", name="test")
+    calib = pd.DataFrame([[0, 0], [1, 1]], columns=['test', 'a'])
+    dev.configure(calib=calib, motors=[dev, SynAxis(name="a")], 
+                  scan=pd.DataFrame(np.zeros((1000, 4))))
+    config = dev.read_configuration()
+    assert config.keys() == dev.describe_configuration().keys()
+    assert not any(isinstance(entry['value'], pd.DataFrame) 
+                   for entry in config.values())
+    assert config['calib_valid']['value']
+    assert config['calib_hash']['value'] == dev.calib_hash
+    assert config['calib_shape']['value'] == [2, 2]
+    assert config['calib_motors']['value'] == ["test", "a"]
+    assert dev.read_configuration(full=True)['calib']['value'] is calib
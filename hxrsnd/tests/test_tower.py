@@ -25,6 +25,7 @@ from pcdsdevices.sim.pv import using_fake_epics_pv
 from .conftest import get_classes_in_module, fake_device
 from hxrsnd import tower
 from hxrsnd.sndsystem import DelayTower, ChannelCutTower
+from hxrsnd.aerotech import InterlockedAero
 from hxrsnd.exceptions import MotorDisabled, MotorFaulted
 
 logger = logging.getLogger(__name__)
@@ -58,6 +59,25 @@ def test_DelayTower_does_not_move_if_motors_not_ready():
     with pytest.raises(MotorFaulted):
         tower.energy = 10
 
+@using_fake_epics_pv
+def test_DelayTower_axes_share_one_pressure_interlock(monkeypatch):
+    tower = fake_device(DelayTower, "TEST:SND:T1")
+    axes = [tower.tth, tower.x, tower.L]
+    assert all(axis._interlock is tower._interlock for axis in axes)
+
+    moving = {tower.tth.name, tower.L.name}
+    stopped = []
+    monkeypatch.setattr(InterlockedAero, "moving",
+                        property(lambda self: self.name in moving))
+    monkeypatch.setattr(InterlockedAero, "stop",
+                        lambda self, **kwargs: stopped.append(self.name))
+    # A single pressure drop stops every moving axis of the tower
+    pressure = tower._interlock.switch.pressure
+    pressure._run_subs(sub_type=pressure.SUB_VALUE, value=1,
+                       timestamp=time.time())
+    time.sleep(.1)
+    assert sorted(stopped) == sorted(moving)
+
 @using_fake_epics_pv
 def test_ChannelCutTower_does_not_move_if_motors_not_ready():
     tower = fake_device(ChannelCutTower, "TEST:SND:T1")
@@ -8,6 +8,7 @@ from ophyd import Component as Cmp
 from ophyd.status import wait as status_wait
 
 from .snddevice import SndDevice
+from .pneumatic import PressureInterlock
 from .bragg import bragg_angle, bragg_energy
 from .attocube import EccBase, TranslationEcc, GoniometerEcc, DiodeEcc
 from .aerotech import (AeroBase, RotationAero, InterRotationAero,
@@ -149,13 +150,15 @@ class TowerBase(SndDevice):
 
         Parameters
         ----------
-        E : float
-            Energy to compute the motor move positions for.
+        E : float or array-like
+            Energy to compute the motor move positions for, or array of
+            energies.
 
         Returns
         -------
         positions : list
-            List of positions each of the energy motors need to move to.
+            List of positions each of the energy motors need to move to, as
+            arrays for an array of energies.
         """
         return [bragg_angle(E)] * len(self._energy_motors)
 
@@ -365,6 +368,12 @@ class DelayTower(TowerBase):
         super().__init__(prefix, *args, **kwargs)
         self._energy_motors = [self.tth, self.th1, self.th2]
 
+        # One pressure state for the whole tower, so a pressure drop stops all
+        # of its interlocked axes
+        self._interlock = PressureInterlock(self.tth._pressure)
+        for axis in (self.tth, self.x, self.L):
+            axis.use_interlock(self._interlock)
+
     @property
     def position(self):
         """
@@ -385,13 +394,15 @@ class DelayTower(TowerBase):
 
         Parameters
         ----------
-        E : float
-            Energy to compute the motor move positions for.
+        E : float or array-like
+            Energy to compute the motor move positions for, or array of
+            energies.
 
         Returns
         -------
         positions : list
-            List of positions each of the energy motors need to move to.
+            List of positions each of the energy motors need to move to, as
+            arrays for an array of energies.
         """
         # Convert to theta
         theta = bragg_angle(E=E)
@@ -57,6 +57,7 @@ def absolute_submodule_path(submodule, cur_dir=inspect.stack()[0][1]):
 
 DIR_MODULE = Path(absolute_submodule_path("hxrsnd/"))
 DIR_LOGS = DIR_MODULE / "logs"
+DIR_CALIBRATIONS = DIR_MODULE / "calibrations"
 
 def setup_logging(path_yaml=None, dir_logs=None, default_level=logging.INFO):
     """